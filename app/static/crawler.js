@@ -206,35 +206,148 @@ async function startCrawl() {
   showProgress(true);
   updateProgressText("正在準備爬蟲任務...");
 
+  const payload = {
+    keyword: keyword,
+    platforms: selectedPlatforms,
+    max_products: maxProducts,
+    min_price: minPrice,
+    max_price: maxPrice,
+  };
+
   try {
-    const response = await fetch("/api/crawl", {
+    const response = await fetch("/api/crawl/stream", {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
-      body: JSON.stringify({
-        keyword: keyword,
-        platforms: selectedPlatforms,
-        max_products: maxProducts,
-        min_price: minPrice,
-        max_price: maxPrice,
-      }),
+      body: JSON.stringify(payload),
     });
 
-    const data = await response.json();
+    if (!response.ok || !response.body) {
+      // 瀏覽器不支援串流讀取或伺服器拒絕時，改用背景工作並輪詢進度
+      await startCrawlJob(payload);
+      return;
+    }
 
-    if (data.status === "success") {
+    await readCrawlStream(response, selectedPlatforms);
+  } catch (error) {
+    showProgress(false);
+    showError("網路錯誤：" + error.message);
+  }
+}
+
+// 建立背景爬蟲工作並輪詢進度，完成後載入結果
+async function startCrawlJob(payload) {
+  const response = await fetch("/api/crawl", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify(payload),
+  });
+
+  const job = await response.json();
+
+  if (!job.job_id) {
+    showProgress(false);
+    showError(job.error || "爬蟲執行失敗");
+    return;
+  }
+
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+    const status = await (await fetch(`/api/crawl/${job.job_id}`)).json();
+
+    if (status.status === "queued") {
+      updateProgressText(`排隊中，前面還有 ${Math.max(0, (status.queue_position || 1) - 1)} 個任務...`);
+    } else if (status.status === "running") {
+      const finished = Object.values(status.progress || {}).filter((p) => p.status !== "running").length;
+      updateProgressText(`正在爬取，已完成 ${finished}/${payload.platforms.length} 個平台...`);
+    } else if (status.status === "success") {
+      const data = await (await fetch(`/api/result/${status.session_id}`)).json();
       currentResults = data;
       cachedResults = data;
       showProgress(false);
       showResults(data);
+      return;
     } else {
       showProgress(false);
-      showError(data.error || "爬蟲執行失敗");
+      showError(status.error || "爬蟲執行失敗");
+      return;
     }
-  } catch (error) {
-    showProgress(false);
-    showError("網路錯誤：" + error.message);
+  }
+}
+
+// 讀取 NDJSON 串流，每個平台完成時立即顯示其商品
+async function readCrawlStream(response, selectedPlatforms) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  const data = { status: "running", results: {} };
+  let buffer = "";
+  let finishedCount = 0;
+  let firstRender = true;
+
+  selectedPlatforms.forEach((platform) => {
+    data.results[platform] = { status: "running", total_products: 0, products: [], execution_time: 0 };
+  });
+  updateProgressText(`正在爬取 ${selectedPlatforms.length} 個平台...`);
+
+  const handleEvent = (event) => {
+    const result = data.results[event.platform];
+
+    if (event.type === "queued") {
+      updateProgressText("任務已排入佇列，等待執行...");
+    } else if (event.type === "keepalive" && event.status === "queued") {
+      updateProgressText(`任務已排入佇列，前面還有 ${Math.max(event.queue_position - 1, 0)} 個任務...`);
+    } else if (event.type === "page") {
+      result.products.push(...event.products);
+    } else if (event.type === "platform" && event.status === "running") {
+      updateProgressText(`正在爬取 ${selectedPlatforms.length} 個平台...`);
+    } else if (event.type === "platform") {
+      Object.assign(result, {
+        status: event.status,
+        total_products: event.status === "success" ? result.products.length : 0,
+        execution_time: event.execution_time,
+        error: event.error,
+        truncated: event.truncated,
+      });
+      finishedCount++;
+      const truncatedNote = event.truncated ? "（已達時間限制，結果不完整）" : "";
+      updateProgressText(
+        `${getPlatformDisplayName(event.platform)} 完成${truncatedNote}，已完成 ${finishedCount}/${selectedPlatforms.length} 個平台...`
+      );
+      currentResults = data;
+      showResults(data, firstRender);
+      firstRender = false;
+    } else if (event.type === "summary") {
+      Object.assign(data, {
+        status: "success",
+        session_id: event.session_id,
+        filename: event.filename,
+        message: event.message,
+      });
+      currentResults = data;
+      cachedResults = data;
+      showProgress(false);
+      showResults(data, firstRender);
+    } else if (event.type === "error") {
+      showProgress(false);
+      showError(event.error || "爬蟲執行失敗");
+    }
+  };
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.filter((line) => line.trim()).forEach((line) => handleEvent(JSON.parse(line)));
+  }
+
+  if (buffer.trim()) {
+    handleEvent(JSON.parse(buffer));
   }
 }
 
@@ -261,8 +374,8 @@ function updateProgressText(text) {
   document.getElementById("progressText").textContent = text;
 }
 
-// 顯示結果
-function showResults(data) {
+// 顯示結果（串流模式下每個平台完成都會重新呈現，只有第一次捲動到結果區）
+function showResults(data, scroll = true) {
   const resultCard = document.getElementById("resultCard");
   const summaryContainer = document.getElementById("resultSummary");
   
@@ -354,7 +467,9 @@ function showResults(data) {
   filterAndSortProducts();
   
   resultCard.style.display = "block";
-  resultCard.scrollIntoView({ behavior: "smooth" });
+  if (scroll) {
+    resultCard.scrollIntoView({ behavior: "smooth" });
+  }
 }
 
 // 解析價格字串為數字
@@ -3,12 +3,14 @@
 使用Flask和SQLite建立Web介面來顯示和管理爬蟲結果
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 import os
 import json
 import sys
 import importlib.util
 import re
+import queue
+import time
 from datetime import datetime
 from threading import Thread
 
@@ -17,19 +19,23 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
 from core.crawler_manager import CrawlerManager
-from core.product_filter import ProductFilter
 from core.database import get_db_connection, init_db
 from core.github_sync import auto_sync_if_needed, download_latest_database
 from core.services.product_comparison_service import ProductComparisonService
 from core.services.daily_deals_service import DailyDealsService
 from core.services.product_comparison_cache_service import ProductComparisonCacheService
 from core.services.database_service import DatabaseService
-
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+from core.services.crawl_job_service import CrawlJobService
+from core.http_cache import http_cache
+from core.resilience import resilience
+from core.product import json_default
+from core.fan_out import host_slots
+from core.browser_pool import browser_pool
+from core.startup import LazyInit, module_available, startup_profiler
+
+# google-generativeai 匯入很慢，啟動時只確認套件存在，實際匯入延到第一次使用
+GEMINI_AVAILABLE = module_available('google.generativeai')
+if not GEMINI_AVAILABLE:
     print("Warning: google-generativeai not installed. Product comparison feature will be disabled.")
 
 app = Flask(__name__)
@@ -43,26 +49,36 @@ app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
 # 初始化爬蟲管理器
 crawler_manager = CrawlerManager()
 
-# 初始化商品過濾器
-try:
+# 初始化商品過濾器（第一次呼叫過濾 API 時才建立）
+def _create_product_filter():
+    from core.product_filter import ProductFilter
     # 注意：ProductFilter 現在需要傳入資料庫連線函式
     product_filter = ProductFilter(db_connection_func=get_db_connection)
-    PRODUCT_FILTER_AVAILABLE = True
     print("ProductFilter 初始化成功")
-except Exception as e:
-    product_filter = None
-    PRODUCT_FILTER_AVAILABLE = False
-    print(f"Warning: ProductFilter 初始化失敗: {e}. 商品過濾功能將被禁用。")
+    return product_filter
+
+# 建立失敗（例如缺少 google-generativeai）時 get() 回傳 None，商品過濾 API 回應 503
+product_filter_loader = LazyInit('ProductFilter', _create_product_filter)
 
-# 配置 Gemini API
+# 串流爬蟲 API：沒有事件時每隔幾秒送出 keepalive，最多等待多久後改請客戶端查詢工作狀態
+CRAWL_STREAM_KEEPALIVE = float(os.getenv('CRAWL_STREAM_KEEPALIVE', '15'))
+CRAWL_STREAM_MAX_WAIT = float(os.getenv('CRAWL_STREAM_MAX_WAIT', '1800'))
+
+# 配置 Gemini API（第一次商品比較時才建立模型）
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
-if GEMINI_AVAILABLE and GEMINI_API_KEY:
+if not GEMINI_API_KEY:
+    print("Warning: Gemini API key not found. Product comparison feature will be disabled.")
+
+def _create_gemini_model():
+    if not (GEMINI_AVAILABLE and GEMINI_API_KEY):
+        return None
+    import google.generativeai as genai
     genai.configure(api_key=GEMINI_API_KEY)
     model = genai.GenerativeModel('gemini-2.0-flash-exp') # 使用 Gemini 2.0 Flash
     print("✅ AI 模型初始化成功 (使用 Gemini 2.0 Flash)")
-else:
-    model = None
-    print("Warning: Gemini API key not found. Product comparison feature will be disabled.")
+    return model
+
+gemini_model = LazyInit('Gemini 模型', _create_gemini_model)
 
 # 爬蟲狀態追蹤
 crawler_status = {
@@ -80,9 +96,50 @@ def dict_from_rows(rows):
     """將 sqlite3.Row 物件列表轉換為字典列表"""
     return [dict(row) for row in rows]
 
+def parse_crawl_request(data):
+    """
+    驗證爬蟲請求參數
+
+    Returns:
+        tuple: (參數字典, 錯誤訊息)，驗證失敗時參數字典為 None
+    """
+    if not data:
+        return None, '無效的請求資料'
+    
+    keyword = data.get('keyword', '').strip()
+    if not keyword:
+        return None, '請輸入關鍵字'
+    
+    platforms = data.get('platforms', [])
+    if not platforms:
+        return None, '請選擇至少一個平台'
+    
+    params = {
+        'keyword': keyword,
+        'platforms': platforms,
+        'max_products': data.get('max_products', 100),
+        'min_price': data.get('min_price', 0),
+        'max_price': data.get('max_price', 999999)
+    }
+    
+    # timeout_s 為爬取時間上限（從工作開始執行起算，不包含在佇列中等待的時間），時間到時回傳已取得的商品；
+    # 存成秒數而不是截止時間，伺服器重新啟動後重新排入佇列的工作仍有完整的時間
+    timeout_s = data.get('timeout_s')
+    if timeout_s is not None:
+        try:
+            timeout_s = float(timeout_s)
+        except (TypeError, ValueError):
+            return None, 'timeout_s 必須是數字'
+        if timeout_s <= 0:
+            return None, 'timeout_s 必須大於 0'
+        params['timeout_s'] = timeout_s
+    
+    return params, None
+
 # --- 初始化服務 ---
-product_comparison_service = ProductComparisonService(model)
-daily_deals_service = DailyDealsService(crawler_manager)
+product_comparison_service = ProductComparisonService(model_provider=gemini_model.get)
+crawl_job_service = CrawlJobService(crawler_manager)
+daily_deals_service = DailyDealsService(crawler_manager, crawl_job_service)
 comparison_cache_service = ProductComparisonCacheService(crawler_manager, product_comparison_service)
 database_service = DatabaseService()
 
@@ -137,66 +194,111 @@ def get_crawlers():
 
 @app.route('/api/crawl', methods=['POST'])
 def start_crawl():
-    """執行爬蟲任務"""
+    """將爬蟲任務排入背景工作佇列，立即回傳 job_id"""
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': '無效的請求資料'}), 400
-        
-        keyword = data.get('keyword', '').strip()
-        if not keyword:
-            return jsonify({'error': '請輸入關鍵字'}), 400
-        
-        platforms = data.get('platforms', [])
-        if not platforms:
-            return jsonify({'error': '請選擇至少一個平台'}), 400
-        
-        max_products = data.get('max_products', 100)
-        min_price = data.get('min_price', 0)
-        max_price = data.get('max_price', 999999)
-        
-        # 執行爬蟲
-        session_id = crawler_manager.run_all_crawlers(
-            keyword=keyword,
-            max_products=max_products,
-            min_price=min_price,
-            max_price=max_price,
-            platforms=platforms
-        )
+        params, error = parse_crawl_request(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
         
-        # 獲取商品詳情
-        conn = get_db_connection()
-        products = conn.execute('SELECT * FROM products WHERE session_id = ? ORDER BY price', (session_id,)).fetchall()
-        session = conn.execute('SELECT * FROM crawl_sessions WHERE id = ?', (session_id,)).fetchone()
-        
-        # 按平台組織結果，匹配前端期望的格式
-        results = {}
-        for platform in platforms:
-            platform_products = [dict(p) for p in products if p['platform'] == platform]
-            
-            results[platform] = {
-                'status': 'success' if platform_products else 'failed',
-                'total_products': len(platform_products),
-                'products': platform_products,
-                'execution_time': 0  # 這裡可以從其他地方獲取，暫時設為0
-            }
-        
-        conn.close()
+        job_id = crawl_job_service.submit('crawl', params)
         
         return jsonify({
-            'status': 'success',
-            'session_id': session_id,
-            'results': results,
-            'filename': f'crawler_results_{keyword}_{session_id}.json',
-            'message': f'成功爬取了 {len(platforms)} 個平台的商品'
-        })
+            'status': 'queued',
+            'job_id': job_id,
+            'status_url': f'/api/crawl/{job_id}',
+            'message': f'已排入 {len(params["platforms"])} 個平台的爬蟲任務'
+        }), 202
         
     except Exception as e:
         print(f"爬蟲API錯誤: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'error': f'爬蟲執行失敗: {str(e)}'}), 500
+        return jsonify({'error': f'爬蟲任務建立失敗: {str(e)}'}), 500
+
+@app.route('/api/crawl/<job_id>')
+def get_crawl_job(job_id):
+    """查詢背景爬蟲工作的狀態、各平台進度與完成後的 session_id"""
+    job = crawl_job_service.get_job(job_id)
+    if job is None:
+        return jsonify({'error': '找不到此工作', 'status': 'error'}), 404
+    return jsonify(job)
+
+@app.route('/api/crawl/stream', methods=['POST'])
+def start_crawl_stream():
+    """
+    串流執行爬蟲任務，以 NDJSON 逐行回傳事件
+
+    任務同樣排入背景工作佇列執行，佇列忙碌時第一個事件會較晚送出。
+
+    事件類型：
+        queued: 工作已排入佇列 {type, job_id}
+        page: 某平台取得一頁商品 {type, platform, products}
+        platform: 某平台狀態改變 {type, platform, status, total_products, execution_time}
+        keepalive: 一段時間沒有事件時送出 {type, job_id, status, queue_position}
+        summary: 全部結束 {type, status, job_id, session_id, total_products, results}
+        error: 任務執行失敗，或等待超過 CRAWL_STREAM_MAX_WAIT 秒 {type, error, job_id}
+    """
+    params, error = parse_crawl_request(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    events = queue.Queue()
+    job_id = crawl_job_service.submit('crawl', params, listener=events.put)
+    
+    def summarize(event):
+        if event['status'] != 'success':
+            return {'type': 'error', 'error': f"爬蟲執行失敗: {event.get('error')}"}
+        session_id = event['result']['session_id']
+        conn = get_db_connection()
+        session = conn.execute('SELECT * FROM crawl_sessions WHERE id = ?', (session_id,)).fetchone()
+        conn.close()
+        return {
+            'type': 'summary',
+            'status': session['status'],
+            'job_id': job_id,
+            'session_id': session_id,
+            'total_products': session['total_products'],
+            'results': crawl_job_service.get_job(job_id)['progress'],
+            'filename': f"crawler_results_{params['keyword']}_{session_id}.json",
+            'message': f"成功爬取了 {len(params['platforms'])} 個平台的商品"
+        }
+    
+    def generate():
+        # 客戶端中斷連線時工作仍會在背景完成並寫入資料庫
+        # 串流結束（包含客戶端中斷）時取消 listener，避免事件持續堆積在沒有人讀取的佇列
+        yield json.dumps({'type': 'queued', 'job_id': job_id}) + '\n'
+        started = time.time()
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=CRAWL_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    if time.time() - started >= CRAWL_STREAM_MAX_WAIT:
+                        yield json.dumps({
+                            'type': 'error',
+                            'job_id': job_id,
+                            'error': f'等待超過 {CRAWL_STREAM_MAX_WAIT:g} 秒，請改以 /api/crawl/{job_id} 查詢結果'
+                        }, ensure_ascii=False) + '\n'
+                        break
+                    job = crawl_job_service.get_job(job_id) or {}
+                    yield json.dumps({
+                        'type': 'keepalive',
+                        'job_id': job_id,
+                        'status': job.get('status'),
+                        'queue_position': job.get('queue_position')
+                    }) + '\n'
+                    continue
+                if event['type'] == 'job':
+                    yield json.dumps(summarize(event), ensure_ascii=False, default=json_default) + '\n'
+                    break
+                yield json.dumps(event, ensure_ascii=False, default=json_default) + '\n'
+        finally:
+            crawl_job_service.remove_listener(job_id)
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/api/results')
 def get_results():
@@ -332,7 +434,7 @@ def compare_products_api():
             print("錯誤: Gemini 不可用")
             return jsonify({'error': 'Gemini 套件未安裝'}), 503
             
-        if not model:
+        if not gemini_model.get():
             print("錯誤: Gemini 模型未配置")
             return jsonify({'error': 'Gemini API 未配置或 API 金鑰無效'}), 503
         
@@ -357,7 +459,8 @@ def compare_products_api():
 @app.route('/api/products/filter', methods=['POST'])
 def filter_products_api():
     """商品過濾 API - 使用 ProductFilter 過濾指定 session 的商品"""
-    if not PRODUCT_FILTER_AVAILABLE or not product_filter:
+    product_filter = product_filter_loader.get()
+    if not product_filter:
         return jsonify({'error': 'ProductFilter 未配置，無法使用商品過濾功能'}), 503
     
     try:
@@ -381,7 +484,8 @@ def filter_products_api():
 @app.route('/api/products/filter-all', methods=['POST'])
 def filter_all_products_api():
     """批量過濾所有尚未過濾過的爬蟲任務"""
-    if not PRODUCT_FILTER_AVAILABLE or not product_filter:
+    product_filter = product_filter_loader.get()
+    if not product_filter:
         return jsonify({'error': 'ProductFilter 未配置，無法使用商品過濾功能'}), 503
 
     try:
@@ -457,7 +561,19 @@ def debug_info():
         'status': 'success',
         'message': '伺服器運行正常',
         'available_crawlers': crawler_manager.list_crawlers(),
-        'product_filter_available': PRODUCT_FILTER_AVAILABLE,
+        'crawl_executor': crawler_manager.executor_stats(),
+        'fan_out_in_flight': host_slots.stats(),
+        'crawl_cache': crawler_manager.cache.stats(),
+        'http_cache': http_cache.stats(),
+        'resilience': resilience.stats(),
+        'crawler_registry': crawler_manager.registry.stats(),
+        'browser_pool': browser_pool.stats(),
+        'startup': {
+            **startup_profiler.summary(),
+            'gemini_model': gemini_model.status(),
+            'product_filter': product_filter_loader.status()
+        },
+        'product_filter_available': product_filter_loader.get() is not None,
         'gemini_available': GEMINI_AVAILABLE
     })
 
@@ -800,6 +916,7 @@ if __name__ == '__main__':
         db.DB_PATH = os.path.join(project_root, 'data', 'crawler_data.db')
         
         init_db() # 確保資料庫和資料表已建立
+        crawl_job_service.start() # 啟動背景工作佇列並恢復未完成的工作
         print("爬蟲結果展示網站啟動中...")
         print("請訪問: http://localhost:5000")
         print("按 Ctrl+C 停止伺服器")
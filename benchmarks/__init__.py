@@ -0,0 +1,4 @@
+"""
+爬蟲解析效能基準測試
+以錄製的 fixture（或合成資料）離線測量各平台解析流程的 pages/s 與 products/s
+"""
@@ -0,0 +1,202 @@
+"""
+解析流程效能基準測試（完全離線）
+
+    python -m benchmarks.bench_parsers
+    python -m benchmarks.bench_parsers --platform carrefour --min-time 2
+    python -m benchmarks.bench_parsers --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_parsers --baseline benchmarks/baseline.json --max-regression 0.2
+
+有錄製的 fixture（見 benchmarks.record）時使用錄製資料，否則使用合成資料；
+指定 --baseline 時，任何解析流程的 products/s 比基準低超過 --max-regression 即以結束碼 1 結束。
+"""
+
+import argparse
+import json
+import os
+import platform as platform_info
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# 以檔案路徑執行時也能匯入專案的 core 模組
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.crawler_registry import crawler_registry
+from benchmarks.fixtures import load_pages
+
+DEFAULT_MIN_TIME = 1.0
+DEFAULT_MAX_REGRESSION = 0.2
+NO_PRICE_LIMIT = (0, 999999)
+
+
+def _pchome_parser(module) -> Callable:
+    return lambda data: module.parse_search_page(data, *NO_PRICE_LIMIT) or []
+
+
+def _yahoo_parser(module) -> Callable:
+    return lambda data: [module.map_hit(item) for item in module.parse_hits(data)]
+
+
+def _routn_parser(module) -> Callable:
+    return lambda items: [module.map_detail(item) for item in items]
+
+
+def _carrefour_parser(engine: str) -> Callable:
+    def factory(module):
+        if engine == 'lxml' and not module.LXML_AVAILABLE:
+            raise ImportError("lxml 未安裝")
+        return lambda html: module.parse_page_products(html, engine=engine) or []
+    return factory
+
+
+def _onsale_parser(module) -> Callable:
+    return module.parse_onsale_html
+
+
+def _rushbuy_parser(module) -> Callable:
+    return module.parse_rushbuy_html
+
+
+# 基準名稱 -> (平台, 由爬蟲模組建立「單頁輸入 -> 商品列表」函數的工廠)
+BENCHMARKS = {
+    'pchome': ('pchome', _pchome_parser),
+    'yahoo': ('yahoo', _yahoo_parser),
+    'routn': ('routn', _routn_parser),
+    'carrefour_lxml': ('carrefour', _carrefour_parser('lxml')),
+    'carrefour_soupstrainer': ('carrefour', _carrefour_parser('soupstrainer')),
+    'pchome_onsale': ('pchome_onsale', _onsale_parser),
+    'yahoo_rushbuy': ('yahoo_rushbuy', _rushbuy_parser)
+}
+
+
+def measure(parse: Callable, pages: List, min_time: float) -> Dict:
+    """
+    反覆解析所有頁面直到累計時間超過 min_time（先以一輪預熱）
+
+    吞吐量以最快的一輪計算（與 timeit 相同），降低其他行程干擾造成的誤差。
+
+    Returns:
+        Dict: rounds、products（每輪）、best_seconds、pages_per_s、products_per_s
+    """
+    for page in pages:
+        parse(page)
+
+    round_times = []
+    products = 0
+    while not round_times or sum(round_times) < min_time:
+        start = time.perf_counter()
+        products = sum(len(parse(page)) for page in pages)
+        round_times.append(time.perf_counter() - start)
+
+    best = min(round_times)
+    return {
+        'rounds': len(round_times),
+        'products': products,
+        'best_seconds': round(best, 6),
+        'pages_per_s': round(len(pages) / best, 1) if best else 0.0,
+        'products_per_s': round(products / best, 1) if best else 0.0
+    }
+
+
+def run_benchmarks(names: List[str], min_time: float = DEFAULT_MIN_TIME, synthetic: bool = False) -> Dict[str, Dict]:
+    """
+    執行指定的基準測試，缺少相依套件的平台會略過
+
+    Returns:
+        Dict[str, Dict]: 基準名稱 -> 測量結果（含資料來源 source 與單頁商品數 products_per_page）
+    """
+    results = {}
+    for name in names:
+        platform, factory = BENCHMARKS[name]
+        try:
+            parse = factory(crawler_registry.get_module(platform))
+        except ImportError as e:
+            print(f"略過 {name}: {e}")
+            continue
+        source, pages = load_pages(platform, synthetic)
+        result = measure(parse, pages, min_time)
+        result['source'] = source
+        result['input_pages'] = len(pages)
+        result['products_per_page'] = round(result['products'] / len(pages), 1) if pages else 0
+        results[name] = result
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], max_regression: float) -> List[str]:
+    """
+    與基準比較 products/s，只比較資料來源與輸入頁數相同的項目
+
+    Returns:
+        List[str]: 效能退步的說明，沒有退步時為空列表
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or base.get('source') != result['source'] or base.get('input_pages') != result['input_pages']:
+            continue
+        floor = base['products_per_s'] * (1 - max_regression)
+        if result['products_per_s'] < floor:
+            regressions.append(
+                f"{name}: {result['products_per_s']:.0f} products/s，低於基準 {base['products_per_s']:.0f} 的 "
+                f"{(1 - max_regression) * 100:.0f}%"
+            )
+    return regressions
+
+
+def print_results(results: Dict[str, Dict], baseline: Optional[Dict[str, Dict]] = None):
+    print(f"{'解析流程':<24}{'來源':<11}{'pages/s':>11}{'products/s':>13}{'商品/頁':>9}{'基準差異':>10}")
+    for name, result in results.items():
+        change = ""
+        base = (baseline or {}).get(name)
+        if base and base.get('source') == result['source'] and base.get('products_per_s'):
+            change = f"{(result['products_per_s'] / base['products_per_s'] - 1) * 100:+.1f}%"
+        print(f"{name:<24}{result['source']:<11}{result['pages_per_s']:>11.1f}{result['products_per_s']:>13.1f}"
+              f"{result['products_per_page']:>9}{change:>10}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="爬蟲解析流程效能基準測試（離線）")
+    parser.add_argument('--platform', action='append', choices=sorted(BENCHMARKS),
+                        help="只執行指定的解析流程（可重複指定），預設全部執行")
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME, help="每個解析流程至少測量的秒數")
+    parser.add_argument('--synthetic', action='store_true', help="忽略錄製的 fixture，一律使用合成資料")
+    parser.add_argument('--baseline', help="與此基準檔比較，效能退步時以結束碼 1 結束")
+    parser.add_argument('--save-baseline', help="把本次結果存成基準檔")
+    parser.add_argument('--max-regression', type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="允許的 products/s 退步比例（預設 0.2）")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.platform or list(BENCHMARKS), args.min_time, args.synthetic)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created_at': datetime.now().isoformat(),
+                'python': platform_info.python_version(),
+                'machine': platform_info.machine(),
+                'results': results
+            }, f, ensure_ascii=False, indent=2)
+        print(f"基準已儲存到: {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print("解析效能退步:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("解析效能未低於基準")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
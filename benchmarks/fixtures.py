@@ -0,0 +1,151 @@
+"""
+基準測試的輸入資料
+優先使用 core.http_replay 錄製的回應與頁面原始碼，沒有錄製資料時產生結構相同的合成資料
+"""
+
+import json
+import os
+import random
+import sys
+from typing import List, Tuple
+
+# 以檔案路徑執行時也能匯入專案的 core 模組
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.http_replay import http_replay
+
+SOURCE_RECORDED = 'recorded'
+SOURCE_SYNTHETIC = 'synthetic'
+
+# 合成資料的頁數與每頁商品數（與各平台實際的分頁大小相同）
+SYNTHETIC_PAGES = 5
+SYNTHETIC_SEED = 20240601
+PAGE_SIZES = {
+    'pchome': 20,
+    'yahoo': 60,
+    'routn': 50,
+    'carrefour': 20,
+    'pchome_onsale': 120,
+    'yahoo_rushbuy': 40
+}
+
+
+def _json_bodies(group: str) -> List:
+    """錄製回應中可解析為 JSON 的內容"""
+    bodies = []
+    for entry in http_replay.responses(group):
+        try:
+            bodies.append(json.loads(entry['content']))
+        except ValueError:
+            continue
+    return bodies
+
+
+def recorded_pages(platform: str) -> List:
+    """
+    取得平台錄製的解析輸入（依回應內容的結構挑選，不依賴網址）
+
+    Returns:
+        List: pchome/yahoo 為搜尋回應 JSON，routn 為商品詳情列表，
+              carrefour 為搜尋頁 HTML，pchome_onsale/yahoo_rushbuy 為頁面原始碼
+    """
+    if platform == 'pchome':
+        return [body for body in _json_bodies('pchome') if isinstance(body, dict) and body.get('prods')]
+    if platform == 'yahoo':
+        return [body for body in _json_bodies('yahoo')
+                if isinstance(body, dict) and body.get('data', {}).get('getUther', {}).get('hits')]
+    if platform == 'routn':
+        # 露天的商品ID分頁回應是 dict，只有商品詳情回應是 list
+        return [body for body in _json_bodies('routn') if isinstance(body, list) and body]
+    if platform == 'carrefour':
+        return [entry['content'].decode(entry.get('encoding') or 'utf-8', errors='replace')
+                for entry in http_replay.responses('carrefour')]
+    return http_replay.pages(platform)
+
+
+def _filler_html(rng: random.Random, blocks: int = 60) -> str:
+    """商品區塊以外的頁面內容（導覽列、頁尾等），讓合成頁面的大小接近實際頁面"""
+    return "".join(
+        f'<div class="nav-item"><a href="/category/{rng.randint(1, 9999)}">分類 {i}</a>'
+        f'<span class="desc">{"說明文字" * rng.randint(1, 6)}</span></div>'
+        for i in range(blocks)
+    )
+
+
+def _title(rng: random.Random, index: int) -> str:
+    return f"合成測試商品 {index} {rng.choice(['藍牙耳機', '行動電源', '保溫瓶', '電競滑鼠', '吸塵器'])} {rng.randint(1, 999)}型"
+
+
+def synthetic_page(platform: str, page: int, rng: random.Random):
+    """產生單頁合成輸入，結構與平台實際回應相同"""
+    size = PAGE_SIZES[platform]
+    start = page * size
+    if platform == 'pchome':
+        return {'totalPage': SYNTHETIC_PAGES, 'prods': [
+            {'Id': f"DYAJ{start + i:06d}", 'name': _title(rng, start + i),
+             'price': rng.choice([rng.randint(99, 9999), f"${rng.randint(99, 9999):,}"]),
+             'picB': f"/items/DYAJ{start + i:06d}/000001_{rng.randint(1000, 9999)}.jpg"}
+            for i in range(size)]}
+    if platform == 'yahoo':
+        return {'data': {'getUther': {'hits': [
+            {'ec_title': _title(rng, start + i), 'ec_price': f"{rng.randint(99, 9999)}.0",
+             'ec_image': f"https://s.yimg.com/zp/images/{start + i}.jpg",
+             'ec_item_url': f"https://tw.buy.yahoo.com/gdsale/{start + i}.html"}
+            for i in range(size)]}}}
+    if platform == 'routn':
+        return [{'ProdId': f"2{start + i:013d}", 'ProdName': _title(rng, start + i),
+                 'PriceRange': [rng.randint(99, 9999)] * 2, 'Image': f"/s1/{start + i}.jpg"}
+                for i in range(size)]
+    if platform == 'carrefour':
+        items = "".join(
+            f'<div class="hot-recommend-item line"><div class="box-img">'
+            f'<img class="m_lazyload" data-src="https://online.carrefour.com.tw/img/{start + i}.jpg"></div>'
+            f'<div class="commodity-desc"><a href="/zh/{start + i}.html">{_title(rng, start + i)}</a></div>'
+            f'<div class="current-price"><em>${rng.randint(99, 9999):,}</em></div></div>'
+            for i in range(size))
+        return f"<html><body>{_filler_html(rng)}<div class=\"product-list\">{items}</div>{_filler_html(rng)}</body></html>"
+    if platform == 'pchome_onsale':
+        items = "".join(
+            f'<div class="c-prodInfoV2" data-gtm-item-id="DYAJ{start + i:06d}"><a href="/prod/DYAJ{start + i:06d}">'
+            f'<div class="c-prodInfoV2__img"><img src="https://24h.pchome.com.tw/img/mobile_loading.svg" '
+            f'data-src="https://cs-a.ecimg.tw/items/DYAJ{start + i:06d}.jpg"></div>'
+            f'<div class="c-prodInfoV2__title">{_title(rng, start + i)}</div>'
+            f'<div class="c-prodInfoV2__priceValue">${rng.randint(99, 9999):,}</div></a></div>'
+            for i in range(size))
+        return f"<html><body>{_filler_html(rng)}<section>{items}</section>{_filler_html(rng)}</body></html>"
+    if platform == 'yahoo_rushbuy':
+        items = "".join(
+            f'<li class="RushbuyItem__item___{start + i}"><a href="/gdsale/{start + i}.html">'
+            f'<img src="https://s.yimg.com/rushbuy/{start + i}.jpg">'
+            f'<span class="RushbuyItem__Title">{_title(rng, start + i)}</span>'
+            f'<span class="RushbuyItem__price">${rng.randint(99, 9999):,}</span></a></li>'
+            for i in range(size))
+        return f"<html><body>{_filler_html(rng)}<ul>{items}</ul>{_filler_html(rng)}</body></html>"
+    raise ValueError(f"不支援的平台: {platform}")
+
+
+def synthetic_pages(platform: str, pages: int = SYNTHETIC_PAGES) -> List:
+    """產生固定亂數種子的合成輸入，每次執行的內容相同，基準結果才能互相比較"""
+    rng = random.Random(f"{SYNTHETIC_SEED}-{platform}")
+    return [synthetic_page(platform, page, rng) for page in range(pages)]
+
+
+def load_pages(platform: str, synthetic: bool = False) -> Tuple[str, List]:
+    """
+    取得平台的解析輸入
+
+    Args:
+        platform (str): 平台名稱
+        synthetic (bool): 忽略錄製資料，一律使用合成資料
+
+    Returns:
+        Tuple[str, List]: (資料來源 recorded/synthetic, 各頁的解析輸入)
+    """
+    if not synthetic:
+        pages = recorded_pages(platform)
+        if pages:
+            return SOURCE_RECORDED, pages
+    return SOURCE_SYNTHETIC, synthetic_pages(platform)
+
@@ -0,0 +1,66 @@
+"""
+錄製基準測試與離線開發用的 fixture（需要連線到電商網站，Selenium 平台需要 Chrome）
+
+    python -m benchmarks.record 藍牙耳機
+    python -m benchmarks.record 藍牙耳機 --platform pchome --platform carrefour --max-products 200
+    python -m benchmarks.record --deals
+
+錄製完成後以 CRAWLER_HTTP_REPLAY=replay 執行爬蟲即可重播，不會連線。
+"""
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+# 以檔案路徑執行時也能匯入專案的 core 模組
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.crawler_registry import crawler_registry, KIND_DEALS, KIND_SEARCH
+from core.http_replay import http_replay, REPLAY_RECORD
+
+
+def record(keyword: str, platforms: List[str], max_products: int, fixtures_dir: Optional[str] = None) -> dict:
+    """
+    以錄製模式執行爬蟲
+
+    Returns:
+        dict: 平台 -> 取得的商品數（失敗時為錯誤訊息）
+    """
+    http_replay.configure(REPLAY_RECORD, fixtures_dir)
+    summary = {}
+    for platform in platforms:
+        print(f"正在錄製 {platform}...")
+        try:
+            run = crawler_registry.get_module(platform).run
+            products = run(keyword=keyword, max_products=max_products, min_price=0, max_price=999999)
+            summary[platform] = len(products or [])
+        except Exception as e:
+            summary[platform] = f"錯誤: {e}"
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="錄製爬蟲的 HTTP 回應與頁面原始碼")
+    parser.add_argument('keyword', nargs='?', default='', help="搜尋關鍵字（促銷頁面平台不使用）")
+    parser.add_argument('--platform', action='append', help="只錄製指定平台（可重複指定）")
+    parser.add_argument('--deals', action='store_true', help="錄製促銷頁面平台（pchome_onsale、yahoo_rushbuy）")
+    parser.add_argument('--max-products', type=int, default=100)
+    parser.add_argument('--fixtures-dir', help="fixture 目錄（預設為 CRAWLER_FIXTURES_DIR）")
+    args = parser.parse_args(argv)
+
+    platforms = args.platform or crawler_registry.platforms(KIND_DEALS if args.deals else KIND_SEARCH)
+    if not args.keyword and not args.deals and not args.platform:
+        parser.error("搜尋平台需要關鍵字")
+
+    summary = record(args.keyword, platforms, args.max_products, args.fixtures_dir)
+    for platform, result in summary.items():
+        print(f"{platform}: {result}")
+    print(f"共錄製 {http_replay.recorded} 個回應/頁面到 {http_replay.fixtures_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+"""
+Selenium 瀏覽器池
+保留數個已啟動的無頭 Chrome 供每日促銷爬蟲借用，省去每次執行都要冷啟動瀏覽器的時間；
+借出前先做健康檢查，處理指定頁數後或記憶體用量過高時關閉並重建
+"""
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from .startup import module_available
+
+# selenium 只在實際建立瀏覽器時才匯入，避免拖慢伺服器啟動
+SELENIUM_AVAILABLE = module_available('selenium')
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# 保留的瀏覽器數量（0 表示停用瀏覽器池，每次執行各自啟動瀏覽器）
+DEFAULT_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '1'))
+# 每個瀏覽器借出幾次（頁面）後關閉重建，避免長時間執行的 Chrome 累積記憶體
+DEFAULT_MAX_PAGES = int(os.getenv('BROWSER_POOL_MAX_PAGES', '20'))
+# 歸還時瀏覽器記憶體超過此值（MB）即關閉，0 表示不檢查
+DEFAULT_MAX_MEMORY_MB = float(os.getenv('BROWSER_POOL_MAX_MEMORY_MB', '1024'))
+# 閒置超過此秒數的瀏覽器在下次借用時關閉，0 表示一直保留
+DEFAULT_IDLE_TIMEOUT = float(os.getenv('BROWSER_POOL_IDLE_TIMEOUT', '0'))
+# 所有瀏覽器都被借出時最多等待的秒數
+DEFAULT_LEASE_TIMEOUT = float(os.getenv('BROWSER_POOL_LEASE_TIMEOUT', '120'))
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+BLANK_PAGE = 'about:blank'
+# CHROMEDRIVER_PATH 與系統路徑都失敗時再嘗試的位置
+COMMON_CHROMEDRIVER_PATHS = [
+    "chromedriver.exe",
+    "C:\\chromedriver\\chromedriver.exe",
+    "C:\\Program Files\\Google\\Chrome\\Application\\chromedriver.exe"
+]
+
+
+class BrowserPoolExhausted(TimeoutError):
+    """等待可用瀏覽器逾時"""
+
+
+def create_chrome_driver(headless: bool = True):
+    """
+    啟動 Chrome WebDriver（每日促銷爬蟲共用的設定）
+
+    依序嘗試 CHROMEDRIVER_PATH、系統路徑中的 chromedriver 與常見安裝位置。
+
+    Args:
+        headless (bool): 是否使用無頭模式
+
+    Returns:
+        WebDriver: 已啟動的瀏覽器
+
+    Raises:
+        RuntimeError: 所有 ChromeDriver 設置方法都失敗
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_argument(f'--user-agent={USER_AGENT}')
+
+    chromedriver_path = os.environ.get('CHROMEDRIVER_PATH')
+    if chromedriver_path and os.path.exists(chromedriver_path):
+        return webdriver.Chrome(service=Service(chromedriver_path), options=options)
+
+    errors = []
+    try:
+        return webdriver.Chrome(options=options)
+    except Exception as e:
+        errors.append(f"系統 ChromeDriver: {e}")
+    for path in COMMON_CHROMEDRIVER_PATHS:
+        if os.path.exists(path):
+            try:
+                return webdriver.Chrome(service=Service(path), options=options)
+            except Exception as e:
+                errors.append(f"{path}: {e}")
+    raise RuntimeError("所有 ChromeDriver 設置方法都失敗: " + "; ".join(errors))
+
+
+class PooledBrowser:
+    """瀏覽器池中的一個瀏覽器與其使用紀錄"""
+
+    def __init__(self, driver, browser_id: int):
+        self.driver = driver
+        self.browser_id = browser_id
+        self.pages = 0
+        self.created_at = time.time()
+        self.last_used = self.created_at
+
+    def memory_mb(self) -> Optional[float]:
+        """
+        目前的記憶體用量（MB）
+
+        有 psutil 時為 chromedriver 底下所有 Chrome 行程的 RSS 總和，
+        否則改用頁面的 JS heap（performance.memory），都無法取得時回傳 None。
+        """
+        if PSUTIL_AVAILABLE:
+            try:
+                process = psutil.Process(self.driver.service.process.pid)
+                return sum(p.memory_info().rss for p in process.children(recursive=True)) / (1024 * 1024)
+            except Exception:
+                pass
+        try:
+            used = self.driver.execute_script("return window.performance.memory ? performance.memory.usedJSHeapSize : null")
+            return used / (1024 * 1024) if used else None
+        except Exception:
+            return None
+
+
+class BrowserPool:
+    """
+    Selenium 瀏覽器池
+
+    acquire/release（或 lease 區塊）借用已啟動的瀏覽器，沒有閒置的瀏覽器且數量未達上限時才啟動新的。
+    借出前以簡單的 JavaScript 確認瀏覽器仍可使用；歸還時清除 cookies 並回到空白頁，
+    借出次數達 max_pages、記憶體超過 max_memory_mb 或重設失敗的瀏覽器會直接關閉。
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, max_pages: int = DEFAULT_MAX_PAGES,
+                 max_memory_mb: float = DEFAULT_MAX_MEMORY_MB, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 lease_timeout: float = DEFAULT_LEASE_TIMEOUT, factory: Optional[Callable] = None):
+        """
+        Args:
+            size (int): 最多同時存在的瀏覽器數量，0 表示停用
+            max_pages (int): 每個瀏覽器借出幾次後關閉重建，0 表示不限
+            max_memory_mb (float): 歸還時記憶體超過此值即關閉，0 表示不檢查
+            idle_timeout (float): 閒置超過此秒數即關閉，0 表示一直保留
+            lease_timeout (float): 所有瀏覽器都被借出時最多等待的秒數
+            factory (Callable, optional): 建立 WebDriver 的函數，預設為 create_chrome_driver
+        """
+        self.size = max(0, size)
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.idle_timeout = idle_timeout
+        self.lease_timeout = lease_timeout
+        self.factory = factory or create_chrome_driver
+        self._idle: List[PooledBrowser] = []
+        self._total = 0  # 閒置 + 借出中 + 啟動中
+        self._next_id = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.created = 0
+        self.reused = 0
+        self.start_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.evicted = {'pages': 0, 'memory': 0, 'unhealthy': 0, 'idle': 0, 'closed': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0 and (SELENIUM_AVAILABLE or self.factory is not create_chrome_driver)
+
+    def warm_up(self, count: Optional[int] = None) -> int:
+        """
+        預先啟動瀏覽器直到池中有 count 個（預設為 size）
+
+        Returns:
+            int: 這次啟動的瀏覽器數量
+        """
+        if not self.enabled:
+            return 0
+        target = min(self.size, count if count is not None else self.size)
+        started = 0
+        while True:
+            with self._cond:
+                if self._closed or self._total >= target:
+                    return started
+                self._total += 1
+            browser = self._start()
+            started += 1
+            with self._cond:
+                self._idle.append(browser)
+                self._cond.notify()
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledBrowser:
+        """
+        借出一個可用的瀏覽器
+
+        Args:
+            timeout (float, optional): 所有瀏覽器都被借出時最多等待的秒數，預設為 lease_timeout
+
+        Raises:
+            BrowserPoolExhausted: 等待逾時
+        """
+        wait_start = time.time()
+        deadline = wait_start + (self.lease_timeout if timeout is None else timeout)
+        while True:
+            browser = None
+            with self._cond:
+                expired = self._pop_expired()
+                while not expired and not self._idle and self._total >= self.size:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise BrowserPoolExhausted(f"等待瀏覽器逾時（{self.size} 個都在使用中）")
+                    self._cond.wait(remaining)
+                if not expired:
+                    if self._idle:
+                        browser = self._idle.pop()  # 最近使用的瀏覽器快取最熱
+                    else:
+                        self._total += 1
+            if expired:
+                # 先關閉閒置過久的瀏覽器釋放名額再重新借用
+                for stale in expired:
+                    self._discard(stale, 'idle')
+                continue
+
+            if browser is None:
+                self.wait_seconds += time.time() - wait_start
+                return self._start()
+            if self._healthy(browser):
+                self.wait_seconds += time.time() - wait_start
+                self.reused += 1
+                return browser
+            self._discard(browser, 'unhealthy')
+
+    def release(self, browser: PooledBrowser):
+        """歸還瀏覽器，需要回收時關閉並在背景啟動替代的瀏覽器"""
+        browser.pages += 1
+        browser.last_used = time.time()
+        reason = None
+        if self._closed:
+            reason = 'closed'
+        elif self.max_pages and browser.pages >= self.max_pages:
+            reason = 'pages'
+        elif self.max_memory_mb and (browser.memory_mb() or 0) > self.max_memory_mb:
+            reason = 'memory'
+        elif not self._reset(browser):
+            reason = 'unhealthy'
+
+        if reason:
+            self._discard(browser, reason)
+            if reason != 'closed':
+                threading.Thread(target=self._replenish, name="browser-pool-warm", daemon=True).start()
+            return
+        with self._cond:
+            self._idle.append(browser)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        """
+        借用瀏覽器的區塊，結束時自動歸還
+
+            with browser_pool.lease() as driver:
+                driver.get(url)
+        """
+        browser = self.acquire(timeout)
+        try:
+            yield browser.driver
+        finally:
+            self.release(browser)
+
+    def close(self):
+        """關閉所有閒置的瀏覽器，借出中的瀏覽器在歸還時關閉"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for browser in idle:
+            self._discard(browser, 'closed')
+
+    def stats(self) -> Dict:
+        """瀏覽器池統計"""
+        with self._cond:
+            idle = len(self._idle)
+            total = self._total
+        return {
+            'enabled': self.enabled,
+            'size': self.size,
+            'browsers': total,
+            'idle': idle,
+            'leased': total - idle,
+            'created': self.created,
+            'reused': self.reused,
+            'avg_start_seconds': round(self.start_seconds / self.created, 3) if self.created else None,
+            'wait_seconds': round(self.wait_seconds, 3),
+            'evicted': dict(self.evicted),
+            'max_pages': self.max_pages,
+            'max_memory_mb': self.max_memory_mb
+        }
+
+    def _start(self) -> PooledBrowser:
+        """啟動新的瀏覽器（呼叫前已預留名額，失敗時釋放）"""
+        start = time.time()
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        elapsed = time.time() - start
+        with self._cond:
+            self._next_id += 1
+            browser_id = self._next_id
+            self.created += 1
+            self.start_seconds += elapsed
+        print(f"瀏覽器池啟動瀏覽器 #{browser_id}，耗時 {elapsed:.2f} 秒")
+        return PooledBrowser(driver, browser_id)
+
+    def _replenish(self):
+        try:
+            self.warm_up()
+        except Exception as e:
+            print(f"瀏覽器池補充瀏覽器失敗: {e}")
+
+    def _pop_expired(self) -> List[PooledBrowser]:
+        """取出閒置過久的瀏覽器（需持有鎖）"""
+        if not self.idle_timeout:
+            return []
+        now = time.time()
+        expired = [b for b in self._idle if now - b.last_used > self.idle_timeout]
+        if expired:
+            self._idle = [b for b in self._idle if b not in expired]
+        return expired
+
+    @staticmethod
+    def _healthy(browser: PooledBrowser) -> bool:
+        try:
+            return browser.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(browser: PooledBrowser) -> bool:
+        """清除 cookies 與隱含等待並回到空白頁，讓下一個借用者從乾淨的狀態開始"""
+        driver = browser.driver
+        try:
+            try:
+                driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            except Exception:
+                driver.delete_all_cookies()
+            driver.implicitly_wait(0)
+            driver.get(BLANK_PAGE)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, browser: PooledBrowser, reason: str):
+        """關閉瀏覽器並釋放名額"""
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            print(f"關閉瀏覽器 #{browser.browser_id} 時發生錯誤: {e}")
+        with self._cond:
+            self._total -= 1
+            self.evicted[reason] += 1
+            self._cond.notify()
+        print(f"瀏覽器池關閉瀏覽器 #{browser.browser_id}（{reason}，已處理 {browser.pages} 頁）")
+
+
+# 全域瀏覽器池實例
+browser_pool = BrowserPool()
+atexit.register(browser_pool.close)
@@ -0,0 +1,151 @@
+"""
+爬取結果快取
+以 crawl_sessions / products 資料表中最近一次的成功爬取作為快取，
+相同平台、關鍵字、價格範圍與數量的搜尋在有效期限內不再對外發送請求
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .database import get_db_connection
+from .product import Product
+
+# 快取新鮮期限（秒），0 表示停用快取
+DEFAULT_CACHE_TTL = int(os.getenv('CRAWL_CACHE_TTL', '600'))
+# 超過新鮮期限後仍可先回傳舊結果並在背景更新的期限（秒）
+DEFAULT_STALE_TTL = int(os.getenv('CRAWL_CACHE_STALE_TTL', '3600'))
+
+CACHE_FRESH = 'fresh'
+CACHE_STALE = 'stale'
+
+
+def normalize_keyword(keyword: str) -> str:
+    """將關鍵字轉為小寫並合併多餘空白"""
+    return ' '.join((keyword or '').lower().split())
+
+
+def make_cache_key(platform: str, keyword: str, min_price: int, max_price: int, max_products: int) -> str:
+    """產生平台爬取結果的快取鍵"""
+    return f"{platform}|{normalize_keyword(keyword)}|{int(min_price)}|{int(max_price)}|{int(max_products)}"
+
+
+class CrawlResultCache:
+    """
+    爬取結果快取
+
+    lookup 回傳 (商品列表, 狀態, 取得時間)：
+    fresh 表示仍在新鮮期限內，stale 表示已過期但仍可使用，呼叫端應在背景重新爬取。
+    同一個快取鍵同時只會有一個背景更新。
+    """
+
+    def __init__(self, ttl: int = DEFAULT_CACHE_TTL, stale_ttl: int = DEFAULT_STALE_TTL):
+        """
+        初始化爬取結果快取
+
+        Args:
+            ttl (int): 新鮮期限秒數，0 表示停用
+            stale_ttl (int): 過期後仍可回傳舊結果的秒數
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def lookup(self, platform: str, keyword: str, min_price: int, max_price: int,
+               max_products: int) -> Optional[Tuple[List[Product], str, datetime]]:
+        """
+        查詢最近一次成功爬取的結果
+
+        Returns:
+            Optional[Tuple[List[Product], str, datetime]]: (商品列表, fresh/stale, 取得時間)，沒有可用結果時回傳 None
+        """
+        if not self.enabled:
+            return None
+
+        cache_key = make_cache_key(platform, keyword, min_price, max_price, max_products)
+        conn = get_db_connection()
+        try:
+            row = conn.execute("""
+                SELECT sp.session_id, sp.fetched_at
+                FROM crawl_session_platforms sp
+                JOIN crawl_sessions cs ON cs.id = sp.session_id
+                WHERE sp.cache_key = ? AND sp.status = 'success'
+                ORDER BY sp.fetched_at DESC
+                LIMIT 1
+            """, (cache_key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            fetched_at = datetime.fromisoformat(row['fetched_at'])
+            age = (datetime.now() - fetched_at).total_seconds()
+            if age > self.ttl + self.stale_ttl:
+                self.misses += 1
+                return None
+
+            products = [Product.from_row(p, platform) for p in conn.execute(
+                "SELECT title, price, url, image_url FROM products WHERE session_id = ? AND platform = ? ORDER BY id",
+                (row['session_id'], platform)
+            ).fetchall()]
+        finally:
+            conn.close()
+
+        if age <= self.ttl:
+            self.hits += 1
+            return products, CACHE_FRESH, fetched_at
+        self.stale_hits += 1
+        return products, CACHE_STALE, fetched_at
+
+    def record(self, cursor, session_id: int, platform: str, keyword: str, min_price: int, max_price: int,
+               max_products: int, status: str, total_products: int, fetched_at: Optional[datetime] = None,
+               truncated: bool = False):
+        """
+        在呼叫端的交易中記錄一次平台爬取結果
+
+        從快取複製的結果應傳入原本的取得時間，避免舊資料被當成新資料。
+        因時間限制而被截斷的結果應以非 success 狀態記錄，不會被當成快取使用。
+        """
+        cursor.execute(
+            """
+            INSERT INTO crawl_session_platforms (session_id, platform, cache_key, status, total_products, fetched_at,
+                                                 truncated)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (session_id, platform, make_cache_key(platform, keyword, min_price, max_price, max_products),
+             status, total_products, (fetched_at or datetime.now()).isoformat(), int(truncated))
+        )
+
+    def begin_refresh(self, platform: str, keyword: str, min_price: int, max_price: int, max_products: int) -> bool:
+        """標記快取鍵正在背景更新，已有更新進行中時回傳 False"""
+        cache_key = make_cache_key(platform, keyword, min_price, max_price, max_products)
+        with self._lock:
+            if cache_key in self._refreshing:
+                return False
+            self._refreshing.add(cache_key)
+            return True
+
+    def end_refresh(self, platform: str, keyword: str, min_price: int, max_price: int, max_products: int):
+        """解除背景更新標記"""
+        with self._lock:
+            self._refreshing.discard(make_cache_key(platform, keyword, min_price, max_price, max_products))
+
+    def stats(self) -> Dict:
+        """快取命中統計"""
+        return {
+            'enabled': self.enabled,
+            'ttl': self.ttl,
+            'stale_ttl': self.stale_ttl,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshing': len(self._refreshing)
+        }
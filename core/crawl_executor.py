@@ -0,0 +1,155 @@
+"""
+爬蟲共用執行器
+整個行程共用一個長期存在的執行緒池，並限制整體與各平台同時執行的爬蟲數量
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# 整個行程同時執行的爬蟲數量上限
+DEFAULT_MAX_WORKERS = int(os.getenv('CRAWLER_MAX_WORKERS', '8'))
+# 單一平台同時執行的爬蟲數量上限，可用 CRAWLER_PLATFORM_CONCURRENCY_<PLATFORM> 個別覆寫
+DEFAULT_PLATFORM_LIMIT = int(os.getenv('CRAWLER_PLATFORM_CONCURRENCY', '2'))
+
+
+def load_platform_limits() -> Dict[str, int]:
+    """從環境變數讀取各平台的併發上限"""
+    prefix = 'CRAWLER_PLATFORM_CONCURRENCY_'
+    limits = {}
+    for key, value in os.environ.items():
+        if key.startswith(prefix):
+            try:
+                limits[key[len(prefix):].lower()] = max(1, int(value))
+            except ValueError:
+                print(f"警告: 無法解析 {key}={value}，應為整數")
+    return limits
+
+
+class CrawlExecutor:
+    """
+    有整體與平台併發上限的爬蟲執行器
+
+    同一平台進行中的工作達到上限時，新工作會在該平台的等待佇列中排隊，
+    直到前一個工作結束才送進執行緒池，因此單一平台的大量請求不會佔滿所有執行緒。
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, platform_limit: int = DEFAULT_PLATFORM_LIMIT,
+                 platform_limits: Optional[Dict[str, int]] = None):
+        """
+        初始化執行器
+
+        Args:
+            max_workers (int): 整體同時執行的工作上限
+            platform_limit (int): 未個別設定的平台的併發上限
+            platform_limits (Dict[str, int], optional): 各平台的併發上限
+        """
+        self.max_workers = max(1, max_workers)
+        self.platform_limit = max(1, platform_limit)
+        self.platform_limits = dict(platform_limits if platform_limits is not None else load_platform_limits())
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='crawler')
+        self._lock = threading.Lock()
+        self._running = {}
+        self._pending = {}
+        self._completed = {}
+        self._active = 0
+        self._busy_time = 0.0
+        self._started_at = time.time()
+
+    def get_platform_limit(self, platform: str) -> int:
+        """取得平台的併發上限"""
+        return self.platform_limits.get(platform, self.platform_limit)
+
+    def set_platform_limit(self, platform: str, limit: int):
+        """設定平台的併發上限，放寬時會立即送出等待中的工作"""
+        with self._lock:
+            self.platform_limits[platform] = max(1, limit)
+        self._dispatch(platform)
+
+    def submit(self, platform: str, func: Callable, *args, **kwargs) -> Future:
+        """
+        提交一個平台工作
+
+        Args:
+            platform (str): 平台名稱，用於套用平台併發上限
+            func (Callable): 要執行的函數
+
+        Returns:
+            Future: 工作結果
+        """
+        future = Future()
+        with self._lock:
+            self._pending.setdefault(platform, deque()).append((future, func, args, kwargs))
+        self._dispatch(platform)
+        return future
+
+    def _dispatch(self, platform: str):
+        """在平台未達上限時，將等待中的工作送進執行緒池"""
+        while True:
+            with self._lock:
+                pending = self._pending.get(platform)
+                if not pending or self._running.get(platform, 0) >= self.get_platform_limit(platform):
+                    return
+                future, func, args, kwargs = pending.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._running[platform] = self._running.get(platform, 0) + 1
+            self._executor.submit(self._run, platform, future, func, args, kwargs)
+
+    def _run(self, platform: str, future: Future, func: Callable, args, kwargs):
+        start = time.time()
+        with self._lock:
+            self._active += 1
+        try:
+            future.set_result(func(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._busy_time += time.time() - start
+                self._running[platform] -= 1
+                self._completed[platform] = self._completed.get(platform, 0) + 1
+            self._dispatch(platform)
+
+    def stats(self) -> Dict:
+        """
+        執行器的佇列深度與使用率
+
+        Returns:
+            Dict: 整體與各平台的已送出、等待中與已完成數量
+        """
+        with self._lock:
+            platforms = set(self._running) | set(self._pending) | set(self._completed)
+            per_platform = {
+                platform: {
+                    'in_flight': self._running.get(platform, 0),
+                    'pending': len(self._pending.get(platform, ())),
+                    'completed': self._completed.get(platform, 0),
+                    'limit': self.get_platform_limit(platform)
+                }
+                for platform in sorted(platforms)
+            }
+            uptime = max(time.time() - self._started_at, 1e-9)
+            return {
+                'max_workers': self.max_workers,
+                'active': self._active,
+                # 平台等待佇列加上已送出但還在等待執行緒的工作
+                'queued': sum(p['pending'] for p in per_platform.values())
+                          + max(0, sum(p['in_flight'] for p in per_platform.values()) - self._active),
+                'utilization': self._active / self.max_workers,
+                'average_utilization': self._busy_time / (uptime * self.max_workers),
+                'platforms': per_platform
+            }
+
+    def shutdown(self, wait: bool = True):
+        """取消等待中的工作並關閉執行緒池"""
+        with self._lock:
+            pending = [item for queue in self._pending.values() for item in queue]
+            self._pending.clear()
+        for future, _, _, _ in pending:
+            future.cancel()
+        self._executor.shutdown(wait=wait)
@@ -1,69 +1,60 @@
 import os
 import time
 import uuid
-from typing import List, Dict, Optional
+import asyncio
+import threading
+import contextvars
+from typing import List, Dict, Optional, Iterator, Callable
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import importlib.util
+from concurrent.futures import as_completed, TimeoutError as FuturesTimeoutError
 import sys
 from .database import get_db_connection
+from .http_client import AsyncHttpClient
+from .crawl_executor import CrawlExecutor
+from .crawl_cache import CrawlResultCache, CACHE_STALE
+from .crawler_registry import CrawlerRegistry, crawler_registry
+from .resilience import CircuitOpenError, resilience
+from .deadline import DEADLINE_GRACE, Deadline, deadline_scope
+from .product import Product, as_products
 
 class CrawlerManager:
     """爬蟲管理器 - 統一管理所有爬蟲的執行並存入資料庫"""
     
-    def __init__(self, crawlers_dir: str = None):
+    def __init__(self, crawlers_dir: str = None, executor: Optional[CrawlExecutor] = None,
+                 cache: Optional[CrawlResultCache] = None, registry: Optional[CrawlerRegistry] = None):
         """
         初始化爬蟲管理器
         
         Args:
-            crawlers_dir (str): 爬蟲檔案目錄
+            crawlers_dir (str): 爬蟲檔案目錄，None 表示使用共用登錄表的預設目錄
+            executor (CrawlExecutor, optional): 共用的爬蟲執行器，None 表示依環境變數設定自行建立
+            cache (CrawlResultCache, optional): 爬取結果快取，None 表示依環境變數設定自行建立
+            registry (CrawlerRegistry, optional): 爬蟲登錄表，None 表示使用整個行程共用的登錄表
         """
-        if crawlers_dir is None:
-            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            crawlers_dir = os.path.join(project_root, "crawlers")
-        self.crawlers_dir = crawlers_dir
-        self.crawlers = {}
-        
-        # 自動載入爬蟲
-        self._load_crawlers()
-
-    def _load_crawlers(self):
-        """自動載入crawlers目錄中的所有爬蟲模組"""
-        if not os.path.exists(self.crawlers_dir):
-            print(f"警告: 爬蟲目錄 {self.crawlers_dir} 不存在")
-            return
-        
-        for filename in os.listdir(self.crawlers_dir):
-            if filename.startswith("crawler_") and filename.endswith(".py"):
-                platform = filename.replace("crawler_", "").replace(".py", "")
-                
-                # 跳過 yahoo_rushbuy 和 pchome_onsale，它們只用於每日促銷
-                if platform in ['yahoo_rushbuy', 'pchome_onsale']:
-                    continue
-                    
-                module_path = os.path.join(self.crawlers_dir, filename)
-                
-                try:
-                    # 動態載入模組
-                    spec = importlib.util.spec_from_file_location(f"crawler_{platform}", module_path)
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-                    
-                    # 檢查模組是否有run函數
-                    if hasattr(module, 'run'):
-                        self.crawlers[platform] = module.run
-                        print(f"成功載入爬蟲: {platform}")
-                    else:
-                        print(f"警告: {filename} 沒有run函數")
-                        
-                except Exception as e:
-                    print(f"載入爬蟲 {filename} 失敗: {e}")
+        if registry is None:
+            registry = crawler_registry if crawlers_dir is None else CrawlerRegistry(crawlers_dir)
+        self.registry = registry
+        self.crawlers_dir = registry.crawlers_dir
+        # 平台模組在第一次執行該平台時才載入；沒有 run_async / run_stream 的平台會改用 run
+        self.crawlers = registry.entry_points('run')
+        self.async_crawlers = registry.entry_points('run_async')
+        self.stream_crawlers = registry.entry_points('run_stream')
+        # 所有呼叫共用同一個執行器，整體與各平台的併發數量不會隨同時進行的任務數增加
+        self.executor = executor or CrawlExecutor()
+        self.cache = cache or CrawlResultCache()
+        # 串流模式下多條執行緒同時寫入 SQLite，以鎖避免 database is locked
+        self._db_lock = threading.Lock()
     
     def list_crawlers(self) -> List[str]:
         """列出所有可用的爬蟲"""
         return list(self.crawlers.keys())
 
-    def run_single_crawler(self, platform: str, keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999) -> Dict:
+    def executor_stats(self) -> Dict:
+        """共用執行器的佇列深度與使用率"""
+        return self.executor.stats()
+
+    def run_single_crawler(self, platform: str, keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
+                           use_cache: bool = True, deadline: Optional[Deadline] = None) -> Dict:
         """
         執行單個爬蟲
         
@@ -73,18 +64,32 @@ class CrawlerManager:
             max_products (int): 最大商品數量
             min_price (int): 最低價格範圍
             max_price (int): 最高價格範圍
+            use_cache (bool): 是否優先使用爬取結果快取
+            deadline (Deadline, optional): 爬取截止時間，時間用完時回傳已取得的頁面並標記 truncated
         Returns:
             Dict: 爬蟲結果
         """
         if platform not in self.crawlers:
             raise ValueError(f"不支援的平台: {platform}")
         
+        if use_cache:
+            cached = self._cached_result(platform, keyword, max_products, min_price, max_price)
+            if cached is not None:
+                return cached
+        
+        skipped = self._circuit_open_result(platform, keyword)
+        if skipped is not None:
+            return skipped
+        
         print(f"開始執行 {platform} 爬蟲，關鍵字: {keyword}")
         start_time = time.time()
+        failures_before = resilience.failure_count(platform)
+        scope = deadline.for_platform() if deadline else None
         
         try:
             # 呼叫對應平台的爬蟲函數
-            products = self.crawlers[platform](keyword, max_products, min_price, max_price)
+            with deadline_scope(scope):
+                products = as_products(self.crawlers[platform](keyword, max_products, min_price, max_price), platform)
 
             result = {
                 "platform": platform,
@@ -93,7 +98,9 @@ class CrawlerManager:
                 "products": products,
                 "crawl_time": datetime.now().isoformat(),
                 "execution_time": time.time() - start_time,
-                "status": "success"
+                "status": "success",
+                "partial": self._had_request_errors(platform, failures_before),
+                "truncated": self._was_truncated(platform, scope)
             }
             
             print(f"{platform} 爬蟲完成，獲取 {len(products)} 個商品")
@@ -113,16 +120,23 @@ class CrawlerManager:
             }
 
     def run_all_crawlers(self, keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
-                        platforms: Optional[List[str]] = None) -> int:
+                        platforms: Optional[List[str]] = None, use_cache: bool = True,
+                        deadline: Optional[float] = None, timeout_s: Optional[float] = None) -> int:
         """
         同時執行所有爬蟲並將結果存入資料庫
         
+        指定 deadline 或 timeout_s 時，各平台在時間用完後停止分頁並保留已取得的商品，
+        結果標記 truncated；超過時間仍未結束的平台不再等待，記錄為錯誤。
+        
         Args:
             keyword (str): 搜索關鍵字
             max_products (int): 每個平台的最大商品數量
             platforms (List[str], optional): 指定要執行的平台，None表示全部
             min_price (int): 最低價格範圍
             max_price (int): 最高價格範圍
+            use_cache (bool): 是否優先使用爬取結果快取
+            deadline (float, optional): 爬取截止時間（time.time() 的時間戳）
+            timeout_s (float, optional): 從現在起算的爬取時間上限（秒）
             
         Returns:
             int: 本次爬取任務的 session_id
@@ -132,32 +146,30 @@ class CrawlerManager:
         
         print(f"開始同時執行 {len(platforms)} 個爬蟲，關鍵字: {keyword}")
         start_time = time.time()
+        crawl_deadline = Deadline.from_params(deadline, timeout_s)
         
         results = {}
         
-        with ThreadPoolExecutor(max_workers=len(platforms)) as executor:
-            future_to_platform = {
-                executor.submit(self.run_single_crawler, platform, keyword, max_products, min_price, max_price): platform
-                for platform in platforms
-            }
-            
-            for future in as_completed(future_to_platform):
+        future_to_platform = {
+            self.executor.submit(platform, self.run_single_crawler, platform, keyword, max_products, min_price, max_price,
+                                 use_cache, crawl_deadline): platform
+            for platform in platforms
+        }
+        
+        try:
+            for future in as_completed(future_to_platform, timeout=self._wait_timeout(crawl_deadline)):
                 platform = future_to_platform[future]
                 try:
                     result = future.result()
                     results[platform] = result
                 except Exception as e:
                     print(f"{platform} 爬蟲執行異常: {e}")
-                    results[platform] = {
-                        "platform": platform,
-                        "keyword": keyword,
-                        "total_products": 0,
-                        "products": [],
-                        "crawl_time": datetime.now().isoformat(),
-                        "execution_time": time.time() - start_time,
-                        "status": "error",
-                        "error": str(e)
-                    }
+                    results[platform] = self._error_result(platform, keyword, e, time.time() - start_time)
+        except FuturesTimeoutError:
+            for future, platform in future_to_platform.items():
+                if platform not in results:
+                    future.cancel()
+                    results[platform] = self._overdue_result(platform, keyword, time.time() - start_time)
         
         total_time = time.time() - start_time
         total_products = sum(result.get("total_products", 0) for result in results.values())
@@ -165,11 +177,573 @@ class CrawlerManager:
         print(f"所有爬蟲執行完成，總共獲取 {total_products} 個商品，耗時 {total_time:.2f} 秒")
         
         # 將結果存入資料庫
-        session_id = self._save_results_to_db(keyword, results, platforms)
+        session_id = self._save_results_to_db(keyword, results, platforms, max_products, min_price, max_price)
+        
+        return session_id
+
+    async def run_single_crawler_async(self, platform: str, keyword: str, max_products: int = 100, min_price: int = 0,
+                                       max_price: int = 999999, client: AsyncHttpClient = None,
+                                       use_cache: bool = True, deadline: Optional[Deadline] = None) -> Dict:
+        """
+        run_single_crawler 的非同步版本
+
+        Args:
+            platform (str): 平台名稱
+            keyword (str): 搜索關鍵字
+            max_products (int): 最大商品數量
+            min_price (int): 最低價格範圍
+            max_price (int): 最高價格範圍
+            client (AsyncHttpClient, optional): 共用的非同步 HTTP 客戶端
+            use_cache (bool): 是否優先使用爬取結果快取
+            deadline (Deadline, optional): 爬取截止時間
+        Returns:
+            Dict: 爬蟲結果
+        """
+        if platform not in self.crawlers:
+            raise ValueError(f"不支援的平台: {platform}")
+        
+        if use_cache:
+            loop = asyncio.get_running_loop()
+            cached = await loop.run_in_executor(
+                None, self._cached_result, platform, keyword, max_products, min_price, max_price
+            )
+            if cached is not None:
+                return cached
+        
+        skipped = self._circuit_open_result(platform, keyword)
+        if skipped is not None:
+            return skipped
+        
+        print(f"開始執行 {platform} 非同步爬蟲，關鍵字: {keyword}")
+        start_time = time.time()
+        failures_before = resilience.failure_count(platform)
+        scope = deadline.for_platform() if deadline else None
+        
+        try:
+            # Task 內設定的截止時間只影響這個平台；同步爬蟲在執行緒中執行，需複製 contextvars
+            with deadline_scope(scope):
+                if platform in self.async_crawlers:
+                    products = await self.async_crawlers[platform](keyword, max_products, min_price, max_price, client=client)
+                else:
+                    products = await asyncio.wrap_future(self.executor.submit(
+                        platform, contextvars.copy_context().run, self.crawlers[platform],
+                        keyword, max_products, min_price, max_price
+                    ))
+
+            products = as_products(products, platform)
+            print(f"{platform} 爬蟲完成，獲取 {len(products)} 個商品")
+            return {
+                "platform": platform,
+                "keyword": keyword,
+                "total_products": len(products),
+                "products": products,
+                "crawl_time": datetime.now().isoformat(),
+                "execution_time": time.time() - start_time,
+                "status": "success",
+                "partial": self._had_request_errors(platform, failures_before),
+                "truncated": self._was_truncated(platform, scope)
+            }
+            
+        except Exception as e:
+            print(f"{platform} 爬蟲執行失敗: {e}")
+            return {
+                "platform": platform,
+                "keyword": keyword,
+                "total_products": 0,
+                "products": [],
+                "crawl_time": datetime.now().isoformat(),
+                "execution_time": time.time() - start_time,
+                "status": "error",
+                "error": str(e)
+            }
+
+    async def run_all_crawlers_async(self, keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
+                                     platforms: Optional[List[str]] = None, client: AsyncHttpClient = None,
+                                     use_cache: bool = True, deadline: Optional[float] = None,
+                                     timeout_s: Optional[float] = None) -> int:
+        """
+        run_all_crawlers 的非同步版本：所有平台在同一個事件迴圈中執行並共用一個 HTTP 連線池
+        
+        多個關鍵字可以傳入同一個 client 後以 asyncio.gather 同時執行。
+        
+        Args:
+            keyword (str): 搜索關鍵字
+            max_products (int): 每個平台的最大商品數量
+            min_price (int): 最低價格範圍
+            max_price (int): 最高價格範圍
+            platforms (List[str], optional): 指定要執行的平台，None表示全部
+            client (AsyncHttpClient, optional): 共用的非同步 HTTP 客戶端，None 表示自行建立
+            use_cache (bool): 是否優先使用爬取結果快取
+            deadline (float, optional): 爬取截止時間（time.time() 的時間戳）
+            timeout_s (float, optional): 從現在起算的爬取時間上限（秒）
+            
+        Returns:
+            int: 本次爬取任務的 session_id
+        """
+        if platforms is None:
+            platforms = list(self.crawlers.keys())
+        
+        if client is None:
+            async with AsyncHttpClient() as own_client:
+                return await self.run_all_crawlers_async(keyword, max_products, min_price, max_price, platforms, own_client,
+                                                         use_cache, deadline, timeout_s)
+        
+        print(f"開始非同步執行 {len(platforms)} 個爬蟲，關鍵字: {keyword}")
+        start_time = time.time()
+        crawl_deadline = Deadline.from_params(deadline, timeout_s)
+        
+        tasks = [
+            asyncio.ensure_future(self.run_single_crawler_async(platform, keyword, max_products, min_price, max_price,
+                                                                client=client, use_cache=use_cache,
+                                                                deadline=crawl_deadline))
+            for platform in platforms
+        ]
+        _, overdue = await asyncio.wait(tasks, timeout=self._wait_timeout(crawl_deadline))
+        for task in overdue:
+            task.cancel()
+        
+        results = {}
+        for platform, task in zip(platforms, tasks):
+            if task in overdue:
+                result = self._overdue_result(platform, keyword, time.time() - start_time)
+            elif task.exception() is not None:
+                print(f"{platform} 爬蟲執行異常: {task.exception()}")
+                result = self._error_result(platform, keyword, task.exception(), time.time() - start_time)
+            else:
+                result = task.result()
+            results[platform] = result
+        
+        total_time = time.time() - start_time
+        total_products = sum(result.get("total_products", 0) for result in results.values())
+        print(f"所有爬蟲執行完成，總共獲取 {total_products} 個商品，耗時 {total_time:.2f} 秒")
+        
+        # SQLite 寫入是阻塞操作，交給執行緒處理以免卡住事件迴圈
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self._save_results_to_db, keyword, results, platforms, max_products, min_price, max_price
+        )
+
+    def stream_crawler(self, platform: str, keyword: str, max_products: int = 100, min_price: int = 0,
+                       max_price: int = 999999) -> Iterator[List[Dict]]:
+        """
+        逐頁產生單一平台的商品
+
+        Args:
+            platform (str): 平台名稱
+            keyword (str): 搜索關鍵字
+            max_products (int): 最大商品數量
+            min_price (int): 最低價格範圍
+            max_price (int): 最高價格範圍
+        Yields:
+            List[Dict]: 單頁的商品列表
+        """
+        if platform not in self.crawlers:
+            raise ValueError(f"不支援的平台: {platform}")
+        
+        if platform in self.stream_crawlers:
+            yield from self.stream_crawlers[platform](keyword, max_products, min_price, max_price)
+        else:
+            yield self.crawlers[platform](keyword, max_products, min_price, max_price)
+
+    def run_all_crawlers_streaming(self, keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
+                                   platforms: Optional[List[str]] = None,
+                                   on_page: Optional[Callable[[str, List[Dict]], None]] = None,
+                                   on_platform_done: Optional[Callable[[str, Dict], None]] = None,
+                                   use_cache: bool = True, deadline: Optional[float] = None,
+                                   timeout_s: Optional[float] = None) -> int:
+        """
+        run_all_crawlers 的串流版本：每取得一頁商品就以小交易寫入資料庫
+        
+        session 一開始就以 running 狀態建立，較慢的平台仍在分頁時，已寫入的商品即可查詢；
+        記憶體中同時只保留每個平台正在處理的一頁。
+        
+        Args:
+            keyword (str): 搜索關鍵字
+            max_products (int): 每個平台的最大商品數量
+            min_price (int): 最低價格範圍
+            max_price (int): 最高價格範圍
+            platforms (List[str], optional): 指定要執行的平台，None表示全部
+            on_page (Callable, optional): 每頁寫入後呼叫 on_page(platform, products)
+            on_platform_done (Callable, optional): 每個平台結束時呼叫 on_platform_done(platform, summary)，
+                summary 與 run_single_crawler 的結果格式相同但不含 products
+            use_cache (bool): 是否優先使用爬取結果快取
+            deadline (float, optional): 爬取截止時間（time.time() 的時間戳）
+            timeout_s (float, optional): 從現在起算的爬取時間上限（秒）
+            
+        Returns:
+            int: 本次爬取任務的 session_id
+        """
+        if platforms is None:
+            platforms = list(self.crawlers.keys())
+        
+        print(f"開始串流執行 {len(platforms)} 個爬蟲，關鍵字: {keyword}")
+        start_time = time.time()
+        crawl_deadline = Deadline.from_params(deadline, timeout_s)
+        session_id = self._create_session(keyword, platforms, "running", max_products, min_price, max_price)
+        
+        totals = {}
+        failed_crawlers = 0
+        future_to_platform = {
+            self.executor.submit(platform, self._stream_to_session, session_id, platform, keyword,
+                                 max_products, min_price, max_price, on_page, use_cache, crawl_deadline): platform
+            for platform in platforms
+        }
+        done_platforms = set()
+        
+        def report(platform: str, summary: Dict):
+            done_platforms.add(platform)
+            if on_platform_done is not None:
+                on_platform_done(platform, summary)
+        
+        try:
+            for future in as_completed(future_to_platform, timeout=self._wait_timeout(crawl_deadline)):
+                platform = future_to_platform[future]
+                summary = {
+                    "platform": platform,
+                    "keyword": keyword,
+                    "crawl_time": datetime.now().isoformat()
+                }
+                try:
+                    totals[platform], execution_time, truncated = future.result()
+                    summary.update(total_products=totals[platform], execution_time=execution_time, status="success",
+                                   truncated=truncated)
+                except Exception as e:
+                    print(f"{platform} 爬蟲執行失敗: {e}")
+                    failed_crawlers += 1
+                    summary.update(total_products=0, execution_time=time.time() - start_time, status="error", error=str(e))
+                report(platform, summary)
+        except FuturesTimeoutError:
+            for future, platform in future_to_platform.items():
+                if platform not in done_platforms:
+                    future.cancel()
+                    failed_crawlers += 1
+                    summary = self._overdue_result(platform, keyword, time.time() - start_time)
+                    summary.pop("products")
+                    report(platform, summary)
         
+        status = self._session_status(failed_crawlers, len(platforms))
+        total_products = sum(totals.values())
+        self._finish_session(session_id, status, total_products)
+        print(f"所有爬蟲執行完成，總共寫入 {total_products} 個商品，耗時 {time.time() - start_time:.2f} 秒")
         return session_id
 
-    def _save_results_to_db(self, keyword: str, results: Dict[str, Dict], platforms: List[str]) -> int:
+    def run_keywords(self, keywords: List[str], platforms: Optional[List[str]] = None, max_products: int = 100,
+                     min_price: int = 0, max_price: int = 999999, use_cache: bool = True) -> Dict[str, int]:
+        """
+        批次爬取多個關鍵字，每個關鍵字各自建立一個 session
+        
+        所有「關鍵字 × 平台」組合一次提交到共用執行器，依各平台的併發上限排隊，
+        較快的平台完成一個關鍵字後會直接接著處理下一個，不必等待最慢的平台。
+        
+        Args:
+            keywords (List[str]): 搜索關鍵字列表（重複的會合併）
+            platforms (List[str], optional): 指定要執行的平台，None表示全部
+            max_products (int): 每個平台每個關鍵字的最大商品數量
+            min_price (int): 最低價格範圍
+            max_price (int): 最高價格範圍
+            use_cache (bool): 是否優先使用爬取結果快取
+            
+        Returns:
+            Dict[str, int]: 關鍵字對應的 session_id
+        """
+        if platforms is None:
+            platforms = list(self.crawlers.keys())
+        keywords = list(dict.fromkeys(keywords))
+        
+        print(f"開始批次爬取 {len(keywords)} 個關鍵字 × {len(platforms)} 個平台")
+        start_time = time.time()
+        sessions = {
+            keyword: self._create_session(keyword, platforms, "running", max_products, min_price, max_price)
+            for keyword in keywords
+        }
+        
+        # 依關鍵字順序提交，每個平台的等待佇列會依序處理各關鍵字
+        future_to_pair = {
+            self.executor.submit(platform, self._stream_to_session, sessions[keyword], platform, keyword,
+                                 max_products, min_price, max_price, use_cache=use_cache): (keyword, platform)
+            for keyword in keywords
+            for platform in platforms
+        }
+        
+        remaining = {keyword: len(platforms) for keyword in keywords}
+        totals = {keyword: 0 for keyword in keywords}
+        failures = {keyword: 0 for keyword in keywords}
+        for future in as_completed(future_to_pair):
+            keyword, platform = future_to_pair[future]
+            try:
+                inserted, _, _ = future.result()
+                totals[keyword] += inserted
+            except Exception as e:
+                print(f"{platform} 爬蟲執行失敗 (關鍵字: {keyword}): {e}")
+                failures[keyword] += 1
+            
+            remaining[keyword] -= 1
+            if remaining[keyword] == 0:
+                status = self._session_status(failures[keyword], len(platforms))
+                self._finish_session(sessions[keyword], status, totals[keyword])
+                print(f"關鍵字 '{keyword}' 爬取完成，寫入 {totals[keyword]} 個商品，session_id: {sessions[keyword]}")
+        
+        print(f"批次爬取完成，總共寫入 {sum(totals.values())} 個商品，耗時 {time.time() - start_time:.2f} 秒")
+        return sessions
+
+    def _stream_to_session(self, session_id: int, platform: str, keyword: str, max_products: int, min_price: int,
+                           max_price: int, on_page: Optional[Callable[[str, List[Dict]], None]] = None,
+                           use_cache: bool = True, deadline: Optional[Deadline] = None) -> tuple:
+        """
+        逐頁執行單一平台的爬蟲並寫入指定 session（快取命中時直接寫入快取的商品）
+
+        有截止時間時，時間用完後不再取下一頁，已寫入的商品保留並標記 truncated。
+
+        Returns:
+            tuple: (寫入的商品數, 執行秒數, 是否因時間限制而被截斷)
+        """
+        platform_start = time.time()
+        fetched_at = datetime.now()
+        
+        if use_cache:
+            cached = self._cached_result(platform, keyword, max_products, min_price, max_price)
+            if cached is not None:
+                inserted = self._insert_products(session_id, platform, cached["products"])
+                if on_page is not None:
+                    on_page(platform, cached["products"])
+                self._record_platform(session_id, platform, keyword, max_products, min_price, max_price,
+                                      "success", inserted, datetime.fromisoformat(cached["crawl_time"]))
+                return inserted, time.time() - platform_start, False
+        
+        # 平台連續失敗而暫停中時直接略過，不必等待逾時
+        retry_in = resilience.breaker.retry_in(platform)
+        if retry_in > 0:
+            raise CircuitOpenError(platform, retry_in)
+        
+        inserted = 0
+        failures_before = resilience.failure_count(platform)
+        scope = deadline.for_platform() if deadline else None
+        with deadline_scope(scope):
+            pages = self.stream_crawler(platform, keyword, max_products, min_price, max_price)
+            try:
+                for page_products in pages:
+                    page_products = as_products(page_products, platform)
+                    inserted += self._insert_products(session_id, platform, page_products)
+                    if on_page is not None:
+                        on_page(platform, page_products)
+                    if scope is not None and scope.expired():
+                        scope.truncated = True
+                        break
+            except Exception:
+                self._record_platform(session_id, platform, keyword, max_products, min_price, max_price,
+                                      "error", inserted, fetched_at)
+                raise
+            finally:
+                pages.close()
+        partial = self._had_request_errors(platform, failures_before)
+        truncated = self._was_truncated(platform, scope)
+        self._record_platform(session_id, platform, keyword, max_products, min_price, max_price,
+                              "partial" if partial or truncated else "success", inserted, fetched_at, truncated)
+        print(f"{platform} 爬蟲完成，寫入 {inserted} 個商品")
+        return inserted, time.time() - platform_start, truncated
+
+    def _circuit_open_result(self, platform: str, keyword: str) -> Optional[Dict]:
+        """平台斷路器開啟中時回傳略過的錯誤結果，否則回傳 None"""
+        retry_in = resilience.breaker.retry_in(platform)
+        if retry_in <= 0:
+            return None
+        error = CircuitOpenError(platform, retry_in)
+        print(f"略過 {platform} 爬蟲: {error}")
+        return {
+            "platform": platform,
+            "keyword": keyword,
+            "total_products": 0,
+            "products": [],
+            "crawl_time": datetime.now().isoformat(),
+            "execution_time": 0.0,
+            "status": "error",
+            "error": str(error)
+        }
+
+    def _had_request_errors(self, platform: str, failures_before: int) -> bool:
+        """
+        爬取期間平台是否發生請求錯誤
+
+        爬蟲遇到請求錯誤時會停止分頁並回傳已取得的商品，這類不完整的結果
+        以 partial 狀態記錄，不會被當成快取使用。同一平台同時有其他爬取時可能誤判為不完整。
+        """
+        if resilience.failure_count(platform) <= failures_before:
+            return False
+        print(f"⚠️ {platform} 爬取期間發生請求錯誤，結果可能不完整")
+        return True
+
+    @staticmethod
+    def _was_truncated(platform: str, scope: Optional[Deadline]) -> bool:
+        """平台爬取是否因時間限制而提早停止"""
+        if scope is None or not scope.truncated:
+            return False
+        print(f"⏱️ {platform} 已達爬取時間限制，保留已取得的商品")
+        return True
+
+    @staticmethod
+    def _wait_timeout(deadline: Optional[Deadline]) -> Optional[float]:
+        """等待所有平台結束的秒數上限：截止時間再加上讓爬蟲收尾的緩衝，沒有截止時間時不限制"""
+        return deadline.remaining() + DEADLINE_GRACE if deadline else None
+
+    @staticmethod
+    def _error_result(platform: str, keyword: str, error: Exception, execution_time: float) -> Dict:
+        """執行異常的平台結果"""
+        return {
+            "platform": platform,
+            "keyword": keyword,
+            "total_products": 0,
+            "products": [],
+            "crawl_time": datetime.now().isoformat(),
+            "execution_time": execution_time,
+            "status": "error",
+            "error": str(error)
+        }
+
+    def _overdue_result(self, platform: str, keyword: str, execution_time: float) -> Dict:
+        """超過時間限制仍未結束的平台結果（爬蟲在背景結束後結果會被捨棄）"""
+        print(f"⏱️ {platform} 超過爬取時間限制仍未結束，不再等待")
+        result = self._error_result(platform, keyword, "超過爬取時間限制仍未結束", execution_time)
+        result["truncated"] = True
+        return result
+
+    def _cached_result(self, platform: str, keyword: str, max_products: int, min_price: int,
+                       max_price: int) -> Optional[Dict]:
+        """
+        查詢爬取結果快取，過期但仍可使用的結果會在背景重新爬取
+
+        Returns:
+            Optional[Dict]: 與 run_single_crawler 相同格式的結果，沒有可用快取時回傳 None
+        """
+        cached = self.cache.lookup(platform, keyword, min_price, max_price, max_products)
+        if cached is None:
+            return None
+        
+        products, cache_status, fetched_at = cached
+        print(f"{platform} 使用快取結果 ({cache_status})，關鍵字: {keyword}，{len(products)} 個商品")
+        if cache_status == CACHE_STALE and self.cache.begin_refresh(platform, keyword, min_price, max_price, max_products):
+            self.executor.submit(platform, self._refresh_cache, platform, keyword, max_products, min_price, max_price)
+        
+        return {
+            "platform": platform,
+            "keyword": keyword,
+            "total_products": len(products),
+            "products": products,
+            "crawl_time": fetched_at.isoformat(),
+            "execution_time": 0,
+            "status": "success",
+            "cached": True,
+            "cache_status": cache_status
+        }
+
+    def _refresh_cache(self, platform: str, keyword: str, max_products: int, min_price: int, max_price: int):
+        """背景重新爬取過期的快取結果，並存成新的 session"""
+        try:
+            result = self.run_single_crawler(platform, keyword, max_products, min_price, max_price, use_cache=False)
+            if result.get("status") == "success":
+                self._save_results_to_db(keyword, {platform: result}, [platform], max_products, min_price, max_price)
+        except Exception as e:
+            print(f"背景更新 {platform} 快取失敗: {e}")
+        finally:
+            self.cache.end_refresh(platform, keyword, min_price, max_price, max_products)
+
+    def _record_platform(self, session_id: int, platform: str, keyword: str, max_products: int, min_price: int,
+                         max_price: int, status: str, total_products: int, fetched_at: datetime, truncated: bool = False):
+        """記錄單一平台的爬取結果，供爬取結果快取查詢"""
+        with self._db_lock:
+            conn = get_db_connection()
+            try:
+                self.cache.record(conn.cursor(), session_id, platform, keyword, min_price, max_price, max_products,
+                                  status, total_products, fetched_at, truncated)
+                conn.commit()
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _session_status(failed_crawlers: int, total_crawlers: int) -> str:
+        """依失敗的平台數決定 session 狀態"""
+        if failed_crawlers == total_crawlers:
+            return "failed"
+        if failed_crawlers > 0:
+            return "partial_fail"
+        return "success"
+
+    def _create_session(self, keyword: str, platforms: List[str], status: str, max_products: Optional[int] = None,
+                        min_price: Optional[int] = None, max_price: Optional[int] = None) -> int:
+        """建立爬取 session 並回傳其 id"""
+        with self._db_lock:
+            conn = get_db_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT INTO crawl_sessions (keyword, crawl_time, status, platforms, min_price, max_price, max_products)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (keyword, datetime.now(), status, ",".join(platforms), min_price, max_price, max_products)
+                )
+                conn.commit()
+                return cursor.lastrowid
+            finally:
+                conn.close()
+
+    def _insert_products(self, session_id: int, platform: str, products: List[Product]) -> int:
+        """以單一交易寫入一頁商品，回傳實際新增的筆數（同一 session 重複的網址會被忽略）"""
+        rows = [row for row in (self._build_product_row(session_id, platform, p) for p in products) if row]
+        if not rows:
+            return 0
+        with self._db_lock:
+            conn = get_db_connection()
+            try:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO products (session_id, platform, title, price, url, image_url) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.commit()
+                return conn.total_changes - before
+            finally:
+                conn.close()
+
+    def _finish_session(self, session_id: int, status: str, total_products: int):
+        """更新 session 的最終狀態與總商品數"""
+        with self._db_lock:
+            conn = get_db_connection()
+            try:
+                conn.execute(
+                    "UPDATE crawl_sessions SET status = ?, total_products = ? WHERE id = ?",
+                    (status, total_products, session_id)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _build_product_row(session_id: int, platform: str, p: Product) -> Optional[tuple]:
+        """
+        將爬蟲回傳的商品整理成 products 資料表的一列
+
+        Returns:
+            Optional[tuple]: 資料列，沒有 URL 的商品回傳 None
+        """
+        # 檢查必要欄位是否存在
+        title = p.title or "無標題商品"
+        price = p.price
+        if not price or not isinstance(price, (int, float)):
+            try:
+                price = int(float(price)) if price else 0
+            except:
+                price = 0
+                
+        url = p.url
+        if not url:
+            print(f"跳過沒有URL的商品: {title}")
+            return None  # 跳過沒有URL的商品
+        
+        return (session_id, platform, title, price, url, p.image_url or "")
+
+    def _save_results_to_db(self, keyword: str, results: Dict[str, Dict], platforms: List[str],
+                            max_products: Optional[int] = None, min_price: Optional[int] = None,
+                            max_price: Optional[int] = None) -> int:
         """
         將爬蟲結果保存到資料庫
         
@@ -177,6 +751,9 @@ class CrawlerManager:
             keyword (str): 搜索關鍵字
             results (Dict): 爬蟲結果
             platforms (List[str]): 執行的平台列表
+            max_products (int, optional): 每個平台的最大商品數量（提供爬取參數時會記錄供快取使用）
+            min_price (int, optional): 最低價格範圍
+            max_price (int, optional): 最高價格範圍
             
         Returns:
             int: 新增的 session_id
@@ -187,16 +764,15 @@ class CrawlerManager:
         successful_crawlers = [r for r in results.values() if r.get("status") == "success"]
         failed_crawlers = len(results) - len(successful_crawlers)
         
-        status = "success"
-        if failed_crawlers == len(results):
-            status = "failed"
-        elif failed_crawlers > 0:
-            status = "partial_fail"
+        status = self._session_status(failed_crawlers, len(results))
 
         # 1. 創建爬取 session
         cursor.execute(
-            "INSERT INTO crawl_sessions (keyword, crawl_time, status, platforms) VALUES (?, ?, ?, ?)",
-            (keyword, datetime.now(), status, ",".join(platforms))
+            """
+            INSERT INTO crawl_sessions (keyword, crawl_time, status, platforms, min_price, max_price, max_products)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (keyword, datetime.now(), status, ",".join(platforms), min_price, max_price, max_products)
         )
         session_id = cursor.lastrowid
         
@@ -209,29 +785,12 @@ class CrawlerManager:
                 total_products += len(products)  # 用實際商品數量而不是報告的數量
                 print(f"正在處理 {platform} 的 {len(products)} 個商品")
                 for p in products:
-                    # 檢查必要欄位是否存在
-                    title = p.get('title') or p.get('name') or "無標題商品"
-                    price = p.get('price')
-                    if not price or not isinstance(price, (int, float)):
-                        try:
-                            price = int(float(price)) if price else 0
-                        except:
-                            price = 0
-                            
-                    url = p.get('url')
-                    if not url:
-                        print(f"跳過沒有URL的商品: {title}")
-                        continue  # 跳過沒有URL的商品
+                    row = self._build_product_row(session_id, platform, p)
+                    if row is None:
+                        continue
                         
-                    print(f"準備插入商品: {title[:30]}... (平台: {platform}, 價格: {price})")
-                    products_to_insert.append((
-                        session_id,
-                        platform,
-                        title,
-                        price,
-                        url,
-                        p.get('image_url') or ""
-                    ))
+                    print(f"準備插入商品: {row[2][:30]}... (平台: {platform}, 價格: {row[3]})")
+                    products_to_insert.append(row)
 
         if products_to_insert:
             print(f"插入 {len(products_to_insert)} 個商品到資料庫")
@@ -265,6 +824,16 @@ class CrawlerManager:
             (total_products, session_id)
         )
         
+        # 4. 記錄各平台結果供爬取結果快取使用（快取複製的結果沿用原本的取得時間）
+        if None not in (max_products, min_price, max_price):
+            for platform, result in results.items():
+                fetched_at = datetime.fromisoformat(result.get("crawl_time") or datetime.now().isoformat())
+                status = result.get("status", "error")
+                if status == "success" and (result.get("partial") or result.get("truncated")):
+                    status = "partial"
+                self.cache.record(cursor, session_id, platform, keyword, min_price, max_price, max_products,
+                                  status, len(result.get("products", [])), fetched_at, result.get("truncated", False))
+        
         conn.commit()
         conn.close()
         
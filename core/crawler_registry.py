@@ -0,0 +1,226 @@
+"""
+爬蟲模組登錄表
+掃描 crawlers 目錄取得各平台的中繼資料（不匯入模組），
+平台模組在第一次使用時才載入，並在整個行程中重複使用
+"""
+
+import ast
+import os
+import threading
+import time
+import importlib.util
+from collections.abc import Mapping
+from typing import Callable, Dict, List, Optional
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CRAWLERS_DIR = os.path.join(project_root, 'crawlers')
+
+# 只用於每日促銷的爬蟲，不提供關鍵字搜尋
+DEALS_PLATFORMS = {'yahoo_rushbuy', 'pchome_onsale'}
+
+KIND_SEARCH = 'search'
+KIND_DEALS = 'deals'
+
+# 從原始碼中辨識的進入點
+ENTRY_POINTS = ('run', 'run_async', 'run_stream')
+
+
+def scan_entry_points(module_path: str) -> List[str]:
+    """解析原始碼，列出模組頂層定義的進入點函數（不執行模組）"""
+    with open(module_path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=module_path)
+    return [
+        node.name for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name in ENTRY_POINTS
+    ]
+
+
+class CrawlerRegistry:
+    """
+    延遲載入的爬蟲登錄表
+
+    platforms / info 只讀取原始碼中繼資料，不會匯入 requests、bs4、selenium 等相依套件；
+    get_module 第一次呼叫時才執行模組，之後直接回傳快取的模組。
+    載入失敗的結果同樣會被記住，不會在每次爬取時重試。
+    """
+
+    def __init__(self, crawlers_dir: str = DEFAULT_CRAWLERS_DIR):
+        """
+        初始化登錄表
+
+        Args:
+            crawlers_dir (str): 爬蟲檔案目錄
+        """
+        self.crawlers_dir = crawlers_dir
+        self._specs = None
+        self._modules = {}
+        self._errors = {}
+        self._load_times = {}
+        self._lock = threading.Lock()
+        self._platform_locks = {}
+
+    def _scan(self) -> Dict[str, Dict]:
+        """掃描爬蟲目錄（只執行一次）"""
+        if self._specs is not None:
+            return self._specs
+        with self._lock:
+            if self._specs is not None:
+                return self._specs
+            specs = {}
+            if not os.path.exists(self.crawlers_dir):
+                print(f"警告: 爬蟲目錄 {self.crawlers_dir} 不存在")
+            else:
+                for filename in sorted(os.listdir(self.crawlers_dir)):
+                    if not (filename.startswith("crawler_") and filename.endswith(".py")):
+                        continue
+                    platform = filename[len("crawler_"):-len(".py")]
+                    module_path = os.path.join(self.crawlers_dir, filename)
+                    try:
+                        entry_points = scan_entry_points(module_path)
+                    except (OSError, SyntaxError) as e:
+                        print(f"解析爬蟲 {filename} 失敗: {e}")
+                        continue
+                    if 'run' not in entry_points:
+                        print(f"警告: {filename} 沒有run函數")
+                        continue
+                    specs[platform] = {
+                        'platform': platform,
+                        'path': module_path,
+                        'kind': KIND_DEALS if platform in DEALS_PLATFORMS else KIND_SEARCH,
+                        'entry_points': entry_points
+                    }
+                    self._platform_locks[platform] = threading.Lock()
+            self._specs = specs
+            return specs
+
+    def platforms(self, kind: Optional[str] = KIND_SEARCH) -> List[str]:
+        """
+        列出平台名稱
+
+        Args:
+            kind (str, optional): search 為關鍵字搜尋爬蟲，deals 為每日促銷爬蟲，None 表示全部
+        """
+        return [p for p, spec in self._scan().items() if kind is None or spec['kind'] == kind]
+
+    def has(self, platform: str, entry_point: str = 'run') -> bool:
+        """平台是否提供指定的進入點"""
+        spec = self._scan().get(platform)
+        return spec is not None and entry_point in spec['entry_points']
+
+    def info(self, platform: Optional[str] = None):
+        """
+        取得平台中繼資料（不匯入模組）
+
+        Returns:
+            單一平台的資料字典；未指定平台時回傳所有平台的列表
+        """
+        if platform is None:
+            return [self.info(p) for p in self.platforms(kind=None)]
+        spec = self._scan().get(platform)
+        if spec is None:
+            raise ValueError(f"不支援的平台: {platform}")
+        return {
+            **spec,
+            'entry_points': list(spec['entry_points']),
+            'loaded': platform in self._modules,
+            'load_time': self._load_times.get(platform),
+            'error': self._errors.get(platform)
+        }
+
+    def get_module(self, platform: str):
+        """
+        取得平台模組，第一次呼叫時載入
+
+        Raises:
+            ValueError: 平台不存在
+            ImportError: 模組載入失敗（包含先前已失敗的情況）
+        """
+        module = self._modules.get(platform)
+        if module is not None:
+            return module
+
+        spec = self._scan().get(platform)
+        if spec is None:
+            raise ValueError(f"不支援的平台: {platform}")
+
+        with self._platform_locks[platform]:
+            if platform in self._modules:
+                return self._modules[platform]
+            if platform in self._errors:
+                raise ImportError(f"載入爬蟲 {platform} 失敗: {self._errors[platform]}")
+
+            start = time.time()
+            try:
+                module_spec = importlib.util.spec_from_file_location(f"crawler_{platform}", spec['path'])
+                module = importlib.util.module_from_spec(module_spec)
+                module_spec.loader.exec_module(module)
+            except Exception as e:
+                self._errors[platform] = str(e)
+                print(f"載入爬蟲 {platform} 失敗: {e}")
+                raise ImportError(f"載入爬蟲 {platform} 失敗: {e}") from e
+
+            self._load_times[platform] = time.time() - start
+            self._modules[platform] = module
+            print(f"成功載入爬蟲: {platform} ({self._load_times[platform]:.2f} 秒)")
+            return module
+
+    def get_entry(self, platform: str, entry_point: str = 'run') -> Callable:
+        """取得平台模組的進入點函數"""
+        return getattr(self.get_module(platform), entry_point)
+
+    def entry_points(self, entry_point: str = 'run', kind: Optional[str] = KIND_SEARCH) -> 'LazyEntryPoints':
+        """以平台名稱對應進入點函數的唯讀字典，存取時才載入模組"""
+        return LazyEntryPoints(self, entry_point, kind)
+
+    def preload(self, kind: Optional[str] = KIND_SEARCH):
+        """預先載入平台模組（例如在背景執行緒中暖機），失敗的平台會被略過"""
+        for platform in self.platforms(kind):
+            try:
+                self.get_module(platform)
+            except ImportError:
+                pass
+
+    def stats(self) -> Dict:
+        """已載入與載入失敗的平台"""
+        return {
+            'platforms': self.platforms(kind=None),
+            'loaded': sorted(self._modules),
+            'failed': dict(self._errors),
+            'load_times': dict(self._load_times)
+        }
+
+
+class LazyEntryPoints(Mapping):
+    """
+    平台名稱對應進入點函數的唯讀字典
+
+    鍵來自原始碼中繼資料，判斷平台是否存在或列出平台不會匯入模組，
+    取值時才透過登錄表載入模組。
+    """
+
+    def __init__(self, registry: CrawlerRegistry, entry_point: str, kind: Optional[str]):
+        self.registry = registry
+        self.entry_point = entry_point
+        self.kind = kind
+
+    def _platforms(self) -> List[str]:
+        return [p for p in self.registry.platforms(self.kind) if self.registry.has(p, self.entry_point)]
+
+    def __getitem__(self, platform: str) -> Callable:
+        if platform not in self:
+            raise KeyError(platform)
+        return self.registry.get_entry(platform, self.entry_point)
+
+    def __contains__(self, platform) -> bool:
+        return platform in self._platforms()
+
+    def __iter__(self):
+        return iter(self._platforms())
+
+    def __len__(self) -> int:
+        return len(self._platforms())
+
+
+# 整個行程共用的爬蟲登錄表
+crawler_registry = CrawlerRegistry()
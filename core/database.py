@@ -45,10 +45,15 @@ def create_tables(cursor):
         crawl_time DATETIME NOT NULL,
         total_products INTEGER DEFAULT 0,
         status TEXT NOT NULL,
-        platforms TEXT
+        platforms TEXT,
+        min_price INTEGER,
+        max_price INTEGER,
+        max_products INTEGER
     );
     """)
 
+    create_crawl_session_platforms_table(cursor)
+
     # 商品資訊資料表
     cursor.execute("""
     CREATE TABLE products (
@@ -102,6 +107,45 @@ def create_tables(cursor):
     cursor.execute("CREATE INDEX idx_comparison_cache_target ON product_comparison_cache (target_product_id);")
     cursor.execute("CREATE INDEX idx_comparison_cache_similarity ON product_comparison_cache (similarity);")
 
+    create_crawl_jobs_table(cursor)
+
+def create_crawl_session_platforms_table(cursor):
+    """建立各平台爬取結果資料表（爬取結果快取依此判斷新鮮度，已存在時略過）"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS crawl_session_platforms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER NOT NULL,
+        platform TEXT NOT NULL,
+        cache_key TEXT NOT NULL,
+        status TEXT NOT NULL,
+        total_products INTEGER DEFAULT 0,
+        fetched_at DATETIME NOT NULL,
+        truncated INTEGER DEFAULT 0,
+        FOREIGN KEY (session_id) REFERENCES crawl_sessions (id)
+    );
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_session_platforms_cache_key ON crawl_session_platforms (cache_key, fetched_at);")
+
+def create_crawl_jobs_table(cursor):
+    """建立背景爬蟲工作佇列資料表（已存在時略過）"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS crawl_jobs (
+        id TEXT PRIMARY KEY,
+        job_type TEXT NOT NULL,
+        params TEXT,
+        status TEXT NOT NULL,
+        progress TEXT,
+        session_id INTEGER,
+        result TEXT,
+        error TEXT,
+        created_at DATETIME NOT NULL,
+        started_at DATETIME,
+        finished_at DATETIME,
+        FOREIGN KEY (session_id) REFERENCES crawl_sessions (id)
+    );
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_crawl_jobs_status ON crawl_jobs (status);")
+
 def update_database_schema(cursor):
     """更新資料庫架構（處理現有資料庫的遷移）"""
     try:
@@ -116,6 +160,24 @@ def update_database_schema(cursor):
         if 'discount_percent' not in columns:
             print("添加 discount_percent 欄位到 daily_deals 表...")
             cursor.execute("ALTER TABLE daily_deals ADD COLUMN discount_percent REAL")
+        
+        # crawl_sessions 記錄爬取參數，供爬取結果快取比對
+        cursor.execute("PRAGMA table_info(crawl_sessions)")
+        session_columns = [row[1] for row in cursor.fetchall()]
+        for column in ('min_price', 'max_price', 'max_products'):
+            if column not in session_columns:
+                print(f"添加 {column} 欄位到 crawl_sessions 表...")
+                cursor.execute(f"ALTER TABLE crawl_sessions ADD COLUMN {column} INTEGER")
+        
+        # 各平台爬取結果與背景工作佇列資料表
+        create_crawl_session_platforms_table(cursor)
+        create_crawl_jobs_table(cursor)
+        
+        # crawl_session_platforms 記錄平台結果是否因爬取時間限制而被截斷
+        cursor.execute("PRAGMA table_info(crawl_session_platforms)")
+        if 'truncated' not in [row[1] for row in cursor.fetchall()]:
+            print("添加 truncated 欄位到 crawl_session_platforms 表...")
+            cursor.execute("ALTER TABLE crawl_session_platforms ADD COLUMN truncated INTEGER DEFAULT 0")
             
     except Exception as e:
         print(f"更新資料庫架構時發生錯誤: {e}")
@@ -0,0 +1,100 @@
+"""
+爬取時間限制
+以 contextvars 記錄目前爬取的截止時間，傳輸層據此縮短請求逾時、在時間用完時停止送出請求，
+爬蟲的分頁迴圈因請求錯誤而停止時會回傳已取得的頁面
+"""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import requests
+
+# 截止時間到了之後再等待爬蟲收尾的秒數，超過仍未結束的平台不再等待
+DEADLINE_GRACE = float(os.getenv('CRAWLER_DEADLINE_GRACE', '2'))
+
+
+class DeadlineExceeded(requests.RequestException):
+    """爬取時間已用完，請求未送出或被中斷（不計入平台的斷路器）"""
+
+
+class Deadline:
+    """
+    單一平台爬取的截止時間
+
+    傳輸層因時間用完而中斷請求時會設定 truncated，
+    呼叫端據此判斷結果是否因時間限制而不完整。
+    """
+
+    def __init__(self, at: float):
+        """
+        Args:
+            at (float): 截止時間（time.time() 的時間戳）
+        """
+        self.at = at
+        self.truncated = False
+
+    @classmethod
+    def from_params(cls, deadline: Optional[float] = None, timeout_s: Optional[float] = None) -> Optional['Deadline']:
+        """
+        由截止時間戳或剩餘秒數建立，兩者都指定時取較早者，都未指定時回傳 None
+
+        Args:
+            deadline (float, optional): 截止時間（time.time() 的時間戳）
+            timeout_s (float, optional): 從現在起算的秒數
+        """
+        candidates = [t for t in (deadline, time.time() + timeout_s if timeout_s is not None else None) if t is not None]
+        return cls(min(candidates)) if candidates else None
+
+    def for_platform(self) -> 'Deadline':
+        """同一截止時間的新物件，讓各平台分別記錄是否被截斷"""
+        return Deadline(self.at)
+
+    def remaining(self) -> float:
+        """剩餘秒數（不小於 0）"""
+        return max(0.0, self.at - time.time())
+
+    def expired(self) -> bool:
+        return time.time() >= self.at
+
+    def check(self):
+        """時間已用完時標記截斷並拋出 DeadlineExceeded"""
+        if self.expired():
+            self.truncated = True
+            raise DeadlineExceeded("已超過爬取時間限制")
+
+    def cap_timeout(self, timeout):
+        """把請求逾時縮短到不超過剩餘時間（(connect, read) 形式的逾時分別縮短）"""
+        self.check()
+        remaining = self.remaining()
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+        return min(timeout, remaining)
+
+
+_current_deadline = contextvars.ContextVar('crawl_deadline', default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """
+    目前執行緒或 Task 的爬取截止時間，沒有時間限制時回傳 None
+
+    ThreadPoolExecutor 不會把呼叫端的 contextvars 帶到工作執行緒，
+    提交請求到執行緒池時需以 contextvars.copy_context().run 包裝才能沿用截止時間。
+    """
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    """在區塊中套用截止時間，None 表示不限制"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
@@ -0,0 +1,92 @@
+"""
+Selenium 批次 DOM 擷取
+以一次 execute_script 在瀏覽器內讀出所有商品卡片的欄位（每個欄位可設定多個備用選擇器），
+取代逐一 find_element / get_attribute 的 WebDriver 往返
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+# 是否使用批次擷取（false 時爬蟲改用逐一元素查詢的舊方式）
+BULK_EXTRACT = os.getenv('SELENIUM_BULK_EXTRACT', 'true').lower() in ('1', 'true', 'yes')
+
+# arguments[0]: 商品容器選擇器（依序嘗試，使用第一個有結果的），arguments[1]: 欄位 -> 規則列表
+EXTRACT_SCRIPT = """
+var containerSelectors = arguments[0], fields = arguments[1];
+var cards = [], used = null;
+for (var i = 0; i < containerSelectors.length; i++) {
+    cards = document.querySelectorAll(containerSelectors[i]);
+    if (cards.length) { used = containerSelectors[i]; break; }
+}
+function read(card, rule) {
+    var el = rule.selector ? card.querySelector(rule.selector) : card;
+    if (el && rule.parent) { el = el.parentElement; }
+    if (!el) { return null; }
+    var value;
+    if (rule.attr === 'text') {
+        value = el.innerText;
+    } else if (rule.attr in el && typeof el[rule.attr] === 'string') {
+        value = el[rule.attr];  // href/src 等屬性取瀏覽器解析後的完整網址，與 get_attribute 相同
+    } else {
+        value = el.getAttribute(rule.attr);
+    }
+    if (value === null || value === undefined) { return null; }
+    value = String(value).trim();
+    if (rule.pattern) {
+        var match = new RegExp(rule.pattern).exec(value);
+        value = match ? (match[1] !== undefined ? match[1] : match[0]) : '';
+    }
+    if (rule.exclude_suffix && value.slice(-rule.exclude_suffix.length) === rule.exclude_suffix) { return null; }
+    return value || null;
+}
+var items = [];
+for (var c = 0; c < cards.length; c++) {
+    var item = {};
+    for (var name in fields) {
+        var value = null;
+        for (var r = 0; r < fields[name].length && value === null; r++) {
+            value = read(cards[c], fields[name][r]);
+        }
+        item[name] = value;
+    }
+    items.push(item);
+}
+return {selector: used, items: items};
+"""
+
+
+def rule(selector: Optional[str] = None, attr: str = 'text', parent: bool = False,
+         pattern: Optional[str] = None, exclude_suffix: Optional[str] = None) -> Dict:
+    """
+    建立欄位擷取規則
+
+    Args:
+        selector (str, optional): 卡片內的 CSS 選擇器，None 表示卡片本身
+        attr (str): 'text' 取可見文字，其他值為屬性名稱
+        parent (bool): 改讀取選到元素的父元素
+        pattern (str, optional): 正規表示式，取第一個群組（沒有群組時取整個比對結果）
+        exclude_suffix (str, optional): 值以此結尾時視為沒有值（例如懶載入的佔位圖）
+
+    Returns:
+        Dict: 傳給瀏覽器的規則
+    """
+    return {'selector': selector, 'attr': attr, 'parent': parent, 'pattern': pattern,
+            'exclude_suffix': exclude_suffix}
+
+
+def extract_cards(driver, container_selectors: List[str], fields: Dict[str, List[Dict]]) -> Tuple[Optional[str], List[Dict]]:
+    """
+    以一次 WebDriver 呼叫讀出頁面上所有商品卡片的欄位
+
+    每個欄位依序嘗試規則，使用第一個有值的結果，全部沒有值時為 None。
+
+    Args:
+        driver (WebDriver): 瀏覽器
+        container_selectors (List[str]): 商品容器選擇器，使用第一個找得到元素的
+        fields (Dict[str, List[Dict]]): 欄位名稱 -> rule() 建立的規則列表
+
+    Returns:
+        Tuple[Optional[str], List[Dict]]: (使用的容器選擇器，找不到容器時為 None, 每張卡片的欄位字典)
+    """
+    result = driver.execute_script(EXTRACT_SCRIPT, container_selectors, fields)
+    return result['selector'], result['items']
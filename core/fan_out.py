@@ -0,0 +1,145 @@
+"""
+有序併發請求工具
+以固定大小的滑動視窗同時發送多個請求，並依原始順序交還結果；
+執行緒版本的請求在整個行程共用的執行緒池中執行，同一主機同時進行中的請求數
+（跨所有同時執行的爬蟲）不超過 http_client 的主機併發上限
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+from .http_client import get_host_limit
+
+# 整個行程用於分頁 / 批次併發請求的執行緒數上限
+DEFAULT_FAN_OUT_WORKERS = int(os.getenv('CRAWLER_FAN_OUT_WORKERS', '16'))
+
+
+class HostSlots:
+    """
+    各主機同時進行中的請求計數
+
+    同一平台可能有多個爬蟲同時執行（CrawlExecutor 的平台上限），
+    各自的分頁視窗加總後仍不超過主機併發上限。
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._in_flight = {}
+
+    def acquire(self, url: str) -> str:
+        """等到主機有空位後佔用一個名額，回傳主機名稱（釋放時使用）"""
+        host = urlparse(url).netloc
+        with self._condition:
+            # 每次都重新讀取上限，執行中調整 set_host_limit 也會生效
+            while self._in_flight.get(host, 0) >= get_host_limit(url):
+                self._condition.wait()
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+        return host
+
+    def release(self, host: str):
+        with self._condition:
+            self._in_flight[host] -= 1
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """各主機目前進行中的請求數"""
+        with self._condition:
+            return {host: count for host, count in self._in_flight.items() if count}
+
+
+def _run_in_slot(host: Optional[str], func: Callable[[Any], Any], item: Any) -> Any:
+    try:
+        return func(item)
+    finally:
+        if host is not None:
+            host_slots.release(host)
+
+
+def ordered_fan_out(func: Callable[[Any], Any], items: Iterable, max_in_flight: int,
+                    url: Optional[str] = None) -> Iterator[Tuple[Any, Future]]:
+    """
+    以共用執行緒池同時執行 func(item)，依 items 的順序逐一交還 (item, future)
+
+    同時進行中的請求不超過 max_in_flight 個；每交還一個結果才從 items 取下一個送出，
+    因此 items 可以是惰性產生器。指定 url 時，每個請求送出前還要取得該主機的名額，
+    主機已滿（其他爬蟲的請求佔用）時會等待前面的請求完成。
+    呼叫端提早結束迭代時，尚未開始的請求會被取消。
+    請求在呼叫端的 contextvars 內容中執行（例如沿用爬取截止時間）。
+
+    Args:
+        func (Callable): 對單一項目發送請求的函數
+        items (Iterable): 要處理的項目（例如頁碼、批次）
+        max_in_flight (int): 此次呼叫同時進行中的請求上限
+        url (str, optional): 請求的網址，用於套用跨爬蟲共用的主機併發上限
+
+    Yields:
+        Tuple[Any, Future]: 項目與對應的 Future，呼叫 result() 取得結果或拋出例外
+    """
+    max_in_flight = max(1, max_in_flight)
+    items = iter(items)
+    pending = deque()
+
+    def submit(item):
+        host = host_slots.acquire(url) if url else None
+        try:
+            future = fan_out_executor.submit(contextvars.copy_context().run, _run_in_slot, host, func, item)
+        except BaseException:
+            if host is not None:
+                host_slots.release(host)
+            raise
+        pending.append((item, future))
+
+    try:
+        for item in items:
+            submit(item)
+            if len(pending) >= max_in_flight:
+                break
+        while pending:
+            yield pending.popleft()
+            for item in items:
+                submit(item)
+                break
+    finally:
+        for _, future in pending:
+            # 尚未開始就取消的請求不會執行 _run_in_slot，需在這裡歸還主機名額
+            if future.cancel() and url:
+                host_slots.release(urlparse(url).netloc)
+
+
+async def ordered_fan_out_async(func: Callable[[Any], Awaitable], items: Iterable,
+                                max_in_flight: int) -> AsyncIterator[Tuple[Any, asyncio.Task]]:
+    """
+    ordered_fan_out 的非同步版本，以 asyncio Task 取代執行緒
+
+    呼叫端提早結束時應呼叫 aclose() 以取消尚未完成的請求。
+
+    Yields:
+        Tuple[Any, asyncio.Task]: 項目與對應的 Task，await 後取得結果或拋出例外
+    """
+    max_in_flight = max(1, max_in_flight)
+    items = iter(items)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append((item, asyncio.ensure_future(func(item))))
+            if len(pending) >= max_in_flight:
+                break
+        while pending:
+            yield pending.popleft()
+            for item in items:
+                pending.append((item, asyncio.ensure_future(func(item))))
+                break
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+# 全域實例
+fan_out_executor = ThreadPoolExecutor(max_workers=max(1, DEFAULT_FAN_OUT_WORKERS), thread_name_prefix='fan-out')
+host_slots = HostSlots()
@@ -4,10 +4,22 @@ GitHub 資料庫同步模組
 """
 
 import os
+import sys
 import requests
 import shutil
+import tempfile
 from datetime import datetime
 
+# 直接執行本檔案時也能匯入 core 模組
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.http_client import http_get
+
+# SQLite 資料庫檔案的開頭
+SQLITE_HEADER = b'SQLite format 3\x00'
+
 def download_latest_database(github_username="yolok9453", repo_name="crawls-web", branch="master"):
     """
     從 GitHub 下載最新的資料庫檔案
@@ -28,17 +40,30 @@ def download_latest_database(github_username="yolok9453", repo_name="crawls-web"
         print(f"📥 下載網址: {db_url}")
         
         # 下載檔案
-        response = requests.get(db_url, timeout=30)
+        response = http_get(db_url, timeout=30)
         response.raise_for_status()
+        if not response.content.startswith(SQLITE_HEADER):
+            print("❌ 下載的檔案不是 SQLite 資料庫，保留本地資料庫")
+            return False
         
         # 備份現有資料庫（如果存在）
         if os.path.exists(local_db_path):
             shutil.copy2(local_db_path, backup_db_path)
             print(f"💾 已備份現有資料庫到: {backup_db_path}")
         
-        # 儲存新資料庫
-        with open(local_db_path, 'wb') as f:
-            f.write(response.content)
+        # 先寫入同目錄的暫存檔再以 os.replace 原子替換，
+        # 替換前已開啟的連線繼續讀取舊檔案，不會讀到寫到一半的資料庫
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(local_db_path), suffix='.db.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(response.content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, local_db_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
         
         print(f"✅ 成功下載資料庫到: {local_db_path}")
         print(f"📊 檔案大小: {len(response.content)} bytes")
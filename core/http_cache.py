@@ -0,0 +1,245 @@
+"""
+爬蟲 HTTP 回應磁碟快取
+以「方法 + 網址 + 請求主體」為鍵把平台 API 的回應存到磁碟，
+在平台的有效期限內直接回傳，過期後以 ETag/Last-Modified 發送條件式請求重新驗證
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from .platforms import PLATFORM_HOSTS, platform_for_url
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CACHE_DIR = os.getenv('CRAWLER_HTTP_CACHE_DIR', os.path.join(project_root, 'data', 'http_cache'))
+# 平台回應的預設有效秒數，0 表示停用；可用 CRAWLER_HTTP_CACHE_TTL_<PLATFORM> 個別覆寫
+DEFAULT_CACHE_TTL = int(os.getenv('CRAWLER_HTTP_CACHE_TTL', '300'))
+# 快取佔用的磁碟空間上限，超過時依最近使用時間淘汰
+DEFAULT_CACHE_MAX_BYTES = int(float(os.getenv('CRAWLER_HTTP_CACHE_MAX_MB', '100')) * 1024 * 1024)
+
+
+def load_platform_ttls(default_ttl: int = DEFAULT_CACHE_TTL) -> Dict[str, int]:
+    """讀取各平台的快取有效秒數"""
+    ttls = {}
+    for platform in PLATFORM_HOSTS:
+        value = os.getenv(f'CRAWLER_HTTP_CACHE_TTL_{platform.upper()}')
+        try:
+            ttls[platform] = int(value) if value else default_ttl
+        except ValueError:
+            print(f"警告: 無法解析 {platform} 的 HTTP 快取期限: {value}")
+            ttls[platform] = default_ttl
+    return ttls
+
+
+class HttpCache:
+    """
+    依最近使用時間淘汰的 HTTP 回應磁碟快取
+
+    回應主體存成個別檔案，索引（驗證標頭、大小、存入與使用時間）存在同目錄的 SQLite 檔。
+    只有屬於已知平台且有效期限大於 0 的網址會被快取。
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 platform_ttls: Optional[Dict[str, int]] = None):
+        """
+        初始化 HTTP 快取
+
+        Args:
+            cache_dir (str): 快取目錄
+            max_bytes (int): 快取主體的總大小上限
+            platform_ttls (Dict[str, int], optional): 各平台的有效秒數，None 表示使用預設值與環境變數
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.platform_ttls = dict(platform_ttls if platform_ttls is not None else load_platform_ttls())
+        self.host_ttls = {}
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def configure_platform(self, platform: str, ttl: int):
+        """設定平台的有效秒數，0 表示不快取"""
+        self.platform_ttls[platform] = ttl
+
+    def configure_host(self, host: str, ttl: int):
+        """設定單一主機的有效秒數（優先於平台設定），0 表示不快取"""
+        self.host_ttls[host] = ttl
+
+    def ttl_for(self, url: str) -> int:
+        """取得網址的有效秒數，不快取時回傳 0"""
+        host = urlparse(url).netloc
+        if host in self.host_ttls:
+            return self.host_ttls[host]
+        platform = platform_for_url(url)
+        return self.platform_ttls.get(platform, 0) if platform else 0
+
+    @staticmethod
+    def make_key(method: str, url: str, params=None, json_body=None, data=None) -> str:
+        """以方法、完整網址與請求主體的雜湊產生快取鍵"""
+        full_url = requests.Request(method, url, params=params).prepare().url
+        if json_body is not None:
+            body = json.dumps(json_body, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        elif isinstance(data, bytes):
+            body = data
+        elif data is not None:
+            body = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+        else:
+            body = b''
+        return hashlib.sha256(f"{method.upper()} {full_url}\n".encode('utf-8') + hashlib.sha256(body).digest()).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.cache_dir, 'index.db'), check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                status_code INTEGER,
+                headers TEXT,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER,
+                stored_at REAL,
+                last_access REAL
+            );
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access);")
+            self._conn.commit()
+        return self._conn
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        讀取快取項目
+
+        Returns:
+            Optional[Dict]: 包含 content、headers、stored_at 等欄位的項目，沒有時回傳 None
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                with open(self._body_path(key), 'rb') as f:
+                    content = f.read()
+            except OSError:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+        entry = dict(row)
+        entry['headers'] = json.loads(entry['headers'] or '{}')
+        entry['content'] = content
+        return entry
+
+    @staticmethod
+    def is_fresh(entry: Dict, ttl: int) -> bool:
+        """項目是否仍在有效期限內"""
+        return time.time() - entry['stored_at'] < ttl
+
+    @staticmethod
+    def conditional_headers(entry: Dict) -> Dict[str, str]:
+        """重新驗證用的條件式請求標頭"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, key: str, status_code: int, content: bytes, headers, url: str, encoding: Optional[str] = None):
+        """存入回應，回應標頭要求 no-store 時略過"""
+        headers = dict(headers or {})
+        lower_headers = {k.lower(): v for k, v in headers.items()}
+        if 'no-store' in lower_headers.get('cache-control', ''):
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            tmp_path = self._body_path(key) + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, self._body_path(key))
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO entries
+                (key, url, status_code, headers, encoding, etag, last_modified, size, stored_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, url, status_code, json.dumps(headers, ensure_ascii=False), encoding,
+                 lower_headers.get('etag'), lower_headers.get('last-modified'), len(content), now, now)
+            )
+            conn.commit()
+            self._evict(conn)
+
+    def touch(self, key: str):
+        """重新驗證成功（304）時更新存入時間，重新開始有效期限"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("UPDATE entries SET stored_at = ?, last_access = ? WHERE key = ?", (now, now, key))
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """總大小超過上限時，從最久未使用的項目開始刪除"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for row in conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._body_path(row['key']))
+            except OSError:
+                pass
+            conn.execute("DELETE FROM entries WHERE key = ?", (row['key'],))
+            total -= row['size']
+        conn.commit()
+
+    def clear(self):
+        """清除所有快取項目"""
+        with self._lock:
+            conn = self._connection()
+            for row in conn.execute("SELECT key FROM entries").fetchall():
+                try:
+                    os.remove(self._body_path(row['key']))
+                except OSError:
+                    pass
+            conn.execute("DELETE FROM entries")
+            conn.commit()
+
+    def stats(self) -> Dict:
+        """快取命中統計與佔用空間"""
+        with self._lock:
+            conn = self._connection()
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'platform_ttls': dict(self.platform_ttls)
+        }
+
+
+# 整個行程共用的 HTTP 快取
+http_cache = HttpCache()
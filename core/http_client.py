@@ -0,0 +1,433 @@
+"""
+爬蟲 HTTP 傳輸模組
+提供所有爬蟲共用的連線池化 requests Session，以及非同步爬蟲共用的非阻塞 HTTP 客戶端
+"""
+
+import asyncio
+import json
+import os
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .rate_limiter import rate_limiter
+from .http_cache import http_cache
+from .http_replay import http_replay
+from .deadline import DeadlineExceeded, current_deadline
+from .platforms import platform_for_url
+from .resilience import resilience
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+# 整個行程同時進行中的連線上限與單一主機的連線上限
+DEFAULT_CONNECTION_LIMIT = 200
+DEFAULT_LIMIT_PER_HOST = 20
+DEFAULT_TIMEOUT = 10
+
+# 同步 Session 的預設設定，可用環境變數覆寫
+DEFAULT_POOL_SIZE = int(os.getenv('CRAWLER_HTTP_POOL_SIZE', '20'))
+DEFAULT_MAX_RETRIES = int(os.getenv('CRAWLER_HTTP_MAX_RETRIES', '2'))
+DEFAULT_BACKOFF_FACTOR = float(os.getenv('CRAWLER_HTTP_BACKOFF', '0.3'))
+DEFAULT_KEEP_ALIVE = os.getenv('CRAWLER_HTTP_KEEP_ALIVE', 'true').lower() == 'true'
+# 爬蟲對單一主機同時發出的請求上限（分頁併發時使用）
+DEFAULT_HOST_CONCURRENCY = int(os.getenv('CRAWLER_HTTP_HOST_CONCURRENCY', '6'))
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# 非同步爬蟲需要處理的請求錯誤
+if AIOHTTP_AVAILABLE:
+    ASYNC_REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, requests.RequestException)
+    # 非同步請求中會重試的連線失敗（讀取逾時不重試）
+    ASYNC_RETRYABLE_ERRORS = (aiohttp.ClientConnectionError,)
+else:
+    ASYNC_REQUEST_ERRORS = (asyncio.TimeoutError, requests.RequestException)
+    ASYNC_RETRYABLE_ERRORS = ()
+
+
+class SessionRegistry:
+    """
+    依主機管理的 requests.Session 註冊表
+
+    每個主機只建立一個帶連線池與重試設定的 Session，
+    讓同一主機的分頁與批次請求重複使用已建立的 TCP/TLS 連線。
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_factor: float = DEFAULT_BACKOFF_FACTOR, keep_alive: bool = DEFAULT_KEEP_ALIVE):
+        """
+        初始化 Session 註冊表
+
+        Args:
+            pool_size (int): 每個主機連線池保留的連線數
+            max_retries (int): 429/5xx 時的重試次數（連線錯誤由 resilience 模組重試）
+            backoff_factor (float): 重試間隔的指數退避係數
+            keep_alive (bool): 是否保持連線以便重複使用
+        """
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.keep_alive = keep_alive
+        self.default_host_limit = DEFAULT_HOST_CONCURRENCY
+        self.host_limits = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def configure(self, pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                  backoff_factor: Optional[float] = None, keep_alive: Optional[bool] = None):
+        """更新設定，已建立的 Session 會關閉並在下次使用時以新設定重建"""
+        with self._lock:
+            if pool_size is not None:
+                self.pool_size = pool_size
+            if max_retries is not None:
+                self.max_retries = max_retries
+            if backoff_factor is not None:
+                self.backoff_factor = backoff_factor
+            if keep_alive is not None:
+                self.keep_alive = keep_alive
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def get_session(self, url: str) -> requests.Session:
+        """取得網址所屬主機的共用 Session"""
+        host = urlparse(url).netloc
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._create_session()
+                self._sessions[host] = session
+            return session
+
+    def set_host_limit(self, host: str, limit: int):
+        """設定單一主機的併發請求上限"""
+        self.host_limits[host] = max(1, limit)
+
+    def get_host_limit(self, url: str) -> int:
+        """取得網址所屬主機的併發請求上限，不超過連線池大小"""
+        host = urlparse(url).netloc
+        return min(self.host_limits.get(host, self.default_host_limit), self.pool_size)
+
+    def _create_session(self) -> requests.Session:
+        # 連線失敗與讀取逾時都不在 urllib3 層重試（連線失敗由 resilience 重試）；
+        # read 必須為 False 而不是 0，否則讀取逾時會被包成 ConnectionError 而被當成連線失敗重試
+        retry = Retry(
+            total=self.max_retries,
+            connect=0,
+            read=False,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET', 'HEAD', 'POST']),
+            raise_on_status=False,
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def stats(self) -> Dict:
+        """目前已建立 Session 的主機列表與設定"""
+        return {
+            'hosts': sorted(self._sessions.keys()),
+            'pool_size': self.pool_size,
+            'host_limits': dict(self.host_limits),
+            'max_retries': self.max_retries,
+            'keep_alive': self.keep_alive
+        }
+
+    def close_all(self):
+        """關閉所有 Session"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+# 整個行程共用的 Session 註冊表
+session_registry = SessionRegistry()
+
+
+def get_session(url: str) -> requests.Session:
+    """取得網址所屬主機的共用 Session"""
+    return session_registry.get_session(url)
+
+
+def get_host_limit(url: str) -> int:
+    """取得網址所屬主機的併發請求上限"""
+    return session_registry.get_host_limit(url)
+
+
+def _send(session: requests.Session, method: str, url: str, idempotent: Optional[bool], **kwargs) -> requests.Response:
+    """
+    對外送出請求：套用平台的自適應逾時、斷路器與重試，每次嘗試前先取得主機的速率額度
+
+    有爬取截止時間時，逾時會縮短到不超過剩餘時間；時間用完時送出前或請求失敗後都拋出 DeadlineExceeded。
+    """
+    platform = platform_for_url(url)
+    timeout = resilience.timeout_for(platform, kwargs.pop('timeout'))
+    deadline = current_deadline()
+
+    def send():
+        rate_limiter.acquire(url)
+        if deadline is None:
+            return session.request(method, url, timeout=timeout, **kwargs)
+        try:
+            return session.request(method, url, timeout=deadline.cap_timeout(timeout), **kwargs)
+        except DeadlineExceeded:
+            raise
+        except requests.RequestException as e:
+            # 逾時以外的錯誤（例如被截斷的讀取包成的 ConnectionError）在時間用完時也視為截止，不計入斷路器
+            if deadline.expired():
+                deadline.truncated = True
+                raise DeadlineExceeded("請求因爬取時間限制而中斷") from e
+            raise
+
+    return resilience.call(platform, method, send, idempotent)
+
+
+def http_request(method: str, url: str, idempotent: Optional[bool] = None, **kwargs):
+    """
+    透過共用 Session 發送請求，參數與 requests.request 相同
+
+    平台網址會先查詢 HTTP 磁碟快取：有效期限內直接回傳快取內容，
+    過期但有 ETag/Last-Modified 時發送條件式請求，收到 304 即沿用快取。
+    實際對外發送的請求經過速率限制、自適應逾時、斷路器與重試。
+    重播模式直接回傳錄製的 fixture；錄製模式略過快取，把實際收到的回應存成 fixture。
+
+    Args:
+        idempotent (bool, optional): 請求是否可以安全重試，None 表示只重試 GET/HEAD
+
+    Returns:
+        requests.Response 或 HttpResponse（快取命中時）
+
+    Raises:
+        CircuitOpenError: 平台連續失敗而暫停中（requests.RequestException 的子類別）
+        DeadlineExceeded: 爬取時間已用完（requests.RequestException 的子類別）
+        FixtureMissingError: 重播模式下沒有錄製這個請求（requests.RequestException 的子類別）
+    """
+    if http_replay.replaying:
+        return HttpResponse.from_cache_entry(
+            http_replay.load(method, url, kwargs.get('params'), kwargs.get('json'), kwargs.get('data')))
+
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    session = get_session(url)
+    if http_replay.recording:
+        response = _send(session, method, url, idempotent, **kwargs)
+        http_replay.record(method, url, kwargs.get('params'), kwargs.get('json'), kwargs.get('data'), response)
+        return response
+
+    ttl = http_cache.ttl_for(url)
+    if ttl <= 0:
+        return _send(session, method, url, idempotent, **kwargs)
+
+    key = http_cache.make_key(method, url, kwargs.get('params'), kwargs.get('json'), kwargs.get('data'))
+    entry = http_cache.get(key)
+    if entry is not None and http_cache.is_fresh(entry, ttl):
+        http_cache.hits += 1
+        return HttpResponse.from_cache_entry(entry)
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    if entry is not None:
+        headers.update(http_cache.conditional_headers(entry))
+    response = _send(session, method, url, idempotent, headers=headers, **kwargs)
+
+    if entry is not None and response.status_code == 304:
+        http_cache.revalidated += 1
+        http_cache.touch(key)
+        return HttpResponse.from_cache_entry(entry)
+    http_cache.misses += 1
+    if response.status_code == 200:
+        http_cache.store(key, response.status_code, response.content, response.headers, response.url, response.encoding)
+    return response
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """透過共用 Session 發送 GET 請求，參數與 requests.get 相同（經過 HTTP 快取與速率限制）"""
+    return http_request('GET', url, **kwargs)
+
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    """透過共用 Session 發送 POST 請求，參數與 requests.post 相同（經過 HTTP 快取與速率限制）"""
+    return http_request('POST', url, **kwargs)
+
+
+class HttpResponse:
+    """已完整讀取的 HTTP 回應，介面與 requests.Response 常用部分一致"""
+
+    def __init__(self, status_code: int, content: bytes, headers: Optional[Dict] = None,
+                 url: str = "", encoding: Optional[str] = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = dict(headers or {})
+        self.url = url
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    @classmethod
+    def from_cache_entry(cls, entry: Dict) -> 'HttpResponse':
+        """由 HTTP 快取項目建立回應"""
+        return cls(
+            status_code=entry['status_code'],
+            content=entry['content'],
+            headers=entry['headers'],
+            url=entry['url'],
+            encoding=entry['encoding']
+        )
+
+    def raise_for_status(self):
+        """狀態碼為 4xx/5xx 時拋出 requests.HTTPError，讓同步與非同步爬蟲共用錯誤處理"""
+        if 400 <= self.status_code < 600:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class AsyncHttpClient:
+    """
+    非同步爬蟲共用的 HTTP 客戶端
+
+    同一個事件迴圈中的所有爬蟲共用一個 aiohttp 連線池，
+    可以同時維持大量進行中的頁面請求而不需要為每個平台開一條執行緒。
+    """
+
+    def __init__(self, limit: int = DEFAULT_CONNECTION_LIMIT, limit_per_host: int = DEFAULT_LIMIT_PER_HOST):
+        """
+        初始化非同步 HTTP 客戶端
+
+        Args:
+            limit (int): 整個連線池的最大連線數
+            limit_per_host (int): 單一主機的最大連線數
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise RuntimeError("aiohttp 未安裝，無法使用非同步爬蟲模式")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self._session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """建立底層的 aiohttp session（必須在事件迴圈中呼叫）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        """關閉連線池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def request(self, method: str, url: str, params: Optional[Dict] = None, json_body=None,
+                      data=None, headers: Optional[Dict] = None, timeout: float = DEFAULT_TIMEOUT,
+                      idempotent: Optional[bool] = None) -> HttpResponse:
+        """
+        發送請求並完整讀取回應內容
+
+        Args:
+            method (str): HTTP 方法
+            url (str): 請求網址
+            params (Dict, optional): 查詢參數
+            json_body (optional): JSON 請求主體
+            data (optional): 表單或原始請求主體
+            headers (Dict, optional): 請求頭
+            timeout (float): 單次請求逾時秒數（平台請求會依近期延遲與爬取截止時間自動縮短）
+            idempotent (bool, optional): 請求是否可以安全重試，None 表示只重試 GET/HEAD
+
+        Returns:
+            HttpResponse: 回應內容
+        """
+        if http_replay.replaying:
+            return HttpResponse.from_cache_entry(http_replay.load(method, url, params, json_body, data))
+
+        await self.open()
+        ttl = 0 if http_replay.recording else http_cache.ttl_for(url)
+        key = entry = None
+        if ttl > 0:
+            key = http_cache.make_key(method, url, params, json_body, data)
+            entry = http_cache.get(key)
+            if entry is not None and http_cache.is_fresh(entry, ttl):
+                http_cache.hits += 1
+                return HttpResponse.from_cache_entry(entry)
+            if entry is not None:
+                headers = {**(headers or {}), **http_cache.conditional_headers(entry)}
+
+        platform = platform_for_url(url)
+        timeout = resilience.timeout_for(platform, timeout)
+        deadline = current_deadline()
+
+        async def read() -> HttpResponse:
+            async with self._session.request(
+                method, url, params=params, json=json_body, data=data, headers=headers,
+                timeout=aiohttp.ClientTimeout(total=deadline.cap_timeout(timeout) if deadline else timeout)
+            ) as response:
+                content = await response.read()
+                try:
+                    encoding = response.get_encoding()
+                except RuntimeError:
+                    encoding = None
+                return HttpResponse(
+                    status_code=response.status,
+                    content=content,
+                    headers=dict(response.headers),
+                    url=str(response.url),
+                    encoding=encoding
+                )
+
+        async def send() -> HttpResponse:
+            await rate_limiter.acquire_async(url)
+            try:
+                return await read()
+            except DeadlineExceeded:
+                raise
+            except ASYNC_REQUEST_ERRORS as e:
+                if deadline is not None and deadline.expired():
+                    deadline.truncated = True
+                    raise DeadlineExceeded("請求因爬取時間限制而中斷") from e
+                raise
+
+        result = await resilience.call_async(platform, method, send, ASYNC_RETRYABLE_ERRORS, ASYNC_REQUEST_ERRORS,
+                                             idempotent)
+
+        if http_replay.recording:
+            http_replay.record(method, url, params, json_body, data, result)
+        if key is not None:
+            if entry is not None and result.status_code == 304:
+                http_cache.revalidated += 1
+                http_cache.touch(key)
+                return HttpResponse.from_cache_entry(entry)
+            http_cache.misses += 1
+            if result.status_code == 200:
+                http_cache.store(key, result.status_code, result.content, result.headers, result.url, result.encoding)
+        return result
+
+    async def get(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("POST", url, **kwargs)
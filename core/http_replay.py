@@ -0,0 +1,214 @@
+"""
+爬蟲 HTTP 錄製與重播
+record 模式把傳輸層實際收到的回應（以及 Selenium 爬蟲的頁面原始碼）存成 fixture 檔，
+replay 模式直接以 fixture 回應，不連線到電商網站，供離線開發與效能基準測試使用
+"""
+
+import base64
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from .http_cache import HttpCache
+from .platforms import platform_for_url
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REPLAY_OFF = 'off'
+REPLAY_RECORD = 'record'
+REPLAY_REPLAY = 'replay'
+REPLAY_MODES = (REPLAY_OFF, REPLAY_RECORD, REPLAY_REPLAY)
+
+# off 為一般連線，record 會在連線的同時存下回應，replay 只讀取 fixture 不連線
+DEFAULT_REPLAY_MODE = os.getenv('CRAWLER_HTTP_REPLAY', REPLAY_OFF).lower()
+DEFAULT_FIXTURES_DIR = os.getenv('CRAWLER_FIXTURES_DIR', os.path.join(project_root, 'benchmarks', 'fixtures'))
+
+
+class FixtureMissingError(requests.RequestException):
+    """replay 模式下找不到對應的 fixture（爬蟲會當成請求失敗處理）"""
+
+
+class HttpReplay:
+    """
+    HTTP 回應與頁面原始碼的 fixture 存放區
+
+    回應以「方法 + 網址 + 請求主體」的雜湊（與 HTTP 快取相同的鍵）存成 JSON，
+    依平台分目錄：<fixtures_dir>/<platform>/<key>.json；
+    Selenium 頁面原始碼存成 <fixtures_dir>/<platform>/page_<name>.html。
+    """
+
+    def __init__(self, mode: str = DEFAULT_REPLAY_MODE, fixtures_dir: str = DEFAULT_FIXTURES_DIR):
+        """
+        Args:
+            mode (str): off / record / replay
+            fixtures_dir (str): fixture 目錄
+        """
+        self.mode = REPLAY_OFF
+        self.fixtures_dir = fixtures_dir
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+        self._lock = threading.Lock()
+        self.configure(mode)
+
+    def configure(self, mode: Optional[str] = None, fixtures_dir: Optional[str] = None):
+        """切換模式或 fixture 目錄"""
+        if mode is not None:
+            if mode not in REPLAY_MODES:
+                print(f"警告: 未知的 HTTP 重播模式 {mode}，改用 {REPLAY_OFF}")
+                mode = REPLAY_OFF
+            self.mode = mode
+        if fixtures_dir is not None:
+            self.fixtures_dir = fixtures_dir
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == REPLAY_RECORD
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY_REPLAY
+
+    @staticmethod
+    def group_for_url(url: str) -> str:
+        """fixture 的分組目錄：已知平台用平台名稱，其他網址用主機名稱"""
+        return platform_for_url(url) or urlparse(url).netloc.replace(':', '_') or 'other'
+
+    def _response_path(self, group: str, key: str) -> str:
+        return os.path.join(self.fixtures_dir, group, f"{key}.json")
+
+    def _page_path(self, platform: str, name: str) -> str:
+        return os.path.join(self.fixtures_dir, platform, f"page_{name}.html")
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def record(self, method: str, url: str, params=None, json_body=None, data=None, response=None):
+        """
+        存下一次請求的回應（只記錄 2xx，避免把錯誤頁面當成 fixture）
+
+        Args:
+            response: requests.Response 或 HttpResponse
+        """
+        if response is None or not 200 <= response.status_code < 300:
+            return
+        key = HttpCache.make_key(method, url, params, json_body, data)
+        entry = {
+            'method': method.upper(),
+            'url': response.url or url,
+            'request': {'params': params, 'json': json_body},
+            'status_code': response.status_code,
+            'headers': {k: v for k, v in dict(response.headers).items()
+                        if k.lower() not in ('content-encoding', 'content-length', 'transfer-encoding', 'set-cookie')},
+            'encoding': response.encoding,
+            'recorded_at': datetime.now().isoformat()
+        }
+        try:
+            entry['body'] = response.content.decode(response.encoding or 'utf-8')
+        except (UnicodeDecodeError, LookupError):
+            entry['body_base64'] = base64.b64encode(response.content).decode('ascii')
+        self._write(self._response_path(self.group_for_url(url), key),
+                    json.dumps(entry, ensure_ascii=False, indent=1, default=str).encode('utf-8'))
+        with self._lock:
+            self.recorded += 1
+
+    @staticmethod
+    def _entry_from_file(path: str) -> Dict:
+        """讀取 fixture，回傳與 HTTP 快取項目相同格式的字典"""
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if 'body_base64' in entry:
+            entry['content'] = base64.b64decode(entry.pop('body_base64'))
+        else:
+            entry['content'] = entry.pop('body').encode(entry.get('encoding') or 'utf-8')
+        return entry
+
+    def load(self, method: str, url: str, params=None, json_body=None, data=None) -> Dict:
+        """
+        取得請求對應的 fixture
+
+        Returns:
+            Dict: 包含 status_code、content、headers、url、encoding 的項目（與 HTTP 快取項目格式相同）
+
+        Raises:
+            FixtureMissingError: 沒有錄製過這個請求
+        """
+        key = HttpCache.make_key(method, url, params, json_body, data)
+        path = self._response_path(self.group_for_url(url), key)
+        try:
+            entry = self._entry_from_file(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.missing += 1
+            raise FixtureMissingError(f"沒有錄製的回應: {method.upper()} {url}" + (f" {params}" if params else ""))
+        with self._lock:
+            self.replayed += 1
+        return entry
+
+    def record_page(self, platform: str, name: str, page_source: str):
+        """存下 Selenium 取得的頁面原始碼"""
+        self._write(self._page_path(platform, name), page_source.encode('utf-8'))
+        with self._lock:
+            self.recorded += 1
+        print(f"已錄製 {platform} 頁面原始碼: {name}")
+
+    def load_page(self, platform: str, name: str) -> str:
+        """
+        讀取錄製的頁面原始碼
+
+        Raises:
+            FixtureMissingError: 沒有錄製過這個頁面
+        """
+        try:
+            with open(self._page_path(platform, name), 'r', encoding='utf-8') as f:
+                page_source = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.missing += 1
+            raise FixtureMissingError(f"沒有錄製的 {platform} 頁面: {name}")
+        with self._lock:
+            self.replayed += 1
+        return page_source
+
+    def responses(self, group: str) -> List[Dict]:
+        """列出某平台錄製的所有回應（依檔名排序）"""
+        directory = os.path.join(self.fixtures_dir, group)
+        if not os.path.isdir(directory):
+            return []
+        return [self._entry_from_file(os.path.join(directory, name))
+                for name in sorted(os.listdir(directory)) if name.endswith('.json')]
+
+    def pages(self, platform: str) -> List[str]:
+        """列出某平台錄製的所有頁面原始碼"""
+        directory = os.path.join(self.fixtures_dir, platform)
+        if not os.path.isdir(directory):
+            return []
+        pages = []
+        for name in sorted(os.listdir(directory)):
+            if name.startswith('page_') and name.endswith('.html'):
+                with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                    pages.append(f.read())
+        return pages
+
+    def stats(self) -> Dict:
+        return {
+            'mode': self.mode,
+            'fixtures_dir': self.fixtures_dir,
+            'recorded': self.recorded,
+            'replayed': self.replayed,
+            'missing': self.missing
+        }
+
+
+# 整個行程共用的錄製/重播設定
+http_replay = HttpReplay()
@@ -0,0 +1,119 @@
+"""
+Selenium 頁面載入等待
+以頁面內的 MutationObserver 與 PerformanceObserver 記錄最後一次 DOM 變動與網路請求的時間，
+商品數量、頁面高度與網路活動都穩定一段時間後立即返回，取代固定秒數的 time.sleep；
+每次等待都有上限，頁面持續變動時最多等待 max_wait 秒
+"""
+
+import os
+import time
+from typing import Dict, Optional
+
+# 商品數量、頁面高度與網路活動需維持不變的毫秒數
+DEFAULT_QUIET_MS = int(os.getenv('PAGE_SETTLE_QUIET_MS', '500'))
+# 單次等待的上限（秒）
+DEFAULT_MAX_WAIT = float(os.getenv('PAGE_SETTLE_MAX_WAIT', '10'))
+# 查詢頁面狀態的間隔（秒）
+POLL_INTERVAL = 0.1
+# 捲動到底部最多幾次（無限捲動頁面的保護）
+DEFAULT_MAX_SCROLLS = 30
+
+# 第一次執行時安裝觀察器（換頁後 window 重建會重新安裝），回傳目前的頁面狀態
+ACTIVITY_SCRIPT = """
+var w = window;
+if (!w.__crawlerActivity) {
+    var activity = w.__crawlerActivity = {dom: performance.now(), net: performance.now()};
+    new MutationObserver(function () { activity.dom = performance.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true});
+    if (performance.setResourceTimingBufferSize) {
+        performance.setResourceTimingBufferSize(10000);
+    }
+    if (w.PerformanceObserver) {
+        try {
+            new PerformanceObserver(function () { activity.net = performance.now(); })
+                .observe({entryTypes: ['resource']});
+        } catch (e) {}
+    }
+}
+var now = performance.now();
+var selector = arguments[0];
+return {
+    dom_idle_ms: now - w.__crawlerActivity.dom,
+    net_idle_ms: now - w.__crawlerActivity.net,
+    count: selector ? document.querySelectorAll(selector).length : null,
+    height: document.body ? document.body.scrollHeight : 0,
+    ready: document.readyState
+};
+"""
+
+
+def page_state(driver, item_selector: Optional[str] = None) -> Dict:
+    """
+    取得頁面目前的載入狀態
+
+    Returns:
+        Dict: dom_idle_ms、net_idle_ms（距離最後一次 DOM 變動 / 網路請求完成的毫秒數）、
+              count（符合 item_selector 的元素數）、height（頁面高度）、ready（document.readyState）
+    """
+    return driver.execute_script(ACTIVITY_SCRIPT, item_selector)
+
+
+def wait_for_settle(driver, item_selector: Optional[str] = None, quiet_ms: int = DEFAULT_QUIET_MS,
+                    max_wait: float = DEFAULT_MAX_WAIT) -> Dict:
+    """
+    等待頁面穩定：文件載入完成，且商品數量、頁面高度與網路活動都維持 quiet_ms 毫秒不變
+
+    指定 item_selector 時以商品數量判斷內容是否載入完成，不理會倒數計時等與商品無關的 DOM 變動；
+    未指定時改為要求整個 DOM 沒有變動。
+
+    Args:
+        driver (WebDriver): 瀏覽器
+        item_selector (str, optional): 商品元素的 CSS 選擇器
+        quiet_ms (int): 需維持不變的毫秒數
+        max_wait (float): 最多等待的秒數
+
+    Returns:
+        Dict: settled（是否在時限內穩定）、waited（等待秒數）、count、height
+    """
+    start = time.time()
+    last_key = None
+    stable_since = start
+    while True:
+        state = page_state(driver, item_selector)
+        now = time.time()
+        key = (state['count'], state['height'])
+        if key != last_key:
+            last_key = key
+            stable_since = now
+
+        settled = (
+            state['ready'] == 'complete'
+            and state['net_idle_ms'] >= quiet_ms
+            and (now - stable_since) * 1000 >= quiet_ms
+            and (item_selector is not None or state['dom_idle_ms'] >= quiet_ms)
+        )
+        if settled or now - start >= max_wait:
+            return {'settled': settled, 'waited': now - start, 'count': state['count'], 'height': state['height']}
+        time.sleep(POLL_INTERVAL)
+
+
+def scroll_until_settled(driver, item_selector: Optional[str] = None, quiet_ms: int = DEFAULT_QUIET_MS,
+                         max_wait: float = DEFAULT_MAX_WAIT, max_scrolls: int = DEFAULT_MAX_SCROLLS) -> Dict:
+    """
+    反覆捲動到底部並等待頁面穩定，直到商品數量與頁面高度不再增加
+
+    Returns:
+        Dict: scrolls（捲動次數）、waited（等待總秒數）、count、height
+    """
+    state = wait_for_settle(driver, item_selector, quiet_ms, max_wait)
+    waited = state['waited']
+    scrolls = 0
+    while scrolls < max_scrolls:
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        scrolls += 1
+        new_state = wait_for_settle(driver, item_selector, quiet_ms, max_wait)
+        waited += new_state['waited']
+        if (new_state['count'], new_state['height']) == (state['count'], state['height']):
+            break
+        state = new_state
+    return {'scrolls': scrolls, 'waited': waited, 'count': state['count'], 'height': state['height']}
@@ -0,0 +1,86 @@
+"""
+爬蟲平台設定
+集中記錄各平台對應的 API 主機，供傳輸層依網址辨識平台，
+並可把平台的 API 基底網址改指向其他伺服器（例如本機的模擬電商伺服器）
+"""
+
+import os
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# 各平台爬蟲發送請求的主機
+PLATFORM_HOSTS = {
+    'pchome': ['ecshweb.pchome.com.tw'],
+    'yahoo': ['graphql.ec.yahoo.com'],
+    'routn': ['rtapi.ruten.com.tw'],
+    'carrefour': ['online.carrefour.com.tw'],
+}
+
+_HOST_TO_PLATFORM = {host: platform for platform, hosts in PLATFORM_HOSTS.items() for host in hosts}
+
+
+def platform_for_host(host: str) -> Optional[str]:
+    """依主機名稱取得平台名稱，不屬於任何平台時回傳 None"""
+    return _HOST_TO_PLATFORM.get(host)
+
+
+def platform_for_url(url: str) -> Optional[str]:
+    """依網址取得平台名稱，不屬於任何平台時回傳 None"""
+    return platform_for_host(urlparse(url).netloc)
+
+
+# 平台 -> 覆寫的 API 基底網址（scheme + 主機，可帶路徑前綴）
+_base_url_overrides: Dict[str, str] = {}
+
+
+def set_base_url(platform: str, base_url: Optional[str]):
+    """
+    把平台的請求改送到 base_url，None 表示還原為原本的主機
+
+    覆寫的主機會登錄為該平台的主機，速率限制、斷路器與 HTTP 快取依然以平台區分；
+    各平台需使用不同的主機（或連接埠）才能分辨。
+
+    Args:
+        platform (str): 平台名稱
+        base_url (str, optional): 例如 http://127.0.0.1:8801
+    """
+    if platform not in PLATFORM_HOSTS:
+        raise ValueError(f"不支援的平台: {platform}")
+    previous = _base_url_overrides.pop(platform, None)
+    if previous is not None:
+        _HOST_TO_PLATFORM.pop(urlparse(previous).netloc, None)
+    if base_url:
+        base_url = base_url.rstrip('/')
+        _base_url_overrides[platform] = base_url
+        _HOST_TO_PLATFORM[urlparse(base_url).netloc] = platform
+
+
+def base_url_overrides() -> Dict[str, str]:
+    """目前覆寫的平台基底網址"""
+    return dict(_base_url_overrides)
+
+
+def platform_url(url: str) -> str:
+    """
+    套用平台的基底網址覆寫：只替換 scheme 與主機，路徑與查詢字串不變
+
+    Args:
+        url (str): 爬蟲原本的請求網址
+
+    Returns:
+        str: 沒有覆寫時回傳原網址
+    """
+    if not _base_url_overrides:
+        return url
+    base_url = _base_url_overrides.get(platform_for_url(url))
+    if base_url is None:
+        return url
+    parsed = urlparse(url)
+    return base_url + parsed.path + (f"?{parsed.query}" if parsed.query else "")
+
+
+# CRAWLER_BASE_URL_<PLATFORM>（例如 CRAWLER_BASE_URL_PCHOME=http://127.0.0.1:8801）
+for _platform in PLATFORM_HOSTS:
+    _override = os.getenv(f'CRAWLER_BASE_URL_{_platform.upper()}')
+    if _override:
+        set_base_url(_platform, _override)
@@ -0,0 +1,141 @@
+"""
+商品資料
+各爬蟲與 CrawlerManager 共用的精簡商品型別，
+以 __slots__ 儲存固定欄位，只有在 API 邊界（JSON 輸出）才轉成字典
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+# 固定欄位，順序與 to_dict 輸出相同
+PRODUCT_FIELDS = ('title', 'price', 'image_url', 'url', 'platform')
+
+
+class Product:
+    """
+    單一商品
+
+    固定欄位存在 slots 中；少數平台附加的欄位（例如特價商品的 related_products）
+    放在 extra，沒有附加欄位時 extra 為 None，不另外配置字典。
+    另提供 p['title']、p.get('price') 等讀寫方式，讓仍以字典操作商品的程式可以沿用。
+    """
+
+    __slots__ = PRODUCT_FIELDS + ('extra',)
+
+    def __init__(self, title: str = "", price: Any = 0, image_url: str = "", url: str = "",
+                 platform: str = "", extra: Optional[Dict[str, Any]] = None):
+        self.title = title
+        self.price = price
+        self.image_url = image_url
+        self.url = url
+        self.platform = platform
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], platform: Optional[str] = None) -> 'Product':
+        """
+        由字典建立商品（外部或舊格式的爬蟲結果）
+
+        Args:
+            data (Dict): 商品字典，沒有 title 時改用 name
+            platform (str, optional): 字典中沒有 platform 時使用的平台名稱
+
+        Returns:
+            Product: 商品
+        """
+        extra = {k: v for k, v in data.items() if k not in PRODUCT_FIELDS}
+        return cls(
+            title=data.get('title') or data.get('name') or "",
+            price=data.get('price', 0),
+            image_url=data.get('image_url') or "",
+            url=data.get('url') or "",
+            platform=data.get('platform') or platform or "",
+            extra=extra
+        )
+
+    @classmethod
+    def from_row(cls, row, platform: Optional[str] = None) -> 'Product':
+        """
+        由 products 資料表的 sqlite3.Row 建立商品
+
+        Args:
+            row (sqlite3.Row): 至少包含 title、price、url、image_url 欄位
+            platform (str, optional): 查詢未選取 platform 欄位時使用的平台名稱
+        """
+        if platform is None and 'platform' in row.keys():
+            platform = row['platform']
+        return cls(row['title'], row['price'], row['image_url'] or "", row['url'], platform or "")
+
+    @classmethod
+    def coerce(cls, product, platform: Optional[str] = None) -> 'Product':
+        """已是 Product 時直接回傳，字典則轉換為 Product"""
+        if isinstance(product, cls):
+            return product
+        return cls.from_dict(product, platform)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉成 JSON 可輸出的字典（附加欄位中的商品一併轉換）"""
+        data = {field: getattr(self, field) for field in PRODUCT_FIELDS}
+        if self.extra:
+            for key, value in self.extra.items():
+                data[key] = to_jsonable(value)
+        return data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in PRODUCT_FIELDS:
+            return getattr(self, key)
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in PRODUCT_FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in PRODUCT_FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in PRODUCT_FIELDS or bool(self.extra and key in self.extra)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Product):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Product(platform={self.platform!r}, title={self.title!r}, price={self.price!r}, url={self.url!r})"
+
+
+def as_products(products: Iterable, platform: Optional[str] = None) -> List[Product]:
+    """將爬蟲回傳的商品列表統一為 Product（已是 Product 的項目不會複製）"""
+    return [Product.coerce(p, platform) for p in products]
+
+
+def to_jsonable(value: Any) -> Any:
+    """把值中的 Product（含列表與字典內的）轉成字典"""
+    if isinstance(value, Product):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: to_jsonable(v) for k, v in value.items()}
+    return value
+
+
+def json_default(obj: Any) -> Any:
+    """
+    json.dump / json.dumps 的 default 參數：Product 轉成字典，其他無法序列化的值轉成字串
+
+    用法: json.dumps(result, ensure_ascii=False, default=json_default)
+    """
+    if isinstance(obj, Product):
+        return obj.to_dict()
+    return str(obj)
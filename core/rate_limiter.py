@@ -0,0 +1,164 @@
+"""
+爬蟲請求速率限制模組
+以 Token Bucket 控制每個平台的請求速率，所有爬蟲與同時進行的爬取任務共用同一份額度
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from .platforms import PLATFORM_HOSTS, platform_for_url
+
+# 各平台的預設速率：rate 為每秒補充的請求數，burst 為可累積的突發請求數
+DEFAULT_PLATFORM_RATE_LIMITS = {
+    'pchome': {'rate': 10.0, 'burst': 10},
+    'yahoo': {'rate': 1.0, 'burst': 2},
+    'routn': {'rate': 10.0, 'burst': 10},
+    'carrefour': {'rate': 0.7, 'burst': 2},
+}
+
+
+class TokenBucket:
+    """
+    支援突發量的 Token Bucket
+
+    取用時先預約一個 token 並回傳需要等待的秒數，
+    同時呼叫的執行緒與協程會依預約順序排隊，不會同時醒來超出速率。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        """
+        初始化 Token Bucket
+
+        Args:
+            rate (float): 每秒補充的 token 數
+            burst (int): 最多可累積的 token 數
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """預約一個 token，回傳取用前需要等待的秒數"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """取得一個 token，額度不足時阻塞等待"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """acquire 的非同步版本，等待時不佔用事件迴圈"""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def available_tokens(self) -> float:
+        """目前可立即使用的 token 數（負數表示已有請求在排隊）"""
+        with self._lock:
+            elapsed = time.monotonic() - self._last_refill
+            return min(self.burst, self._tokens + elapsed * self.rate)
+
+
+class RateLimiter:
+    """
+    依平台管理 Token Bucket
+
+    平台的所有主機（包含 set_base_url 覆寫的主機）共用同一份額度；
+    個別設定的主機優先於平台設定（例如壓力測試時不限制模擬伺服器）。
+    """
+
+    def __init__(self, platform_limits: Optional[Dict[str, Dict]] = None):
+        """
+        初始化速率限制器
+
+        Args:
+            platform_limits (Dict, optional): 各平台的 rate/burst 設定，None 表示使用預設值與環境變數
+        """
+        self._platform_buckets = {}
+        self._host_buckets = {}
+        self._lock = threading.Lock()
+        limits = platform_limits if platform_limits is not None else load_platform_limits()
+        for platform, limit in limits.items():
+            self.configure_platform(platform, limit['rate'], limit['burst'])
+
+    def configure_platform(self, platform: str, rate: float, burst: int):
+        """設定平台的速率，rate 小於等於 0 表示不限制"""
+        with self._lock:
+            if rate <= 0:
+                self._platform_buckets.pop(platform, None)
+            else:
+                self._platform_buckets[platform] = TokenBucket(rate, burst)
+
+    def configure_host(self, host: str, rate: float, burst: int):
+        """設定單一主機的速率（優先於平台設定），rate 小於等於 0 表示不限制此主機"""
+        with self._lock:
+            self._host_buckets[host] = TokenBucket(rate, burst) if rate > 0 else None
+
+    def bucket_for(self, url: str) -> Optional[TokenBucket]:
+        """取得網址適用的 Token Bucket，沒有設定限制時回傳 None"""
+        host = urlparse(url).netloc
+        if host in self._host_buckets:
+            return self._host_buckets[host]
+        platform = platform_for_url(url)
+        return self._platform_buckets.get(platform) if platform else None
+
+    def acquire(self, url: str):
+        """發送請求前取得額度"""
+        bucket = self.bucket_for(url)
+        if bucket is not None:
+            bucket.acquire()
+
+    async def acquire_async(self, url: str):
+        """acquire 的非同步版本"""
+        bucket = self.bucket_for(url)
+        if bucket is not None:
+            await bucket.acquire_async()
+
+    def stats(self) -> Dict[str, Dict]:
+        """各平台與個別設定的主機目前的速率設定與可用額度"""
+        buckets = {**self._platform_buckets, **{host: b for host, b in self._host_buckets.items() if b is not None}}
+        return {
+            name: {
+                'rate': bucket.rate,
+                'burst': bucket.burst,
+                'available_tokens': round(bucket.available_tokens(), 2)
+            }
+            for name, bucket in buckets.items()
+        }
+
+
+def load_platform_limits() -> Dict[str, Dict]:
+    """
+    讀取各平台的速率設定
+
+    可用環境變數 CRAWLER_RATE_LIMIT_<PLATFORM>=<rate>/<burst> 覆寫，例如 CRAWLER_RATE_LIMIT_YAHOO=2/4
+    """
+    limits = {platform: dict(limit) for platform, limit in DEFAULT_PLATFORM_RATE_LIMITS.items()}
+    for platform in PLATFORM_HOSTS:
+        value = os.getenv(f'CRAWLER_RATE_LIMIT_{platform.upper()}')
+        if not value:
+            continue
+        try:
+            rate, _, burst = value.partition('/')
+            limits[platform] = {'rate': float(rate), 'burst': int(burst or 1)}
+        except ValueError:
+            print(f"警告: 無法解析 {platform} 的速率設定: {value}")
+    return limits
+
+
+# 整個行程共用的速率限制器
+rate_limiter = RateLimiter()
@@ -0,0 +1,537 @@
+"""
+爬蟲請求韌性模組
+依各平台近期延遲自動調整逾時、以隨機抖動的指數退避重試冪等請求，
+對慢請求發送備援請求（hedging）以降低尾端延遲，
+並在平台連續失敗時以斷路器暫停對該平台發送請求
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Dict, Optional
+
+import requests
+
+from .deadline import DeadlineExceeded
+from .platforms import PLATFORM_HOSTS
+
+# 逾時 = 近期延遲的百分位數 × 倍數，限制在最小值與呼叫端指定的逾時之間
+DEFAULT_TIMEOUT_PERCENTILE = float(os.getenv('CRAWLER_TIMEOUT_PERCENTILE', '95'))
+DEFAULT_TIMEOUT_MULTIPLIER = float(os.getenv('CRAWLER_TIMEOUT_MULTIPLIER', '3'))
+DEFAULT_MIN_TIMEOUT = float(os.getenv('CRAWLER_TIMEOUT_MIN', '2'))
+# 連線失敗時的重試次數（不含第一次請求）與退避間隔
+DEFAULT_RETRIES = int(os.getenv('CRAWLER_RETRY_ATTEMPTS', '1'))
+DEFAULT_RETRY_BASE_DELAY = float(os.getenv('CRAWLER_RETRY_BASE_DELAY', '0.3'))
+DEFAULT_RETRY_MAX_DELAY = float(os.getenv('CRAWLER_RETRY_MAX_DELAY', '3'))
+# 連續失敗幾次後開啟斷路器，以及開啟後暫停的秒數
+DEFAULT_BREAKER_THRESHOLD = int(os.getenv('CRAWLER_BREAKER_THRESHOLD', '5'))
+DEFAULT_BREAKER_COOLDOWN = float(os.getenv('CRAWLER_BREAKER_COOLDOWN', '60'))
+# 啟用備援請求的平台（逗號分隔，all 表示全部），預設不啟用
+DEFAULT_HEDGE_PLATFORMS = os.getenv('CRAWLER_HEDGE_PLATFORMS', '')
+# 請求超過近期延遲的此百分位數仍未回應時送出備援請求
+DEFAULT_HEDGE_PERCENTILE = float(os.getenv('CRAWLER_HEDGE_PERCENTILE', '95'))
+# 備援請求數佔平台請求數的比例上限
+DEFAULT_HEDGE_BUDGET = float(os.getenv('CRAWLER_HEDGE_BUDGET', '0.05'))
+# 同步請求的備援執行緒數
+DEFAULT_HEDGE_WORKERS = int(os.getenv('CRAWLER_HEDGE_WORKERS', '32'))
+
+# 可以安全重試的請求方法；其他方法需由呼叫端明確標示為冪等
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+# 視為平台異常的狀態碼
+FAILURE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+# 會重試的例外：連線失敗與連線逾時（含 ConnectTimeout）。
+# 讀取逾時不重試，否則平台卡住時每一頁都要等待數倍的逾時；讀取逾時仍會計入斷路器
+RETRYABLE_ERRORS = (requests.ConnectionError,)
+
+BREAKER_CLOSED = 'closed'
+BREAKER_OPEN = 'open'
+BREAKER_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.RequestException):
+    """平台斷路器開啟中，請求未送出"""
+
+    def __init__(self, platform: str, retry_in: float):
+        super().__init__(f"{platform} 暫時停用（連續失敗，{retry_in:.0f} 秒後重試）")
+        self.platform = platform
+        self.retry_in = retry_in
+
+
+class LatencyTracker:
+    """記錄各平台近期成功請求的延遲，並以百分位數計算逾時"""
+
+    def __init__(self, window: int = 50, min_samples: int = 5, percentile: float = DEFAULT_TIMEOUT_PERCENTILE,
+                 multiplier: float = DEFAULT_TIMEOUT_MULTIPLIER, min_timeout: float = DEFAULT_MIN_TIMEOUT):
+        """
+        Args:
+            window (int): 每個平台保留的延遲樣本數
+            min_samples (int): 樣本數不足時使用呼叫端指定的逾時
+            percentile (float): 計算逾時使用的百分位數
+            multiplier (float): 百分位數延遲的倍數
+            min_timeout (float): 逾時下限（秒）
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, platform: str, seconds: float):
+        """記錄一次成功請求的延遲"""
+        with self._lock:
+            self._samples.setdefault(platform, deque(maxlen=self.window)).append(seconds)
+
+    def latency_percentile(self, platform: str, percentile: Optional[float] = None) -> Optional[float]:
+        """近期延遲的百分位數（預設為計算逾時用的百分位數），樣本不足時回傳 None"""
+        if percentile is None:
+            percentile = self.percentile
+        with self._lock:
+            samples = sorted(self._samples.get(platform, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def timeout_for(self, platform: str, ceiling: float) -> float:
+        """
+        取得平台目前的逾時
+
+        Args:
+            platform (str): 平台名稱
+            ceiling (float): 呼叫端指定的逾時，作為上限
+        """
+        latency = self.latency_percentile(platform)
+        if latency is None:
+            return ceiling
+        return max(self.min_timeout, min(ceiling, latency * self.multiplier))
+
+
+class RetryPolicy:
+    """隨機抖動的指數退避（full jitter）"""
+
+    def __init__(self, retries: int = DEFAULT_RETRIES, base_delay: float = DEFAULT_RETRY_BASE_DELAY,
+                 max_delay: float = DEFAULT_RETRY_MAX_DELAY):
+        """
+        Args:
+            retries (int): 重試次數（不含第一次請求）
+            base_delay (float): 第一次重試的最大等待秒數
+            max_delay (float): 等待秒數上限
+        """
+        self.retries = max(0, retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次重試（從 0 開始）前的等待秒數"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def parse_platform_list(value: str):
+    """解析逗號分隔的平台列表，all 表示全部平台"""
+    names = {name.strip().lower() for name in value.split(',') if name.strip()}
+    return set(PLATFORM_HOSTS) if 'all' in names else names
+
+
+class HedgePolicy:
+    """
+    備援請求（hedged request）
+
+    請求超過平台近期延遲的百分位數仍未回應時，再送出一個相同的請求，採用先回來的結果。
+    只對啟用的平台與可以安全重試的請求生效，且備援請求數不超過平台請求數的 budget 比例。
+    同步請求在共用執行緒池中執行，非同步請求以 task 執行並取消較慢的一方。
+    """
+
+    def __init__(self, latency: LatencyTracker, platforms=None, percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 budget: float = DEFAULT_HEDGE_BUDGET, max_workers: int = DEFAULT_HEDGE_WORKERS):
+        """
+        Args:
+            latency (LatencyTracker): 提供平台延遲百分位數的延遲記錄
+            platforms (set, optional): 啟用的平台，None 表示使用 CRAWLER_HEDGE_PLATFORMS
+            percentile (float): 送出備援請求前等待的延遲百分位數
+            budget (float): 備援請求數佔平台請求數的比例上限
+            max_workers (int): 同步請求的執行緒數
+        """
+        self.latency = latency
+        self.platforms = set(platforms) if platforms is not None else parse_platform_list(DEFAULT_HEDGE_PLATFORMS)
+        self.percentile = percentile
+        self.budget = budget
+        self.max_workers = max_workers
+        self._counts = {}
+        self._executor = None
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def enable(self, platform: str, enabled: bool = True):
+        """啟用或停用平台的備援請求"""
+        if enabled:
+            self.platforms.add(platform)
+        else:
+            self.platforms.discard(platform)
+
+    def enabled(self, platform: Optional[str]) -> bool:
+        return platform is not None and platform in self.platforms
+
+    def _count(self, platform: str) -> Dict:
+        return self._counts.setdefault(platform, {'requests': 0, 'hedges': 0, 'hedge_wins': 0})
+
+    def _start(self, platform: str) -> Optional[float]:
+        """記錄一次請求並回傳送出備援請求前的等待秒數，延遲樣本不足時回傳 None"""
+        with self._lock:
+            self._count(platform)['requests'] += 1
+        return self.latency.latency_percentile(platform, self.percentile)
+
+    def _take_budget(self, platform: str) -> bool:
+        """預算足夠時佔用一次備援名額"""
+        with self._lock:
+            count = self._count(platform)
+            if count['hedges'] + 1 > count['requests'] * self.budget:
+                return False
+            count['hedges'] += 1
+            return True
+
+    def _record_win(self, platform: str):
+        with self._lock:
+            self._count(platform)['hedge_wins'] += 1
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hedge')
+        return self._executor
+
+    def _track(self, started: threading.Event, send: Callable[[], requests.Response]) -> requests.Response:
+        """在執行緒池中執行請求，記錄開始執行的時間點與執行中的請求數"""
+        with self._lock:
+            self._running += 1
+        started.set()
+        try:
+            return send()
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _has_free_worker(self) -> bool:
+        with self._lock:
+            return self._running < self.max_workers
+
+    def run(self, platform: str, send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        執行請求，超過等待時間仍未回應且預算足夠時送出備援請求
+
+        等待時間從原始請求開始執行時起算，不包含在執行緒池中排隊的時間；
+        執行緒池已滿時不送出備援請求（備援請求只會排隊，反而拖慢其他請求）。
+        兩個請求都失敗時拋出原始請求的例外；較慢的同步請求無法中斷，會在背景完成後被丟棄。
+        """
+        delay = self._start(platform)
+        if delay is None:
+            return send()
+
+        started = threading.Event()
+        primary = self._pool().submit(contextvars.copy_context().run, self._track, started, send)
+        started.wait()
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._has_free_worker() or not self._take_budget(platform):
+            return primary.result()
+
+        hedge = self._pool().submit(contextvars.copy_context().run, self._track, threading.Event(), send)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._record_win(platform)
+                    return future.result()
+        return primary.result()
+
+    async def run_async(self, platform: str, send: Callable[[], Awaitable]):
+        """run 的非同步版本，採用先成功的結果並取消另一個請求"""
+        delay = self._start(platform)
+        if delay is None:
+            return await send()
+
+        primary = asyncio.ensure_future(send())
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._take_budget(platform):
+            return await primary
+
+        hedge = asyncio.ensure_future(send())
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        if task is hedge:
+                            self._record_win(platform)
+                        return task.result()
+            return await primary
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        """各平台的請求數、備援請求數與備援請求先回應的次數"""
+        with self._lock:
+            counts = {platform: dict(count) for platform, count in self._counts.items()}
+        return {
+            'platforms': sorted(self.platforms),
+            'percentile': self.percentile,
+            'budget': self.budget,
+            'counts': counts
+        }
+
+
+class CircuitBreaker:
+    """
+    各平台的斷路器
+
+    連續失敗達到門檻時開啟，冷卻期間的請求直接拋出 CircuitOpenError；
+    冷卻結束後進入半開狀態，只放行一個試探請求，成功即關閉，失敗則重新開始冷卻。
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_BREAKER_THRESHOLD, cooldown: float = DEFAULT_BREAKER_COOLDOWN):
+        """
+        Args:
+            failure_threshold (int): 開啟斷路器的連續失敗次數
+            cooldown (float): 開啟後暫停的秒數
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _state(self, platform: str) -> Dict:
+        return self._states.setdefault(platform, {
+            'state': BREAKER_CLOSED, 'failures': 0, 'opened_at': 0.0, 'trial_in_flight': False, 'trips': 0,
+            'total_failures': 0
+        })
+
+    def retry_in(self, platform: str) -> float:
+        """斷路器開啟時距離可以試探的秒數，未開啟時回傳 0"""
+        with self._lock:
+            state = self._states.get(platform)
+            if state is None or state['state'] == BREAKER_CLOSED:
+                return 0.0
+            if state['state'] == BREAKER_HALF_OPEN:
+                return 0.0 if not state['trial_in_flight'] else self.cooldown
+            return max(0.0, state['opened_at'] + self.cooldown - time.monotonic())
+
+    def is_open(self, platform: str) -> bool:
+        """平台目前是否暫停中（不會佔用半開狀態的試探名額）"""
+        return self.retry_in(platform) > 0
+
+    def before_request(self, platform: str):
+        """請求前檢查，暫停中時拋出 CircuitOpenError"""
+        with self._lock:
+            state = self._state(platform)
+            if state['state'] == BREAKER_OPEN:
+                retry_in = state['opened_at'] + self.cooldown - time.monotonic()
+                if retry_in > 0:
+                    raise CircuitOpenError(platform, retry_in)
+                state['state'] = BREAKER_HALF_OPEN
+                state['trial_in_flight'] = False
+            if state['state'] == BREAKER_HALF_OPEN:
+                if state['trial_in_flight']:
+                    raise CircuitOpenError(platform, self.cooldown)
+                state['trial_in_flight'] = True
+
+    def record_success(self, platform: str):
+        with self._lock:
+            state = self._state(platform)
+            if state['state'] != BREAKER_CLOSED:
+                print(f"{platform} 斷路器關閉，恢復請求")
+            state.update(state=BREAKER_CLOSED, failures=0, trial_in_flight=False)
+
+    def record_failure(self, platform: str):
+        with self._lock:
+            state = self._state(platform)
+            state['failures'] += 1
+            state['total_failures'] += 1
+            if state['state'] == BREAKER_HALF_OPEN or (
+                    state['state'] == BREAKER_CLOSED and state['failures'] >= self.failure_threshold):
+                state.update(state=BREAKER_OPEN, opened_at=time.monotonic(), trial_in_flight=False)
+                state['trips'] += 1
+                print(f"⚠️ {platform} 連續失敗 {state['failures']} 次，暫停請求 {self.cooldown:.0f} 秒")
+
+    def failure_count(self, platform: str) -> int:
+        """平台累計的失敗次數（不會因成功而歸零）"""
+        with self._lock:
+            state = self._states.get(platform)
+            return state['total_failures'] if state else 0
+
+    def release(self, platform: str):
+        """請求因平台以外的原因中斷時，釋放半開狀態的試探名額"""
+        with self._lock:
+            self._state(platform)['trial_in_flight'] = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {platform: {k: v for k, v in state.items() if k != 'opened_at'}
+                    for platform, state in self._states.items()}
+
+
+class PlatformResilience:
+    """
+    整合自適應逾時、備援請求、重試與斷路器的請求執行器
+
+    傳輸層以 call / call_async 包裝實際送出請求的函數；
+    不屬於任何平台的網址只會套用重試，不會計入延遲與斷路器。
+    一次嘗試中的原始請求與備援請求對斷路器與延遲記錄來說視為同一個請求；
+    因爬取時間用完而中斷的請求（DeadlineExceeded）不計入斷路器。
+    """
+
+    def __init__(self, latency: Optional[LatencyTracker] = None, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, hedge: Optional[HedgePolicy] = None):
+        self.latency = latency or LatencyTracker()
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge or HedgePolicy(self.latency)
+
+    def timeout_for(self, platform: Optional[str], timeout: float) -> float:
+        """平台請求的逾時，不超過呼叫端指定的值（(connect, read) 形式的逾時維持不變）"""
+        if platform is None or not isinstance(timeout, (int, float)):
+            return timeout
+        return self.latency.timeout_for(platform, timeout)
+
+    @staticmethod
+    def is_idempotent(method: str, idempotent: Optional[bool]) -> bool:
+        return method.upper() in IDEMPOTENT_METHODS if idempotent is None else idempotent
+
+    def _attempts(self, method: str, idempotent: Optional[bool]) -> int:
+        return 1 + self.retry.retries if self.is_idempotent(method, idempotent) else 1
+
+    def _hedged(self, platform: Optional[str], method: str, send: Callable, idempotent: Optional[bool]) -> Callable:
+        """啟用備援請求的平台上，把冪等請求包裝成帶備援的送出函數"""
+        if not self.hedge.enabled(platform) or not self.is_idempotent(method, idempotent):
+            return send
+        return lambda: self.hedge.run(platform, send)
+
+    def _hedged_async(self, platform: Optional[str], method: str, send: Callable[[], Awaitable],
+                      idempotent: Optional[bool]) -> Callable[[], Awaitable]:
+        if not self.hedge.enabled(platform) or not self.is_idempotent(method, idempotent):
+            return send
+        return lambda: self.hedge.run_async(platform, send)
+
+    def _record(self, platform: Optional[str], elapsed: float, status_code: int):
+        if platform is None:
+            return
+        if status_code in FAILURE_STATUS_CODES:
+            self.breaker.record_failure(platform)
+        else:
+            self.latency.record(platform, elapsed)
+            self.breaker.record_success(platform)
+
+    def call(self, platform: Optional[str], method: str, send: Callable[[], requests.Response],
+             idempotent: Optional[bool] = None) -> requests.Response:
+        """
+        送出請求，連線失敗時依重試策略重試
+
+        Args:
+            platform (str, optional): 平台名稱，None 表示不套用斷路器
+            method (str): HTTP 方法，用於判斷是否可以重試
+            send (Callable): 實際送出請求的函數
+            idempotent (bool, optional): 是否可以安全重試與送出備援請求，None 表示依 HTTP 方法判斷
+
+        Raises:
+            CircuitOpenError: 平台暫停中
+        """
+        send = self._hedged(platform, method, send, idempotent)
+        attempts = self._attempts(method, idempotent)
+        for attempt in range(attempts):
+            if platform is not None:
+                self.breaker.before_request(platform)
+            start = time.monotonic()
+            try:
+                response = send()
+            except DeadlineExceeded:
+                if platform is not None:
+                    self.breaker.release(platform)
+                raise
+            except RETRYABLE_ERRORS:
+                if platform is not None:
+                    self.breaker.record_failure(platform)
+                if attempt + 1 >= attempts:
+                    raise
+                time.sleep(self.retry.delay(attempt))
+                continue
+            except requests.RequestException:
+                if platform is not None:
+                    self.breaker.record_failure(platform)
+                raise
+            except BaseException:
+                if platform is not None:
+                    self.breaker.release(platform)
+                raise
+            self._record(platform, time.monotonic() - start, response.status_code)
+            return response
+
+    async def call_async(self, platform: Optional[str], method: str, send: Callable[[], Awaitable],
+                         retryable_errors: tuple = RETRYABLE_ERRORS, failure_errors: tuple = (requests.RequestException,),
+                         idempotent: Optional[bool] = None):
+        """
+        call 的非同步版本
+
+        Args:
+            retryable_errors (tuple): 非同步客戶端中會重試的連線錯誤
+            failure_errors (tuple): 不重試但計入斷路器的請求錯誤（例如逾時）
+        """
+        send = self._hedged_async(platform, method, send, idempotent)
+        attempts = self._attempts(method, idempotent)
+        for attempt in range(attempts):
+            if platform is not None:
+                self.breaker.before_request(platform)
+            start = time.monotonic()
+            try:
+                response = await send()
+            except DeadlineExceeded:
+                if platform is not None:
+                    self.breaker.release(platform)
+                raise
+            except retryable_errors:
+                if platform is not None:
+                    self.breaker.record_failure(platform)
+                if attempt + 1 >= attempts:
+                    raise
+                await asyncio.sleep(self.retry.delay(attempt))
+                continue
+            except failure_errors:
+                if platform is not None:
+                    self.breaker.record_failure(platform)
+                raise
+            except BaseException:
+                if platform is not None:
+                    self.breaker.release(platform)
+                raise
+            self._record(platform, time.monotonic() - start, response.status_code)
+            return response
+
+    def failure_count(self, platform: str) -> int:
+        """平台累計的請求失敗次數，呼叫端可比較前後差值判斷期間是否發生錯誤"""
+        return self.breaker.failure_count(platform)
+
+    def stats(self) -> Dict:
+        """各平台的延遲百分位數、斷路器狀態與備援請求統計"""
+        return {
+            'retries': self.retry.retries,
+            'hedge': self.hedge.stats(),
+            'platforms': {
+                platform: {
+                    'latency_percentile': self.latency.latency_percentile(platform),
+                    'breaker': self.breaker.stats().get(platform, {'state': BREAKER_CLOSED})
+                }
+                for platform in PLATFORM_HOSTS
+            }
+        }
+
+
+# 整個行程共用的請求韌性設定
+resilience = PlatformResilience()
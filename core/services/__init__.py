@@ -3,10 +3,12 @@ from .product_comparison_service import ProductComparisonService
 from .daily_deals_service import DailyDealsService
 from .product_comparison_cache_service import ProductComparisonCacheService
 from .database_service import DatabaseService
+from .crawl_job_service import CrawlJobService
 
 __all__ = [
     'ProductComparisonService',
     'DailyDealsService', 
     'ProductComparisonCacheService',
-    'DatabaseService'
+    'DatabaseService',
+    'CrawlJobService'
 ]
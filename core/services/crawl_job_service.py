@@ -0,0 +1,282 @@
+"""
+背景爬蟲工作佇列服務
+將互動式爬蟲與每日促銷更新等長時間任務排入佇列，由固定數量的工作執行緒依序執行，
+長時間任務使用另外的佇列與執行緒，不會佔用互動式爬蟲的名額；
+工作狀態保存在 SQLite 中，伺服器重新啟動後未完成的工作會重新排入佇列
+"""
+
+import os
+import sys
+import json
+import uuid
+import queue
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+# 添加項目根目錄到路徑
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from core.database import get_db_connection, create_crawl_jobs_table
+
+# 同時執行的互動式爬蟲工作數量
+DEFAULT_JOB_WORKERS = int(os.getenv('CRAWL_JOB_WORKERS', '2'))
+# 同時執行的長時間工作數量（每日促銷更新、商品資料庫豐富化等）
+DEFAULT_BACKGROUND_JOB_WORKERS = int(os.getenv('CRAWL_BACKGROUND_JOB_WORKERS', '1'))
+
+LANE_INTERACTIVE = 'interactive'
+LANE_BACKGROUND = 'background'
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCESS = 'success'
+JOB_FAILED = 'failed'
+
+
+class CrawlJobService:
+    """
+    背景工作佇列
+
+    每種工作類型對應一個處理函數 handler(job_id, params, notify)：
+    notify(event) 用來回報進度，type 為 platform 的事件會寫入工作的 progress 欄位，
+    所有事件也會轉送給提交工作時註冊的 listener（例如串流 API）。
+    handler 回傳的字典會存成工作結果，其中的 session_id 另外存成欄位方便查詢。
+    註冊為 background 的工作類型在另外的佇列執行，互動式爬蟲不必排在長時間任務後面。
+    """
+
+    def __init__(self, crawler_manager, max_workers: int = DEFAULT_JOB_WORKERS,
+                 background_workers: int = DEFAULT_BACKGROUND_JOB_WORKERS):
+        """
+        初始化工作佇列服務
+
+        Args:
+            crawler_manager (CrawlerManager): 執行爬蟲的管理器
+            max_workers (int): 同時執行的互動式工作數量
+            background_workers (int): 同時執行的長時間工作數量
+        """
+        self.crawler_manager = crawler_manager
+        self.max_workers = max(1, max_workers)
+        self.background_workers = max(1, background_workers)
+        self.handlers = {}
+        self.job_lanes = {}
+        self._queues = {LANE_INTERACTIVE: queue.Queue(), LANE_BACKGROUND: queue.Queue()}
+        self._listeners = {}
+        self._live_counts = {}
+        self._workers = []
+        self._lock = threading.Lock()
+        self._started = False
+
+        self.register_handler('crawl', self._run_crawl_job)
+
+    def register_handler(self, job_type: str, handler: Callable[[str, Dict, Callable[[Dict], None]], Optional[Dict]],
+                         background: bool = False):
+        """
+        註冊工作類型的處理函數（必須在 start 之前註冊，重新排入的工作才找得到處理函數）
+
+        Args:
+            job_type (str): 工作類型
+            handler (Callable): 處理函數
+            background (bool): 是否為長時間工作（在另外的佇列執行，不佔用互動式爬蟲的執行緒）
+        """
+        self.handlers[job_type] = handler
+        self.job_lanes[job_type] = LANE_BACKGROUND if background else LANE_INTERACTIVE
+
+    def _lane_types(self, lane: str) -> list:
+        return [job_type for job_type, job_lane in self.job_lanes.items() if job_lane == lane]
+
+    def start(self):
+        """啟動工作執行緒，並把上次未完成的工作重新排入佇列"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        conn = get_db_connection()
+        try:
+            create_crawl_jobs_table(conn.cursor())
+            # 執行到一半被中斷的工作從頭開始重跑
+            conn.execute("UPDATE crawl_jobs SET status = ?, started_at = NULL WHERE status = ?", (JOB_QUEUED, JOB_RUNNING))
+            conn.commit()
+            pending = conn.execute(
+                "SELECT id, job_type FROM crawl_jobs WHERE status = ? ORDER BY created_at", (JOB_QUEUED,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        for row in pending:
+            self._queues[self.job_lanes.get(row['job_type'], LANE_INTERACTIVE)].put(row['id'])
+        if pending:
+            print(f"重新排入 {len(pending)} 個未完成的背景工作")
+
+        for lane, count in ((LANE_INTERACTIVE, self.max_workers), (LANE_BACKGROUND, self.background_workers)):
+            for i in range(count):
+                worker = threading.Thread(target=self._worker_loop, args=(lane,),
+                                          name=f"crawl-job-{lane}-{i + 1}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        print(f"背景工作佇列已啟動，互動式工作執行緒: {self.max_workers}，長時間工作執行緒: {self.background_workers}")
+
+    def submit(self, job_type: str, params: Optional[Dict] = None,
+               listener: Optional[Callable[[Dict], None]] = None) -> str:
+        """
+        提交背景工作
+
+        Args:
+            job_type (str): 工作類型
+            params (Dict, optional): 工作參數（必須可序列化為 JSON）
+            listener (Callable, optional): 接收此工作進度事件的函數，工作結束時會收到 type 為 job 的事件
+
+        Returns:
+            str: job_id
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"不支援的工作類型: {job_type}")
+
+        job_id = uuid.uuid4().hex
+        conn = get_db_connection()
+        try:
+            conn.execute(
+                "INSERT INTO crawl_jobs (id, job_type, params, status, progress, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, job_type, json.dumps(params or {}, ensure_ascii=False), JOB_QUEUED, json.dumps({}),
+                 datetime.now().isoformat())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        if listener is not None:
+            self._listeners[job_id] = listener
+        self._queues[self.job_lanes[job_type]].put(job_id)
+        self.start()
+        return job_id
+
+    def remove_listener(self, job_id: str):
+        """取消工作的 listener（例如串流客戶端已中斷連線），工作仍會繼續執行"""
+        self._listeners.pop(job_id, None)
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """
+        查詢工作狀態
+
+        Returns:
+            Optional[Dict]: 工作資料（含佇列位置與各平台進度），找不到時回傳 None
+        """
+        conn = get_db_connection()
+        try:
+            row = conn.execute("SELECT * FROM crawl_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            if job['status'] == JOB_QUEUED:
+                # 只計算同一個佇列中排在前面的工作
+                lane_types = self._lane_types(self.job_lanes.get(job['job_type'], LANE_INTERACTIVE))
+                placeholders = ','.join('?' * len(lane_types))
+                job['queue_position'] = conn.execute(
+                    f"SELECT COUNT(*) FROM crawl_jobs WHERE status = ? AND created_at <= ? AND job_type IN ({placeholders})",
+                    (JOB_QUEUED, job['created_at'], *lane_types)
+                ).fetchone()[0]
+        finally:
+            conn.close()
+
+        for field in ('params', 'progress', 'result'):
+            job[field] = json.loads(job[field]) if job[field] else {}
+        # 執行中的平台附上目前已取得的商品數
+        for platform, count in self._live_counts.get(job_id, {}).items():
+            job['progress'].setdefault(platform, {}).setdefault('products_so_far', count)
+        return job
+
+    def _worker_loop(self, lane: str):
+        jobs = self._queues[lane]
+        while True:
+            job_id = jobs.get()
+            try:
+                self._execute(job_id)
+            except Exception as e:
+                print(f"背景工作 {job_id} 執行異常: {e}")
+            finally:
+                jobs.task_done()
+
+    def _execute(self, job_id: str):
+        conn = get_db_connection()
+        try:
+            # 以單一 UPDATE 取得工作，同一個 job_id 被重複排入佇列時只有一個執行緒會執行
+            claimed = conn.execute(
+                "UPDATE crawl_jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?",
+                (JOB_RUNNING, datetime.now().isoformat(), job_id, JOB_QUEUED)
+            ).rowcount
+            conn.commit()
+            if not claimed:
+                return
+            row = conn.execute("SELECT job_type, params FROM crawl_jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+
+        job_type = row['job_type']
+        params = json.loads(row['params']) if row['params'] else {}
+        print(f"開始執行背景工作 {job_id} ({job_type})")
+
+        status, result, error = JOB_SUCCESS, {}, None
+        try:
+            result = self.handlers[job_type](job_id, params, lambda event: self._notify(job_id, event)) or {}
+        except Exception as e:
+            print(f"背景工作 {job_id} ({job_type}) 失敗: {e}")
+            status, error = JOB_FAILED, str(e)
+
+        conn = get_db_connection()
+        try:
+            conn.execute(
+                "UPDATE crawl_jobs SET status = ?, session_id = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result.get('session_id'), json.dumps(result, ensure_ascii=False, default=str), error,
+                 datetime.now().isoformat(), job_id)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._live_counts.pop(job_id, None)
+        listener = self._listeners.pop(job_id, None)
+        if listener is not None:
+            listener({'type': 'job', 'job_id': job_id, 'status': status, 'result': result, 'error': error})
+        print(f"背景工作 {job_id} ({job_type}) 結束，狀態: {status}")
+
+    def _notify(self, job_id: str, event: Dict):
+        """記錄進度事件並轉送給 listener"""
+        if event.get('type') == 'page':
+            counts = self._live_counts.setdefault(job_id, {})
+            counts[event['platform']] = counts.get(event['platform'], 0) + len(event.get('products', []))
+        elif event.get('type') == 'platform':
+            summary = {k: v for k, v in event.items() if k not in ('type', 'products')}
+            with self._lock:
+                conn = get_db_connection()
+                try:
+                    row = conn.execute("SELECT progress FROM crawl_jobs WHERE id = ?", (job_id,)).fetchone()
+                    progress = json.loads(row['progress']) if row and row['progress'] else {}
+                    progress[event['platform']] = summary
+                    conn.execute("UPDATE crawl_jobs SET progress = ? WHERE id = ?",
+                                 (json.dumps(progress, ensure_ascii=False, default=str), job_id))
+                    conn.commit()
+                finally:
+                    conn.close()
+
+        listener = self._listeners.get(job_id)
+        if listener is not None:
+            listener(event)
+
+    def _run_crawl_job(self, job_id: str, params: Dict, notify: Callable[[Dict], None]) -> Dict:
+        """執行互動式爬蟲工作，逐頁寫入資料庫並回報各平台進度"""
+        platforms = params.get('platforms') or self.crawler_manager.list_crawlers()
+        for platform in platforms:
+            notify({'type': 'platform', 'platform': platform, 'status': JOB_RUNNING, 'total_products': 0})
+
+        session_id = self.crawler_manager.run_all_crawlers_streaming(
+            keyword=params['keyword'],
+            max_products=params.get('max_products', 100),
+            min_price=params.get('min_price', 0),
+            max_price=params.get('max_price', 999999),
+            platforms=platforms,
+            on_page=lambda platform, products: notify({'type': 'page', 'platform': platform, 'products': products}),
+            on_platform_done=lambda platform, summary: notify({'type': 'platform', **summary}),
+            timeout_s=params.get('timeout_s')
+        )
+        return {'session_id': session_id}
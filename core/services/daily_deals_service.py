@@ -5,7 +5,6 @@
 
 import os
 import sys
-import importlib.util
 from datetime import datetime
 from threading import Thread
 
@@ -14,16 +13,28 @@ project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(_
 sys.path.insert(0, project_root)
 
 from core.database import get_db_connection
+from core.crawler_registry import crawler_registry
+from core.product import as_products
 
 
 class DailyDealsService:
-    def __init__(self, crawler_manager):
+    def __init__(self, crawler_manager, job_service=None):
+        """
+        Args:
+            crawler_manager (CrawlerManager): 爬蟲管理器
+            job_service (CrawlJobService, optional): 背景工作佇列，提供時更新任務會排入佇列執行
+        """
         self.crawler_manager = crawler_manager
+        self.job_service = job_service
         self.crawler_status = {
             'is_updating': False,
             'start_time': None,
             'completion_time': None
         }
+        
+        if job_service is not None:
+            job_service.register_handler('daily_deals_update', self._run_update_job, background=True)
+            job_service.register_handler('enrich_products', self._run_enrich_job, background=True)
     
     def get_status(self):
         """獲取爬蟲執行狀態"""
@@ -44,11 +55,24 @@ class DailyDealsService:
         })
 
         # 在背景執行
+        if self.job_service is not None:
+            job_id = self.job_service.submit('daily_deals_update')
+            return {'status': 'success', 'message': '每日促銷商品更新已排入佇列', 'job_id': job_id}
+        
         thread = Thread(target=self._update_daily_deals)
         thread.start()
         
         return {'status': 'success', 'message': '每日促銷商品更新已開始'}
     
+    def _run_update_job(self, job_id, params, notify):
+        """背景工作佇列的每日促銷更新處理函數"""
+        self.crawler_status.update({
+            'is_updating': True, 
+            'start_time': datetime.now().isoformat()
+        })
+        self._update_daily_deals()
+        return {}
+    
     def _update_daily_deals(self):
         """更新每日促銷商品的主要邏輯"""
         try:
@@ -76,17 +100,8 @@ class DailyDealsService:
         """執行並儲存爬蟲結果"""
         try:
             print(f"開始執行 {crawler_name} 爬蟲...")
-            # 修正路徑：從 core/services 到 crawlers 需要回到專案根目錄
-            project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            crawler_path = os.path.join(project_root, "crawlers", f"crawler_{crawler_name}.py")
-            print(f"載入爬蟲路徑: {crawler_path}")
-            
-            spec = importlib.util.spec_from_file_location(
-                f"crawler_{crawler_name}", 
-                crawler_path
-            )
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+            # 促銷爬蟲模組由共用登錄表載入，重複更新時不再重新執行模組
+            module = crawler_registry.get_module(crawler_name)
             
             # 修改為不儲存JSON，直接返回產品
             products = module.run(max_products=100, save_json=False) 
@@ -100,8 +115,8 @@ class DailyDealsService:
                 print(f"已清除 {crawler_name} 平台的舊資料")
                 
                 products_to_insert = [
-                    (crawler_name, p.get('title') or p.get('name'), p.get('price'), p.get('url'), p.get('image_url'), datetime.now().isoformat())
-                    for p in products
+                    (crawler_name, p.title, p.price, p.url, p.image_url, datetime.now().isoformat())
+                    for p in as_products(products, crawler_name)
                 ]
                 cursor.executemany(
                     "INSERT OR IGNORE INTO daily_deals (platform, title, price, url, image_url, crawl_time) VALUES (?, ?, ?, ?, ?, ?)",
@@ -157,19 +172,16 @@ class DailyDealsService:
             search_keywords = list(set(search_keywords))[:3]  # 限制最多3個關鍵字
             print(f"將使用關鍵字進行爬取: {search_keywords}")
             
-            for keyword in search_keywords:
-                try:
-                    print(f"開始爬取關鍵字: {keyword}")
-                    session_id = self.crawler_manager.run_all_crawlers(
-                        keyword=keyword,
-                        max_products=50,  # 每個關鍵字爬取50個商品
-                        min_price=0,
-                        max_price=999999,
-                        platforms=None  # 使用所有可用平台：carrefour, pchome, routn, yahoo
-                    )
-                    print(f"關鍵字 '{keyword}' 爬取完成，session_id: {session_id}")
-                except Exception as e:
-                    print(f"爬取關鍵字 '{keyword}' 時發生錯誤: {e}")
+            # 所有關鍵字與平台的組合一起排程，較快的平台不必等待最慢的平台
+            sessions = self.crawler_manager.run_keywords(
+                search_keywords,
+                platforms=None,  # 使用所有可用平台：carrefour, pchome, routn, yahoo
+                max_products=50,  # 每個關鍵字爬取50個商品
+                min_price=0,
+                max_price=999999
+            )
+            for keyword, session_id in sessions.items():
+                print(f"關鍵字 '{keyword}' 爬取完成，session_id: {session_id}")
                     
         except Exception as e:
             print(f"執行一般商品爬取時發生錯誤: {e}")
@@ -186,63 +198,17 @@ class DailyDealsService:
             'start_time': datetime.now().isoformat()
         })
 
-        def enrich_database():
-            try:
-                print("開始豐富商品資料庫...")
-                
-                # 熱門商品關鍵字列表
-                popular_keywords = [
-                    'iPhone 16', 'iPad', 'AirPods', 'MacBook', 
-                    'Switch', 'PS5', '筆電', '耳機', 
-                    '手機殼', '充電器', '滑鼠', '鍵盤',
-                    '攝影機', '相機', '電視', '冰箱',
-                    '洗衣機', '冷氣', '除濕機', '空氣清淨機'
-                ]
-                
-                successful_crawls = 0
-                total_products = 0
-                
-                for i, keyword in enumerate(popular_keywords[:8]):  # 限制8個關鍵字避免過長時間
-                    try:
-                        print(f"[{i+1}/8] 正在爬取關鍵字: {keyword}")
-                        session_id = self.crawler_manager.run_all_crawlers(
-                            keyword=keyword,
-                            max_products=30,  # 每個關鍵字30個商品
-                            min_price=0,
-                            max_price=999999,
-                            platforms=['pchome', 'yahoo', 'carrefour']  # 使用多個平台
-                        )
-                        
-                        if session_id:
-                            # 統計爬取到的商品數量
-                            conn = get_db_connection()
-                            count = conn.execute("SELECT COUNT(*) FROM products WHERE session_id = ?", (session_id,)).fetchone()[0]
-                            conn.close()
-                            
-                            successful_crawls += 1
-                            total_products += count
-                            print(f"關鍵字 '{keyword}' 爬取完成，獲得 {count} 個商品")
-                        
-                    except Exception as e:
-                        print(f"爬取關鍵字 '{keyword}' 時發生錯誤: {e}")
-                
-                print(f"商品資料庫豐富化完成: 成功爬取 {successful_crawls} 個關鍵字，總計 {total_products} 個商品")
-                return successful_crawls, total_products
-                
-            except Exception as e:
-                print(f"豐富商品資料庫時發生錯誤: {e}")
-                import traceback
-                traceback.print_exc()
-                return 0, 0
-            finally:
-                self.crawler_status.update({
-                    'is_updating': False, 
-                    'completion_time': datetime.now().isoformat()
-                })
-
         # 在背景執行
+        if self.job_service is not None:
+            job_id = self.job_service.submit('enrich_products')
+            return {
+                'status': 'success', 
+                'message': '商品資料庫豐富化已排入佇列，這可能需要幾分鐘時間',
+                'job_id': job_id
+            }
+
         def run_enrichment():
-            successful, total = enrich_database()
+            successful, total = self._enrich_database()
             print(f"資料庫豐富化任務完成: {successful} 個成功, {total} 個商品")
 
         thread = Thread(target=run_enrichment)
@@ -253,6 +219,67 @@ class DailyDealsService:
             'message': '商品資料庫豐富化已開始，這可能需要幾分鐘時間'
         }
     
+    def _run_enrich_job(self, job_id, params, notify):
+        """背景工作佇列的商品資料庫豐富化處理函數"""
+        self.crawler_status.update({
+            'is_updating': True, 
+            'start_time': datetime.now().isoformat()
+        })
+        successful, total = self._enrich_database()
+        print(f"資料庫豐富化任務完成: {successful} 個成功, {total} 個商品")
+        return {'successful_crawls': successful, 'total_products': total}
+    
+    def _enrich_database(self):
+        """爬取熱門關鍵字商品，回傳 (成功的關鍵字數, 商品總數)"""
+        try:
+            print("開始豐富商品資料庫...")
+            
+            # 熱門商品關鍵字列表
+            popular_keywords = [
+                'iPhone 16', 'iPad', 'AirPods', 'MacBook', 
+                'Switch', 'PS5', '筆電', '耳機', 
+                '手機殼', '充電器', '滑鼠', '鍵盤',
+                '攝影機', '相機', '電視', '冰箱',
+                '洗衣機', '冷氣', '除濕機', '空氣清淨機'
+            ]
+            
+            successful_crawls = 0
+            total_products = 0
+            
+            keywords = popular_keywords[:8]  # 限制8個關鍵字避免過長時間
+            print(f"正在批次爬取 {len(keywords)} 個關鍵字: {keywords}")
+            sessions = self.crawler_manager.run_keywords(
+                keywords,
+                platforms=['pchome', 'yahoo', 'carrefour'],  # 使用多個平台
+                max_products=30,  # 每個關鍵字30個商品
+                min_price=0,
+                max_price=999999
+            )
+            
+            conn = get_db_connection()
+            for keyword, session_id in sessions.items():
+                # 統計爬取到的商品數量
+                count = conn.execute("SELECT COUNT(*) FROM products WHERE session_id = ?", (session_id,)).fetchone()[0]
+                if count:
+                    successful_crawls += 1
+                total_products += count
+                print(f"關鍵字 '{keyword}' 爬取完成，獲得 {count} 個商品")
+            conn.close()
+            
+            print(f"商品資料庫豐富化完成: 成功爬取 {successful_crawls} 個關鍵字，總計 {total_products} 個商品")
+            return successful_crawls, total_products
+            
+        except Exception as e:
+            print(f"豐富商品資料庫時發生錯誤: {e}")
+            import traceback
+            traceback.print_exc()
+            return 0, 0
+        finally:
+            self.crawler_status.update({
+                'is_updating': False, 
+                'completion_time': datetime.now().isoformat()
+            })
+    
     def reset_status(self):
         """強制重置爬蟲狀態（調試用）"""
         self.crawler_status.update({
@@ -151,7 +151,7 @@ class ProductComparisonCacheService:
             else:
                 search_keyword = search_keyword.strip()
             
-            # 即時爬取各平台的候選商品
+            # 即時爬取各平台的候選商品（相同關鍵字近期爬過時 run_single_crawler 直接使用爬取結果快取，不寫入資料庫）
             candidate_products = []
             crawl_platforms = ['carrefour', 'pchome', 'yahoo', 'routn']
             
@@ -10,9 +10,21 @@ import re
 class ProductComparisonService:
     """商品比較服務類別"""
     
-    def __init__(self, gemini_model=None):
-        self.model = gemini_model
+    def __init__(self, gemini_model=None, model_provider=None):
+        """
+        Args:
+            gemini_model: 已建立的 Gemini 模型
+            model_provider (Callable, optional): 第一次比較時才呼叫以取得模型，用於延遲載入 Gemini
+        """
+        self._model = gemini_model
+        self.model_provider = model_provider
         self.similarity_threshold = 0.80
+
+    @property
+    def model(self):
+        if self._model is None and self.model_provider is not None:
+            self._model = self.model_provider()
+        return self._model
     
     def compare_products(self, target_product, candidate_products):
         """比較單個目標商品與候選商品"""
@@ -0,0 +1,209 @@
+"""
+啟動時間分析與延遲初始化
+記錄伺服器啟動各階段的耗時、分析模組匯入時間，
+並提供第一次使用（或在背景）才執行的延遲初始化，讓伺服器盡快開始接受連線
+"""
+
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 啟動時輸出各階段耗時與匯入時間分析（也可用 python main.py --profile-startup）
+STARTUP_PROFILE = os.getenv('STARTUP_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+T = TypeVar('T')
+
+_IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def module_available(name: str) -> bool:
+    """確認套件是否已安裝（不執行套件本身，只會匯入上層套件）"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def profile_imports(module: str = 'app.web_app', top: int = 15) -> Dict:
+    """
+    在獨立的 Python 行程中以 -X importtime 匯入模組，統計各頂層套件的匯入時間
+
+    使用獨立行程才能量到冷啟動的匯入成本（目前行程已匯入的模組不會重新計時）。
+
+    Args:
+        module (str): 要分析的模組
+        top (int): 回傳耗時最多的套件數量
+
+    Returns:
+        Dict: total_ms 為匯入該模組的總耗時，packages 為依自身耗時排序的套件列表
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [project_root, env.get('PYTHONPATH')]))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=project_root, env=env, capture_output=True, text=True
+    )
+
+    packages = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        package = name.split('.')[0]
+        stat = packages.setdefault(package, {'package': package, 'self_ms': 0.0, 'modules': 0})
+        stat['self_ms'] += self_us / 1000
+        stat['modules'] += 1
+        if name == module and len(indent) == 1:
+            total_us = cumulative_us
+
+    ranked = sorted(packages.values(), key=lambda p: p['self_ms'], reverse=True)
+    return {
+        'module': module,
+        'total_ms': total_us / 1000,
+        'packages': [{**p, 'self_ms': round(p['self_ms'], 1)} for p in ranked[:top]],
+        'error': proc.stderr.strip().splitlines()[-1] if proc.returncode != 0 and proc.stderr.strip() else None
+    }
+
+
+class StartupProfiler:
+    """
+    啟動階段計時器
+
+    以 phase 區塊記錄各初始化階段，mark_ready 記錄從行程開始到可以接受連線的總時間。
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases = []
+        self.ready_in = None
+        self.import_breakdown = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """記錄一個初始化階段的耗時"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def mark_ready(self) -> float:
+        """記錄伺服器可接受連線的時間點，回傳啟動總秒數"""
+        self.ready_in = time.perf_counter() - self.started_at
+        return self.ready_in
+
+    def summary(self) -> Dict:
+        """啟動耗時摘要"""
+        return {
+            'ready_in': self.ready_in,
+            'phases': [{'name': name, 'seconds': round(seconds, 4)} for name, seconds in self.phases],
+            'import_breakdown': self.import_breakdown
+        }
+
+    def report(self):
+        """輸出各階段耗時與匯入時間分析"""
+        print("⏱️ 啟動階段耗時:")
+        for name, seconds in self.phases:
+            print(f"   {name:<24} {seconds * 1000:8.1f} ms")
+        if self.ready_in is not None:
+            print(f"   {'可接受連線':<24} {self.ready_in * 1000:8.1f} ms（自行程啟動）")
+        if self.import_breakdown:
+            print(f"📦 匯入 {self.import_breakdown['module']} 共 {self.import_breakdown['total_ms']:.1f} ms，耗時最多的套件:")
+            for package in self.import_breakdown['packages']:
+                print(f"   {package['package']:<24} {package['self_ms']:8.1f} ms ({package['modules']} 個模組)")
+            if self.import_breakdown['error']:
+                print(f"   ⚠️ 匯入失敗: {self.import_breakdown['error']}")
+
+
+class LazyInit(Generic[T]):
+    """
+    延遲初始化的值
+
+    第一次呼叫 get 時才執行初始化函數（多執行緒同時呼叫只會執行一次），
+    初始化失敗時記住錯誤並回傳 None，不會在每次請求時重試。
+    也可以用 start_background 在伺服器啟動後於背景先行初始化。
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        """
+        Args:
+            name (str): 顯示在日誌與狀態中的名稱
+            factory (Callable): 建立值的函數
+        """
+        self.name = name
+        self.factory = factory
+        self.error = None
+        self.init_time = None
+        self._value = None
+        self._done = False
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._done
+
+    def get(self) -> Optional[T]:
+        """取得值，尚未初始化時先執行初始化函數"""
+        if self._done:
+            return self._value
+        with self._lock:
+            if not self._done:
+                start = time.perf_counter()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self.error = str(e)
+                    print(f"Warning: {self.name} 初始化失敗: {e}")
+                self.init_time = time.perf_counter() - start
+                self._done = True
+        return self._value
+
+    def start_background(self) -> threading.Thread:
+        """在背景執行緒中初始化"""
+        thread = threading.Thread(target=self.get, name=f"init-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict:
+        """初始化狀態"""
+        return {
+            'initialized': self._done,
+            'available': self._done and self._value is not None,
+            'init_time': self.init_time,
+            'error': self.error
+        }
+
+
+def run_in_background(name: str, func: Callable, *args, **kwargs) -> threading.Thread:
+    """在背景執行緒中執行啟動工作，例外只輸出警告不會中斷伺服器"""
+    def target():
+        start = time.perf_counter()
+        try:
+            func(*args, **kwargs)
+            print(f"背景啟動工作 {name} 完成，耗時 {time.perf_counter() - start:.2f} 秒")
+        except Exception as e:
+            print(f"⚠️ 背景啟動工作 {name} 失敗: {e}")
+
+    thread = threading.Thread(target=target, name=f"startup-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+# 整個行程共用的啟動計時器（匯入此模組的時間點視為起點，應盡早匯入）
+startup_profiler = StartupProfiler()
+
+
+if __name__ == '__main__':
+    target = sys.argv[1] if len(sys.argv) > 1 else 'app.web_app'
+    startup_profiler.import_breakdown = profile_imports(target)
+    startup_profiler.report()
@@ -1,13 +1,38 @@
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import json
 import time
-import random
+import threading
+import itertools
+import math
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Iterator
 import os
+import sys
 import uuid
 
+# 以檔案路徑載入時也能匯入專案的 core 模組
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.platforms import platform_url
+from core.product import Product, json_default
+from core.http_client import AsyncHttpClient, ASYNC_REQUEST_ERRORS, http_get, get_host_limit
+from core.fan_out import ordered_fan_out, ordered_fan_out_async
+
+try:
+    from lxml import etree, html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# 網站基底 URL，用於組合完整的商品連結
+BASE_URL = "https://online.carrefour.com.tw"
+PAGE_SIZE = 20
+# 預設使用並行分頁：同時請求多個 start 位移，遇到不足一頁或空白頁即停止送出新請求
+PARALLEL_PAGINATION = True
+
 def get_headers() -> Dict:
     """生成模擬的請求頭"""
     return {
@@ -19,132 +44,356 @@ def get_headers() -> Dict:
         'Upgrade-Insecure-Requests': '1'
     }
 
-def run(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999) -> List[Dict]:
+def build_search_url(keyword: str, page_start: int) -> str:
+    """家樂福搜尋用的 URL，加上分頁參數"""
+    return platform_url(f"{BASE_URL}/zh/search/?q={keyword}&start={page_start}")
+
+def _class_xpath(class_name: str) -> str:
+    """XPath 條件：class 屬性包含指定的類別名稱"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+if LXML_AVAILABLE:
+    # 預先編譯的 XPath，每頁只需走訪一次 DOM 樹
+    _PRODUCT_XPATH = etree.XPath(
+        f"//div[{_class_xpath('hot-recommend-item')} and {_class_xpath('line')}]"
+    )
+    _TITLE_LINK_XPATH = etree.XPath(f"(.//div[{_class_xpath('commodity-desc')}])[1]//a[1]")
+    _PRICE_XPATH = etree.XPath(f"(.//div[{_class_xpath('current-price')}])[1]//em[1]")
+    _IMAGE_XPATH = etree.XPath(f".//img[{_class_xpath('m_lazyload')}][1]")
+
+# 沒有 lxml 時只讓 BeautifulSoup 建立商品區塊的節點，略過頁面其餘部分
+_PRODUCT_STRAINER = SoupStrainer('div', class_='hot-recommend-item line')
+
+PARSER_ENGINE = 'lxml' if LXML_AVAILABLE else 'soupstrainer'
+
+# 解析耗用的 CPU 時間（解析期間持有 GIL，會拖慢其他爬蟲執行緒）
+_parse_stats = {'pages': 0, 'cpu_seconds': 0.0}
+_parse_stats_lock = threading.Lock()
+
+def get_parse_stats() -> Dict:
+    """目前解析引擎與每頁平均解析 CPU 時間"""
+    with _parse_stats_lock:
+        pages, cpu_seconds = _parse_stats['pages'], _parse_stats['cpu_seconds']
+    return {
+        'engine': PARSER_ENGINE,
+        'pages': pages,
+        'cpu_ms_total': cpu_seconds * 1000,
+        'cpu_ms_per_page': cpu_seconds * 1000 / pages if pages else 0.0
+    }
+
+def build_product(title: str, href: str, price_text: str, img_url: str) -> Product:
+    """將商品區塊中取出的文字組成商品資料，格式與其他爬蟲一致"""
+    # 嘗試提取價格數字
+    try:
+        price = int(''.join(filter(str.isdigit, price_text))) if price_text != 'N/A' else 0
+    except ValueError:
+        price = 0
+
+    return Product(title, price, img_url, BASE_URL + href if href else 'N/A', "Carrefour")
+
+def _extract_products_lxml(html: str) -> Optional[List[Product]]:
+    """以 lxml 與預先編譯的 XPath 解析商品區塊"""
+    if not html.strip():
+        return None
+    tree = lxml_html.fromstring(html)
+    product_list = _PRODUCT_XPATH(tree)
+    if not product_list:
+        return None
+
+    products = []
+    for product in product_list:
+        try:
+            links = _TITLE_LINK_XPATH(product)
+            link_tag = links[0] if links else None
+            prices = _PRICE_XPATH(product)
+            images = _IMAGE_XPATH(product)
+            img_url = images[0].get('data-src', images[0].get('src', 'N/A')) if images else 'N/A'
+            products.append(build_product(
+                link_tag.text_content().strip() if link_tag is not None else 'N/A',
+                link_tag.get('href', '') if link_tag is not None else '',
+                prices[0].text_content().strip() if prices else 'N/A',
+                img_url
+            ))
+        except Exception as e:
+            print(f"解析單一商品時發生錯誤: {e}")
+    return products
+
+def _extract_products_soup(html: str) -> Optional[List[Product]]:
+    """以 BeautifulSoup 解析商品區塊（只建立商品區塊的節點）"""
+    soup = BeautifulSoup(html, 'html.parser', parse_only=_PRODUCT_STRAINER)
+    product_list = soup.find_all('div', class_='hot-recommend-item line')
+    if not product_list:
+        return None
+
+    products = []
+    for product in product_list:
+        try:
+            desc_div = product.find('div', class_='commodity-desc')
+            link_tag = desc_div.find('a') if desc_div else None
+            price_tag = product.find('div', class_='current-price')
+            price_em = price_tag.find('em') if price_tag else None
+            img_tag = product.find('img', class_='m_lazyload')
+            products.append(build_product(
+                link_tag.text.strip() if link_tag else 'N/A',
+                link_tag['href'] if link_tag else '',
+                price_em.text.strip() if price_em else 'N/A',
+                img_tag.get('data-src', img_tag.get('src', 'N/A')) if img_tag else 'N/A'
+            ))
+        except Exception as e:
+            print(f"解析單一商品時發生錯誤: {e}")
+    return products
+
+def parse_page_products(html: str, engine: Optional[str] = None) -> Optional[List[Product]]:
     """
-    爬取家樂福線上購物的商品資訊 (根據 2025 年版面更新，支援分頁)
-    
-    注意：本版本使用 requests + BeautifulSoup，輕量級且快速
-    如果此版本因反爬蟲機制失效，可使用 selenium/crawler_carrefour_selenium.py 備用版本
+    解析單頁搜尋結果 HTML 中的所有商品（未套用價格篩選）
+
+    有 lxml 時使用預先編譯的 XPath，否則以 SoupStrainer 限制 BeautifulSoup 只解析商品區塊。
 
     Args:
-        keyword (str): 要搜尋的商品關鍵字
-        max_products (int): 最大商品數量限制
-        min_price (int): 最低價格篩選
-        max_price (int): 最高價格篩選
+        html (str): 搜尋結果頁面 HTML
+        engine (str, optional): 指定 'lxml' 或 'soupstrainer'（效能基準測試比較用），None 表示使用 PARSER_ENGINE
 
     Returns:
-        List[Dict]: 商品資訊列表
+        Optional[List[Product]]: 頁面上的商品；找不到任何商品區塊時回傳 None
     """
-    products = []
+    start = time.thread_time()
+    try:
+        if (engine or PARSER_ENGINE) == 'lxml' and LXML_AVAILABLE:
+            return _extract_products_lxml(html)
+        return _extract_products_soup(html)
+    finally:
+        elapsed = time.thread_time() - start
+        with _parse_stats_lock:
+            _parse_stats['pages'] += 1
+            _parse_stats['cpu_seconds'] += elapsed
+
+def filter_by_price(products: List[Product], min_price: int, max_price: int) -> List[Product]:
+    """價格篩選"""
+    return [p for p in products if min_price <= p.price <= max_price]
+
+def parse_search_page(html: str, min_price: int, max_price: int) -> Optional[List[Product]]:
+    """
+    解析單頁搜尋結果 HTML
+
+    Returns:
+        Optional[List[Product]]: 符合價格範圍的商品；頁面上找不到任何商品區塊時回傳 None
+    """
+    products = parse_page_products(html)
+    return None if products is None else filter_by_price(products, min_price, max_price)
+
+def fetch_search_page(keyword: str, page_start: int) -> Optional[List[Product]]:
+    """請求並解析單頁搜尋結果（未套用價格篩選）"""
+    response = http_get(build_search_url(keyword, page_start), headers=get_headers(), timeout=15)
+    response.raise_for_status()
+    return parse_page_products(response.text)
+
+async def fetch_search_page_async(client: AsyncHttpClient, keyword: str, page_start: int) -> Optional[List[Product]]:
+    """fetch_search_page 的非同步版本"""
+    response = await client.get(build_search_url(keyword, page_start), headers=get_headers(), timeout=15)
+    response.raise_for_status()
+    return parse_page_products(response.text)
+
+def fan_out_window(max_products: int, max_in_flight: Optional[int]) -> int:
+    """同時請求的頁數：不超過主機併發上限，也不超過補滿數量所需的頁數"""
+    limit = max_in_flight or get_host_limit(platform_url(BASE_URL))
+    return max(1, min(limit, math.ceil(max_products / PAGE_SIZE)))
+
+def is_last_page(page_items: List[Product], page_products: List[Product]) -> bool:
+    """
+    是否停止分頁：頁面不足一頁代表已是最後一頁；
+    篩選後沒有任何商品時沿用原本的行為直接停止
+    """
+    return len(page_items) < PAGE_SIZE or not page_products
+
+def iter_pages_serial(keyword: str, max_products: int, min_price: int, max_price: int) -> Iterator[List[Product]]:
+    """逐頁依序請求，產生每頁符合價格範圍的商品"""
+    collected = 0
     page_start = 0
-    headers = get_headers()
     
-    print(f"開始爬取家樂福商品：'{keyword}'...")
-    
-    while len(products) < max_products:
-        # 家樂福搜尋用的 URL，加上分頁參數
-        url = f"https://online.carrefour.com.tw/zh/search/?q={keyword}&start={page_start}"
+    while collected < max_products:
+        page_number = page_start // PAGE_SIZE + 1
         
         try:
-            print(f"正在爬取第 {page_start//20 + 1} 頁...")
-            
-            # 發送 GET 請求
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
+            print(f"正在爬取第 {page_number} 頁...")
+            page_items = fetch_search_page(keyword, page_start)
+        except requests.exceptions.RequestException as e:
+            print(f"請求第 {page_number} 頁時發生錯誤: {e}")
+            break
+        except Exception as e:
+            print(f"處理第 {page_number} 頁時發生未知錯誤: {e}")
+            break
+
+        if page_items is None:
+            print(f"第 {page_number} 頁找不到任何相關商品，停止爬取")
+            break
+
+        page_products = filter_by_price(page_items, min_price, max_price)
+        print(f"第 {page_number} 頁獲取到 {len(page_products)} 個商品")
+        collected += len(page_products)
+        yield page_products
+
+        if is_last_page(page_items, page_products):
+            print(f"第 {page_number} 頁僅有 {len(page_products)} 個商品，可能是最後一頁")
+            break
+
+        # 更新頁面起始位置（請求間隔由傳輸層的速率限制器控制）
+        page_start += PAGE_SIZE
 
-            # 使用 BeautifulSoup 解析 HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
+def iter_pages_parallel(keyword: str, max_products: int, min_price: int, max_price: int,
+                        max_in_flight: Optional[int] = None) -> Iterator[List[Product]]:
+    """
+    並行分頁：依 start 位移順序產生每頁符合價格範圍的商品
 
-            # 找到所有包含商品資訊的 div 區塊
-            product_list = soup.find_all('div', class_='hot-recommend-item line')
+    家樂福不提供總頁數，因此從位移 0 開始以主機併發上限同時請求連續的位移，
+    每處理完一頁才送出下一個位移；商品數量足夠或遇到最後一頁時停止送出新請求，
+    尚未開始的請求會被取消。
 
-            if not product_list:
-                print(f"第 {page_start//20 + 1} 頁找不到任何相關商品，停止爬取")
+    Args:
+        keyword (str): 要搜尋的商品關鍵字
+        max_products (int): 最大商品數量限制
+        min_price (int): 最低價格篩選
+        max_price (int): 最高價格篩選
+        max_in_flight (int, optional): 同時請求的頁數上限，None 表示使用主機併發上限
+    """
+    collected = 0
+    window = fan_out_window(max_products, max_in_flight)
+    fan_out = ordered_fan_out(
+        lambda page_start: fetch_search_page(keyword, page_start), itertools.count(0, PAGE_SIZE), window,
+        url=platform_url(BASE_URL)
+    )
+    try:
+        for page_start, future in fan_out:
+            page_number = page_start // PAGE_SIZE + 1
+            try:
+                page_items = future.result()
+            except requests.exceptions.RequestException as e:
+                print(f"請求第 {page_number} 頁時發生錯誤: {e}")
+                break
+            except Exception as e:
+                print(f"處理第 {page_number} 頁時發生未知錯誤: {e}")
                 break
 
-            # 網站基底 URL，用於組合完整的商品連結
-            base_url = "https://online.carrefour.com.tw"
-            page_products = []
-
-            # 遍歷每一個商品區塊並提取所需資訊
-            for product in product_list:
-                try:
-                    # 提取商品標題和連結
-                    desc_div = product.find('div', class_='commodity-desc')
-                    link_tag = desc_div.find('a') if desc_div else None
-                    
-                    title = link_tag.text.strip() if link_tag else 'N/A'
-                    relative_link = link_tag['href'] if link_tag else ''
-                    full_link = base_url + relative_link if relative_link else 'N/A'
-
-                    # 提取商品價格
-                    price_tag = product.find('div', class_='current-price')
-                    price_em = price_tag.find('em') if price_tag else None
-                    price_text = price_em.text.strip() if price_em else 'N/A'
-                    
-                    # 嘗試提取價格數字
-                    try:
-                        price = int(''.join(filter(str.isdigit, price_text))) if price_text != 'N/A' else 0
-                    except:
-                        price = 0
-
-                    # 價格篩選
-                    if price < min_price or price > max_price:
-                        continue
-
-                    # 提取商品圖片 URL
-                    img_tag = product.find('img', class_='m_lazyload')
-                    img_url = img_tag.get('data-src', img_tag.get('src', 'N/A')) if img_tag else 'N/A'
-
-                    # 將提取的資料存成一個 dictionary，格式與其他爬蟲一致
-                    product_info = {
-                        "title": title,
-                        "price": price,
-                        "image_url": img_url,
-                        "url": full_link,
-                        "platform": "Carrefour"
-                    }
-                    page_products.append(product_info)
-                    
-                except Exception as e:
-                    print(f"解析單一商品時發生錯誤: {e}")
-                    continue
-
-            # 如果這一頁沒有找到商品，停止爬取
-            if not page_products:
-                print(f"第 {page_start//20 + 1} 頁沒有找到有效商品，停止爬取")
+            if page_items is None:
+                print(f"第 {page_number} 頁找不到任何相關商品，停止爬取")
                 break
 
-            products.extend(page_products)
-            print(f"第 {page_start//20 + 1} 頁獲取到 {len(page_products)} 個商品")
+            page_products = filter_by_price(page_items, min_price, max_price)
+            print(f"第 {page_number} 頁獲取到 {len(page_products)} 個商品")
+            collected += len(page_products)
+            yield page_products
 
-            # 檢查是否達到最大商品數量
-            if len(products) >= max_products:
+            if collected >= max_products or is_last_page(page_items, page_products):
                 break
+    finally:
+        fan_out.close()
+
+def run_stream(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
+               parallel: bool = PARALLEL_PAGINATION) -> Iterator[List[Product]]:
+    """
+    逐頁產生家樂福商品資訊（總數不超過 max_products）
+
+    Args:
+        keyword (str): 要搜尋的商品關鍵字
+        max_products (int): 最大商品數量限制
+        min_price (int): 最低價格篩選
+        max_price (int): 最高價格篩選
+        parallel (bool): 是否使用並行分頁
 
-            # 檢查這一頁商品數量是否少於預期，如果是則可能是最後一頁
-            if len(page_products) < 20:
-                print(f"第 {page_start//20 + 1} 頁僅有 {len(page_products)} 個商品，可能是最後一頁")
+    Yields:
+        List[Product]: 單頁的商品資訊列表
+    """
+    print(f"開始爬取家樂福商品：'{keyword}'...")
+    
+    if parallel:
+        pages = iter_pages_parallel(keyword, max_products, min_price, max_price)
+    else:
+        pages = iter_pages_serial(keyword, max_products, min_price, max_price)
+    
+    collected = 0
+    try:
+        for page_products in pages:
+            page_products = page_products[:max_products - collected]
+            if page_products:
+                collected += len(page_products)
+                yield page_products
+            if collected >= max_products:
                 break
+    finally:
+        pages.close()
 
-            # 更新頁面起始位置
-            page_start += 20
-            
-            # 延遲1-2秒，避免被網站阻擋
-            time.sleep(random.uniform(1, 2))
+def run(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
+        parallel: bool = PARALLEL_PAGINATION) -> List[Product]:
+    """
+    爬取家樂福線上購物的商品資訊 (根據 2025 年版面更新，支援分頁)
+    
+    注意：本版本使用 requests + lxml（未安裝時改用 BeautifulSoup），輕量級且快速
+    如果此版本因反爬蟲機制失效，可使用 selenium/crawler_carrefour_selenium.py 備用版本
 
-        except requests.exceptions.RequestException as e:
-            print(f"請求第 {page_start//20 + 1} 頁時發生錯誤: {e}")
-            break
-        except Exception as e:
-            print(f"處理第 {page_start//20 + 1} 頁時發生未知錯誤: {e}")
-            break
+    Args:
+        keyword (str): 要搜尋的商品關鍵字
+        max_products (int): 最大商品數量限制
+        min_price (int): 最低價格篩選
+        max_price (int): 最高價格篩選
+        parallel (bool): 是否使用並行分頁
 
-    # 限制返回的商品數量
-    products = products[:max_products]
+    Returns:
+        List[Product]: 商品資訊列表
+    """
+    products = [product for page_products in run_stream(keyword, max_products, min_price, max_price, parallel)
+                for product in page_products]
     print(f"總共獲取到 {len(products)} 個家樂福商品")
+    stats = get_parse_stats()
+    print(f"解析引擎: {stats['engine']}，平均每頁解析 CPU 時間 {stats['cpu_ms_per_page']:.1f} ms")
     return products
 
+async def run_async(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
+                    client: AsyncHttpClient = None, parallel: bool = PARALLEL_PAGINATION) -> List[Product]:
+    """
+    run 的非同步版本，透過共用的 AsyncHttpClient 發送請求
+
+    Args:
+        keyword (str): 要搜尋的商品關鍵字
+        max_products (int): 最大商品數量限制
+        min_price (int): 最低價格篩選
+        max_price (int): 最高價格篩選
+        client (AsyncHttpClient, optional): 共用的非同步 HTTP 客戶端，None 表示自行建立
+        parallel (bool): 是否同時請求多個位移，False 時逐頁依序請求
+
+    Returns:
+        List[Product]: 商品資訊列表
+    """
+    if client is None:
+        async with AsyncHttpClient() as own_client:
+            return await run_async(keyword, max_products, min_price, max_price, own_client, parallel)
+    
+    products = []
+    window = fan_out_window(max_products, None) if parallel else 1
+    fan_out = ordered_fan_out_async(
+        lambda page_start: fetch_search_page_async(client, keyword, page_start), itertools.count(0, PAGE_SIZE), window
+    )
+    try:
+        async for page_start, task in fan_out:
+            try:
+                page_items = await task
+            except ASYNC_REQUEST_ERRORS as e:
+                print(f"請求第 {page_start//PAGE_SIZE + 1} 頁時發生錯誤: {e}")
+                break
+            except Exception as e:
+                print(f"處理第 {page_start//PAGE_SIZE + 1} 頁時發生未知錯誤: {e}")
+                break
+
+            if page_items is None:
+                break
+
+            page_products = filter_by_price(page_items, min_price, max_price)
+            products.extend(page_products)
+            if len(products) >= max_products or is_last_page(page_items, page_products):
+                break
+    finally:
+        await fan_out.aclose()
+
+    return products[:max_products]
+
 def main(keyword: str, output_file: str = None, max_products: int = 100) -> None:
     """主函數：爬取家樂福商品資訊並保存為JSON(測試用)"""
     print(f"開始爬取關鍵字: {keyword}")
@@ -171,7 +420,7 @@ def main(keyword: str, output_file: str = None, max_products: int = 100) -> None
         output_file = f"./crawl_data/carrefour_{keyword}_{uuid.uuid4().hex}.json"
     
     with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+        json.dump(output_data, f, ensure_ascii=False, indent=2, default=json_default)
     print(f"結果已保存至 {output_file}")
 
 if __name__ == "__main__":
@@ -2,12 +2,30 @@ import requests
 import json
 import time
 import re
-from typing import List, Dict
+import sys
+import math
+import itertools
+from typing import List, Dict, Iterable, Iterator, Optional
 import uuid
 from urllib.parse import quote
 from datetime import datetime
 import os
 
+# 以檔案路徑載入時也能匯入專案的 core 模組
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.platforms import platform_url
+from core.product import Product, json_default
+from core.http_client import AsyncHttpClient, ASYNC_REQUEST_ERRORS, http_get, get_host_limit
+from core.fan_out import ordered_fan_out, ordered_fan_out_async
+
+SEARCH_URL = "https://ecshweb.pchome.com.tw/search/v3.3/all/results"
+PAGE_SIZE = 20
+# 預設使用並行分頁：先取第 1 頁，再同時請求後續頁面
+PARALLEL_PAGINATION = True
+
 def get_headers() -> Dict:
     """生成模擬的請求頭"""
     return {
@@ -33,76 +51,301 @@ def extract_price(price_text: str) -> int:
             return 0
     return 0
 
-def api_method(keyword: str, max_products: int, min_price: int, max_price: int) -> List[Dict]:
-    """使用 API 方法爬取 PChome 商品"""
-    print("🔄 使用 PChome API 方法...")
+def build_search_params(keyword: str, page: int, size: int) -> Dict:
+    """構建搜尋 API 的查詢參數"""
+    return {
+        "q": keyword,
+        "page": page,
+        "size": size,
+        "sort": "sale/dc"
+    }
+
+def parse_search_page(data: Dict, min_price: int, max_price: int) -> Optional[List[Product]]:
+    """解析單頁搜尋結果，回傳符合價格範圍的商品；沒有商品資料時回傳 None"""
+    prods = data.get('prods')
+    if not prods:
+        return None
     
-    products = []
+    page_products = []
+    for prod in prods:
+        product_info = extract_product_info_api(prod)
+        if product_info:
+            # 價格過濾
+            price = product_info.price
+            if min_price <= price <= max_price:
+                page_products.append(product_info)
+    return page_products
+
+def dedupe_by_url(products: List[Product]) -> List[Product]:
+    """依商品網址去重複，保留第一次出現的順序"""
+    unique_products = []
+    seen_urls = set()
+    
+    for product in products:
+        if product.url and product.url not in seen_urls:
+            seen_urls.add(product.url)
+            unique_products.append(product)
+    return unique_products
+
+def fetch_search_page(keyword: str, page: int, size: int) -> Dict:
+    """請求單頁搜尋結果"""
+    response = http_get(platform_url(SEARCH_URL), params=build_search_params(keyword, page, size), headers=get_headers(), timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+def remaining_pages(first_page: Dict) -> Iterable[int]:
+    """依第 1 頁回應的 totalPage 產生後續頁碼，沒有提供時持續產生直到呼叫端停止"""
+    total_pages = first_page.get('totalPage')
+    if total_pages:
+        return range(2, int(total_pages) + 1)
+    return itertools.count(2)
+
+def fan_out_window(remaining: int, max_in_flight: Optional[int]) -> int:
+    """同時請求的頁數：不超過主機併發上限，也不超過補滿數量所需的頁數"""
+    limit = max_in_flight or get_host_limit(platform_url(SEARCH_URL))
+    return max(1, min(limit, math.ceil(remaining / PAGE_SIZE)))
+
+def iter_pages_serial(keyword: str, max_products: int, min_price: int, max_price: int) -> Iterator[List[Product]]:
+    """逐頁依序請求，產生每頁符合價格範圍的商品"""
+    collected = 0
     page = 1
     
-    while len(products) < max_products:
+    while collected < max_products:
         try:
-            # 構建 API 請求
-            url = "https://ecshweb.pchome.com.tw/search/v3.3/all/results"
-            params = {
-                "q": keyword,
-                "page": page,
-                "size": min(20, max_products - len(products)),
-                "sort": "sale/dc"
-            }
+            params = build_search_params(keyword, page, min(PAGE_SIZE, max_products - collected))
             
             print(f"   正在爬取第 {page} 頁...")
             
-            response = requests.get(url, params=params, headers=get_headers(), timeout=10)
+            response = http_get(platform_url(SEARCH_URL), params=params, headers=get_headers(), timeout=10)
             response.raise_for_status()
             
-            data = response.json()
+            page_products = parse_search_page(response.json(), min_price, max_price)
+            if page_products is None:
+                break
             
-            # 提取商品資訊
-            if 'prods' in data:
-                prods = data['prods']
-                if not prods:
-                    break
-                
-                page_products = []
-                for prod in prods:
-                    product_info = extract_product_info_api(prod)
-                    if product_info:
-                        # 價格過濾
-                        price = product_info.get('price', 0)
-                        if min_price <= price <= max_price:
-                            page_products.append(product_info)
-                
-                print(f"   第 {page} 頁找到 {len(page_products)} 個商品")
-                products.extend(page_products)
-                
-                if len(page_products) < 20:  # 如果少於 20 個，說明已經是最後一頁
-                    break
-                    
-                page += 1
-            else:
+            print(f"   第 {page} 頁找到 {len(page_products)} 個商品")
+            collected += len(page_products)
+            yield page_products
+            
+            if len(page_products) < PAGE_SIZE:  # 如果少於 20 個，說明已經是最後一頁
                 break
                 
+            page += 1
+                
         except requests.exceptions.RequestException as e:
             print(f"❌ API 請求失敗: {e}")
             break
         except Exception as e:
             print(f"❌ 解析 API 回應失敗: {e}")
             break
+
+def iter_pages_parallel(keyword: str, max_products: int, min_price: int, max_price: int,
+                        max_in_flight: Optional[int] = None) -> Iterator[List[Product]]:
+    """
+    並行分頁：依頁碼順序產生每頁符合價格範圍的商品
+    
+    先請求第 1 頁得知總頁數，再以主機併發上限同時請求後續頁面，
+    商品數量足夠或遇到最後一頁時停止送出新請求。
+    
+    Args:
+        keyword (str): 搜索關鍵字
+        max_products (int): 最大商品數量
+        min_price (int): 最小價格過濾
+        max_price (int): 最大價格過濾
+        max_in_flight (int, optional): 同時請求的頁數上限，None 表示使用主機併發上限
+    """
+    # 所有頁面必須使用相同的 size，頁碼對應的商品位置才會一致
+    size = min(PAGE_SIZE, max_products)
+    
+    try:
+        first_page = fetch_search_page(keyword, 1, size)
+        page_products = parse_search_page(first_page, min_price, max_price)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ API 請求失敗: {e}")
+        return
+    except Exception as e:
+        print(f"❌ 解析 API 回應失敗: {e}")
+        return
+    
+    if page_products is None:
+        return
+    print(f"   第 1 頁找到 {len(page_products)} 個商品")
+    collected = len(page_products)
+    yield page_products
+    
+    if collected >= max_products or len(first_page['prods']) < size:
+        return
+    
+    window = fan_out_window(max_products - collected, max_in_flight)
+    fan_out = ordered_fan_out(
+        lambda page: fetch_search_page(keyword, page, size), remaining_pages(first_page), window,
+        url=platform_url(SEARCH_URL)
+    )
+    try:
+        for page, future in fan_out:
+            try:
+                data = future.result()
+                page_products = parse_search_page(data, min_price, max_price)
+            except requests.exceptions.RequestException as e:
+                print(f"❌ 第 {page} 頁 API 請求失敗: {e}")
+                break
+            except Exception as e:
+                print(f"❌ 解析第 {page} 頁 API 回應失敗: {e}")
+                break
+            
+            if page_products is None:
+                break
+            
+            print(f"   第 {page} 頁找到 {len(page_products)} 個商品")
+            collected += len(page_products)
+            yield page_products
+            
+            if collected >= max_products or len(data['prods']) < size:
+                break
+    finally:
+        fan_out.close()
+
+def run_stream(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
+               parallel: bool = PARALLEL_PAGINATION) -> Iterator[List[Product]]:
+    """逐頁產生 PChome 商品（跨頁依網址去重複，總數不超過 max_products）
+
+    Args:
+        keyword (str): 搜索關鍵字
+        max_products (int, optional): 最大商品數量限制. Defaults to 100.
+        min_price (int): 最小價格過濾
+        max_price (int): 最大價格過濾
+        parallel (bool): 是否使用並行分頁
+
+    Yields:
+        List[Product]: 單頁的商品資訊列表
+    """
+    if parallel:
+        pages = iter_pages_parallel(keyword, max_products, min_price, max_price)
+    else:
+        pages = iter_pages_serial(keyword, max_products, min_price, max_price)
     
-    # 去重複
-    unique_products = []
     seen_urls = set()
+    collected = 0
+    try:
+        for page_products in pages:
+            unique_products = []
+            for product in page_products:
+                if product.url and product.url not in seen_urls:
+                    seen_urls.add(product.url)
+                    unique_products.append(product)
+            
+            unique_products = unique_products[:max_products - collected]
+            if unique_products:
+                collected += len(unique_products)
+                yield unique_products
+            if collected >= max_products:
+                break
+    finally:
+        pages.close()
+
+def api_method(keyword: str, max_products: int, min_price: int, max_price: int, parallel: bool = PARALLEL_PAGINATION) -> List[Product]:
+    """使用 API 方法爬取 PChome 商品"""
+    print("🔄 使用 PChome API 方法（並行分頁）..." if parallel else "🔄 使用 PChome API 方法...")
     
-    for product in products:
-        if product.get('url') and product['url'] not in seen_urls:
-            seen_urls.add(product['url'])
-            unique_products.append(product)
+    unique_products = [
+        product
+        for page_products in run_stream(keyword, max_products, min_price, max_price, parallel)
+        for product in page_products
+    ]
     
     print(f"✅ API 方法成功獲取 {len(unique_products)} 個商品")
     return unique_products
 
-def extract_product_info_api(prod_data: Dict) -> Dict:
+async def fetch_search_page_async(client: AsyncHttpClient, keyword: str, page: int, size: int) -> Dict:
+    """fetch_search_page 的非同步版本"""
+    params = build_search_params(keyword, page, size)
+    response = await client.get(platform_url(SEARCH_URL), params=params, headers=get_headers(), timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+async def api_method_async(client: AsyncHttpClient, keyword: str, max_products: int, min_price: int, max_price: int,
+                           parallel: bool = PARALLEL_PAGINATION) -> List[Product]:
+    """api_method 的非同步版本，透過共用的 AsyncHttpClient 發送請求"""
+    if parallel:
+        return await api_method_parallel_async(client, keyword, max_products, min_price, max_price)
+    
+    products = []
+    page = 1
+    
+    while len(products) < max_products:
+        try:
+            params = build_search_params(keyword, page, min(PAGE_SIZE, max_products - len(products)))
+            response = await client.get(platform_url(SEARCH_URL), params=params, headers=get_headers(), timeout=10)
+            response.raise_for_status()
+            
+            page_products = parse_search_page(response.json(), min_price, max_price)
+            if page_products is None:
+                break
+            
+            products.extend(page_products)
+            
+            if len(page_products) < PAGE_SIZE:
+                break
+                
+            page += 1
+                
+        except ASYNC_REQUEST_ERRORS as e:
+            print(f"❌ API 請求失敗: {e}")
+            break
+        except Exception as e:
+            print(f"❌ 解析 API 回應失敗: {e}")
+            break
+    
+    return dedupe_by_url(products)
+
+async def api_method_parallel_async(client: AsyncHttpClient, keyword: str, max_products: int, min_price: int,
+                                    max_price: int, max_in_flight: Optional[int] = None) -> List[Product]:
+    """並行分頁的非同步版本，一次回傳所有商品"""
+    size = min(PAGE_SIZE, max_products)
+    
+    try:
+        first_page = await fetch_search_page_async(client, keyword, 1, size)
+    except ASYNC_REQUEST_ERRORS as e:
+        print(f"❌ API 請求失敗: {e}")
+        return []
+    except Exception as e:
+        print(f"❌ 解析 API 回應失敗: {e}")
+        return []
+    
+    products = parse_search_page(first_page, min_price, max_price)
+    if products is None:
+        return []
+    
+    if len(products) < max_products and len(first_page['prods']) >= size:
+        window = fan_out_window(max_products - len(products), max_in_flight)
+        fan_out = ordered_fan_out_async(
+            lambda page: fetch_search_page_async(client, keyword, page, size), remaining_pages(first_page), window
+        )
+        try:
+            async for page, task in fan_out:
+                try:
+                    data = await task
+                    page_products = parse_search_page(data, min_price, max_price)
+                except ASYNC_REQUEST_ERRORS as e:
+                    print(f"❌ 第 {page} 頁 API 請求失敗: {e}")
+                    break
+                except Exception as e:
+                    print(f"❌ 解析第 {page} 頁 API 回應失敗: {e}")
+                    break
+                
+                if page_products is None:
+                    break
+                
+                products.extend(page_products)
+                
+                if len(products) >= max_products or len(data['prods']) < size:
+                    break
+        finally:
+            await fan_out.aclose()
+    
+    return dedupe_by_url(products)[:max_products]
+
+def extract_product_info_api(prod_data: Dict) -> Optional[Product]:
     """從 API 回應中提取商品資訊"""
     try:
         # 提取基本資訊
@@ -121,18 +364,13 @@ def extract_product_info_api(prod_data: Dict) -> Dict:
         pic_b = prod_data.get('picB', '')
         image_url = f"https://cs-a.ecimg.tw{pic_b}" if pic_b else ""  # 移除 /items/ 前綴
         
-        return {
-            "title": title,
-            "price": int(price) if price else 0,
-            "image_url": image_url,
-            "url": url,
-            "platform": "PChome"
-        }
+        return Product(title, int(price) if price else 0, image_url, url, "PChome")
         
     except Exception as e:
-        return {}
+        return None
 
-def run(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999) -> List[Dict]:
+def run(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
+        parallel: bool = PARALLEL_PAGINATION) -> List[Product]:
     """爬取PChome商品 - 純 API 方法
     
     Args:
@@ -140,18 +378,39 @@ def run(keyword: str, max_products: int = 100, min_price: int = 0, max_price: in
         max_products (int, optional): 最大商品數量限制. Defaults to 100.
         min_price (int): 最小價格過濾
         max_price (int): 最大價格過濾
+        parallel (bool): 是否使用並行分頁
 
     Returns:
-        List[Dict]: 商品資訊列表
+        List[Product]: 商品資訊列表
     """
     print(f"🔍 PChome 爬蟲啟動，搜尋關鍵字: {keyword}")
     
     # 使用純 API 方法
-    products = api_method(keyword, max_products, min_price, max_price)
+    products = api_method(keyword, max_products, min_price, max_price, parallel=parallel)
     
     print(f"✅ 總共獲取到 {len(products)} 個 PChome 商品")
     return products
 
+async def run_async(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
+                    client: AsyncHttpClient = None, parallel: bool = PARALLEL_PAGINATION) -> List[Product]:
+    """run 的非同步版本
+
+    Args:
+        keyword (str): 搜索關鍵字
+        max_products (int, optional): 最大商品數量限制. Defaults to 100.
+        min_price (int): 最小價格過濾
+        max_price (int): 最大價格過濾
+        client (AsyncHttpClient, optional): 共用的非同步 HTTP 客戶端，None 表示自行建立
+        parallel (bool): 是否使用並行分頁
+
+    Returns:
+        List[Product]: 商品資訊列表
+    """
+    if client is None:
+        async with AsyncHttpClient() as own_client:
+            return await api_method_async(own_client, keyword, max_products, min_price, max_price, parallel)
+    return await api_method_async(client, keyword, max_products, min_price, max_price, parallel)
+
 def main(keyword: str, output_file: str = None, max_products: int = 100) -> None:
     """主函數：爬取PChome商品資訊並保存為JSON(測試用)"""
     print(f"開始爬取關鍵字: {keyword}")
@@ -178,7 +437,7 @@ def main(keyword: str, output_file: str = None, max_products: int = 100) -> None
         output_file = f"./crawl_data/pchome_{keyword}_{uuid.uuid4().hex}.json"
     
     with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+        json.dump(output_data, f, ensure_ascii=False, indent=2, default=json_default)
     print(f"結果已保存至 {output_file}")
 
 if __name__ == "__main__":
@@ -190,9 +449,9 @@ if __name__ == "__main__":
     if result:
         print("📦 商品範例:")
         for i, product in enumerate(result[:2]):
-            print(f"   {i+1}. {product['title'][:50]}... - ${product['price']}")
+            print(f"   {i+1}. {product.title[:50]}... - ${product.price}")
     
     # 保存測試結果
     with open("pchome_test.json", "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+        json.dump(result, f, ensure_ascii=False, indent=2, default=json_default)
     print(f"💾 結果已保存至 pchome_test.json")
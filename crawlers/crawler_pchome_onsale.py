@@ -11,9 +11,124 @@ import re
 import json
 import os
 import sys
-import importlib.util
 from datetime import datetime
 from typing import List, Dict, Optional
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+# 以檔案路徑載入時也能匯入專案的 core 模組
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.crawler_registry import crawler_registry
+from core.http_replay import http_replay, FixtureMissingError
+from core.product import Product, json_default
+from core.browser_pool import browser_pool
+from core.page_wait import wait_for_settle, scroll_until_settled
+from core.dom_extract import BULK_EXTRACT, extract_cards, rule
+
+# BeautifulSoup 有 lxml 時使用較快的 lxml 解析器
+try:
+    import lxml
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# 錄製/重播時特價頁面原始碼的 fixture 名稱
+ONSALE_PAGE_FIXTURE = 'onsale'
+PLACEHOLDER_IMAGE = "mobile_loading.svg"
+BACKGROUND_IMAGE_RE = re.compile(r'background-image:\s*url\(["\']?([^"\']*)["\']?\)')
+# 商品容器選擇器（依序嘗試），判斷頁面是否載入完成時計算所有容器
+ONSALE_CONTAINER_SELECTORS = [".c-prodInfoV2", "[data-gtm-item-id]"]
+ONSALE_ITEM_SELECTOR = ", ".join(ONSALE_CONTAINER_SELECTORS)
+ONSALE_IMAGE_SELECTOR = ".c-prodInfoV2__img img"
+# 批次擷取的欄位規則，順序與 extract_single_product / get_image_url 相同
+ONSALE_FIELDS = {
+    'title': [rule(".c-prodInfoV2__title")],
+    'price': [rule(".c-prodInfoV2__priceValue")],
+    'image_url': [
+        rule(ONSALE_IMAGE_SELECTOR, "data-src", exclude_suffix=PLACEHOLDER_IMAGE),
+        rule(ONSALE_IMAGE_SELECTOR, "data-original", exclude_suffix=PLACEHOLDER_IMAGE),
+        rule(ONSALE_IMAGE_SELECTOR, "src", exclude_suffix=PLACEHOLDER_IMAGE),
+        rule(ONSALE_IMAGE_SELECTOR, "style", parent=True, pattern=BACKGROUND_IMAGE_RE.pattern),
+        rule(ONSALE_IMAGE_SELECTOR, "src")
+    ],
+    'link': [rule("a[href]", "href")]
+}
+# 慢速滾動觸發圖片載入時，每一步只需等網路短暫靜止
+IMAGE_SETTLE_QUIET_MS = 200
+IMAGE_SETTLE_MAX_WAIT = 2
+
+
+def build_onsale_product(title, price, image_url, link, base_url="https://24h.pchome.com.tw"):
+    """
+    組成特價商品資料（Selenium 與頁面原始碼解析共用）
+
+    Returns:
+        Optional[Product]: 商品資料；沒有標題時回傳 None
+    """
+    if not title:
+        return None
+    # 確保連結是完整的URL
+    if link and not link.startswith('http'):
+        link = urljoin(base_url + '/', link)
+    return Product(
+        title=title.strip(),
+        price=price if price else "價格未提供",
+        image_url=image_url if image_url else "",
+        url=link if link else "",
+        platform='pchome_onsale'
+    )
+
+
+def _soup_image_url(container) -> str:
+    """從頁面原始碼的商品容器取得圖片網址，規則與 PChomeOnsaleCrawler.get_image_url 相同"""
+    img = container.select_one(".c-prodInfoV2__img img")
+    if img is None:
+        return ""
+    image_url = None
+    for attribute in ("data-src", "data-original", "src"):
+        image_url = img.get(attribute)
+        if image_url and not image_url.endswith(PLACEHOLDER_IMAGE):
+            return image_url
+    style = img.parent.get("style") if img.parent is not None else None
+    if style and "background-image" in style:
+        match = BACKGROUND_IMAGE_RE.search(style)
+        if match:
+            return match.group(1)
+    return image_url if image_url else ""
+
+
+def parse_onsale_html(html: str, base_url: str = "https://24h.pchome.com.tw") -> List[Product]:
+    """
+    從特價頁面原始碼解析商品（重播錄製的頁面與效能基準測試使用，不需要瀏覽器）
+
+    Args:
+        html (str): 滾動載入完成後的頁面原始碼
+        base_url (str): 相對連結的基準網址
+
+    Returns:
+        List[Product]: 商品資訊列表
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    containers = soup.select(".c-prodInfoV2") or soup.select("[data-gtm-item-id]")
+    products = []
+    for container in containers:
+        title = container.select_one(".c-prodInfoV2__title")
+        price = container.select_one(".c-prodInfoV2__priceValue")
+        link = container.select_one("a[href]")
+        product = build_onsale_product(
+            title.get_text(strip=True) if title else None,
+            price.get_text(strip=True) if price else None,
+            _soup_image_url(container),
+            link.get("href") if link else None,
+            base_url
+        )
+        if product:
+            products.append(product)
+    return products
+
 
 class PChomeOnsaleCrawler:
     def __init__(self, headless=True):
@@ -21,36 +136,8 @@ class PChomeOnsaleCrawler:
         self.driver = None
         self.base_url = "https://24h.pchome.com.tw"
         self.onsale_url = "https://24h.pchome.com.tw/onsale/"
-        self.other_crawlers = {}
-        
-        # 載入其他爬蟲模組
-        self._load_other_crawlers()
-        
-    def _load_other_crawlers(self):
-        """載入其他平台的爬蟲模組"""
-        current_dir = os.path.dirname(__file__)
-        
-        # 要載入的爬蟲模組 (排除自己和特殊爬蟲)
-        crawler_modules = ['crawler_pchome.py', 'crawler_yahoo.py', 'crawler_routn.py', 'crawler_carrefour.py']
-        
-        for crawler_file in crawler_modules:
-            platform = crawler_file.replace('crawler_', '').replace('.py', '')
-            module_path = os.path.join(current_dir, crawler_file)
-            
-            if os.path.exists(module_path):
-                try:
-                    spec = importlib.util.spec_from_file_location(f"crawler_{platform}", module_path)
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-                    
-                    if hasattr(module, 'run'):
-                        self.other_crawlers[platform] = module.run
-                        logging.info(f"成功載入爬蟲模組: {platform}")
-                    else:
-                        logging.warning(f"爬蟲模組 {platform} 沒有 run 函數")
-                        
-                except Exception as e:
-                    logging.warning(f"載入爬蟲模組 {platform} 失敗: {e}")
+        # 其他平台的爬蟲由共用登錄表延遲載入，第一次搜尋相關商品時才匯入
+        self.other_crawlers = crawler_registry.entry_points('run')
     
     def setup_driver(self):
         """設置 Chrome WebDriver"""
@@ -114,29 +201,16 @@ class PChomeOnsaleCrawler:
             include_related: 是否包含其他平台的相關產品
             max_related_per_platform: 每個平台最多搜尋的相關商品數量
         """
-        if not self.setup_driver():
-            return []
-        
-        try:
-            logging.info(f"正在訪問 PChome 特價頁面: {self.onsale_url}")
-            self.driver.get(self.onsale_url)
-            
-            # 等待頁面載入
+        if http_replay.replaying:
             try:
-                WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                time.sleep(5)  # 額外等待確保商品載入完成
-            except TimeoutException:
-                logging.warning("頁面載入超時")
+                products = parse_onsale_html(http_replay.load_page('pchome_onsale', ONSALE_PAGE_FIXTURE), self.base_url)
+            except FixtureMissingError as e:
+                logging.error(f"重播特價頁面失敗: {e}")
                 return []
-            
-            # 滾動頁面以確保所有商品都載入
-            self.scroll_to_load_products()
-            
-            # 爬取頁面上的所有商品
-            products = self.extract_products_from_page()
-            
+        else:
+            products = self.load_products_with_driver()
+        
+        try:
             if max_products and len(products) > max_products:
                 products = products[:max_products]
             
@@ -145,16 +219,16 @@ class PChomeOnsaleCrawler:
                 logging.info("開始為每個商品搜尋其他平台的相關產品...")
                 for i, product in enumerate(products):
                     try:
-                        logging.info(f"正在為商品 {i+1}/{len(products)} 搜尋相關產品: {product['title'][:30]}...")
+                        logging.info(f"正在為商品 {i+1}/{len(products)} 搜尋相關產品: {product.title[:30]}...")
                         related_products = self._search_related_products(
-                            product['title'], 
+                            product.title, 
                             max_related_per_platform
                         )
                         product['related_products'] = related_products
                         
                         # 計算相關產品總數
                         total_related = sum(len(prods) for prods in related_products.values())
-                        logging.info(f"為商品 '{product['title'][:30]}...' 找到 {total_related} 個相關產品")
+                        logging.info(f"為商品 '{product.title[:30]}...' 找到 {total_related} 個相關產品")
                         
                     except Exception as e:
                         logging.warning(f"為商品 {i+1} 搜尋相關產品時發生錯誤: {e}")
@@ -166,27 +240,65 @@ class PChomeOnsaleCrawler:
         except Exception as e:
             logging.error(f"爬取商品時發生錯誤: {e}")
             return []
+
+    def load_products_with_driver(self):
+        """以瀏覽器開啟特價頁面並提取商品（無頭模式向瀏覽器池借用已啟動的瀏覽器）"""
+        if self.headless and browser_pool.enabled:
+            try:
+                with browser_pool.lease() as driver:
+                    self.driver = driver
+                    self.driver.implicitly_wait(10)
+                    return self._load_onsale_page()
+            except Exception as e:
+                logging.error(f"向瀏覽器池借用瀏覽器失敗: {e}")
+                return []
+            finally:
+                self.driver = None
+        
+        if not self.setup_driver():
+            return []
+        try:
+            return self._load_onsale_page()
         finally:
-            if self.driver:
-                self.driver.quit()
-    def scroll_to_load_products(self):
-        """滾動頁面以載入更多商品，並確保圖片都載入完成"""
+            self.driver.quit()
+            self.driver = None
+
+    def _load_onsale_page(self):
+        """開啟特價頁面、滾動載入並提取商品（錄製模式會存下滾動完成後的頁面原始碼）"""
         try:
-            last_height = self.driver.execute_script("return document.body.scrollHeight")
+            logging.info(f"正在訪問 PChome 特價頁面: {self.onsale_url}")
+            self.driver.get(self.onsale_url)
             
-            # 首先滾動到底部載入所有商品
-            while True:
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(3)  # 增加等待時間確保載入完成
-                new_height = self.driver.execute_script("return document.body.scrollHeight")
-                
-                if new_height == last_height:
-                    break
-                last_height = new_height
+            # 等待頁面載入
+            try:
+                WebDriverWait(self.driver, 15).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "body"))
+                )
+                # 等到商品數量與網路活動穩定，不再固定等待 5 秒
+                wait_for_settle(self.driver, ONSALE_ITEM_SELECTOR)
+            except TimeoutException:
+                logging.warning("頁面載入超時")
+                return []
             
-            # 滾動回頂部
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(2)
+            # 滾動頁面以確保所有商品都載入
+            self.scroll_to_load_products()
+            if http_replay.recording:
+                http_replay.record_page('pchome_onsale', ONSALE_PAGE_FIXTURE, self.driver.page_source)
+            
+            # 爬取頁面上的所有商品
+            return self.extract_products_from_page()
+            
+        except Exception as e:
+            logging.error(f"爬取商品時發生錯誤: {e}")
+            return []
+
+    def scroll_to_load_products(self):
+        """滾動頁面以載入更多商品，並確保圖片都載入完成（每一步等到商品數量與網路活動穩定即繼續）"""
+        try:
+            start = time.time()
+            # 首先滾動到底部載入所有商品
+            result = scroll_until_settled(self.driver, ONSALE_ITEM_SELECTOR)
+            logging.info(f"滾動 {result['scrolls']} 次後商品數量穩定: {result['count']} 個")
             
             # 慢速滾動一遍，確保所有圖片都觸發載入
             logging.info("正在慢速滾動以載入所有圖片...")
@@ -196,25 +308,32 @@ class PChomeOnsaleCrawler:
             current_position = 0
             while current_position < total_height:
                 self.driver.execute_script(f"window.scrollTo(0, {current_position});")
-                time.sleep(1)  # 給圖片載入時間
+                wait_for_settle(self.driver, ONSALE_ITEM_SELECTOR, IMAGE_SETTLE_QUIET_MS, IMAGE_SETTLE_MAX_WAIT)
                 current_position += viewport_height // 2  # 每次滾動半個視窗高度
             
             # 最後滾動回頂部
             self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(2)
+            logging.info(f"頁面載入等待共 {time.time() - start:.1f} 秒")
             
         except Exception as e:
             logging.warning(f"滾動頁面時發生錯誤: {e}")
     
     def extract_products_from_page(self):
-        """從頁面提取商品資訊"""
+        """從頁面提取商品資訊（預設以一次 execute_script 批次擷取，失敗時逐一查詢元素）"""
+        if BULK_EXTRACT:
+            try:
+                products = self.extract_products_bulk()
+                if products is not None:
+                    return products
+            except Exception as e:
+                logging.warning(f"批次擷取商品失敗，改用逐一元素查詢: {e}")
+        
         products = []
         
         try:            # 找到商品容器
             product_containers = []
-            container_selectors = [".c-prodInfoV2", "[data-gtm-item-id]"]
             
-            for selector in container_selectors:
+            for selector in ONSALE_CONTAINER_SELECTORS:
                 try:
                     containers = WebDriverWait(self.driver, 5).until(
                         EC.presence_of_all_elements_located((By.CSS_SELECTOR, selector))
@@ -245,6 +364,24 @@ class PChomeOnsaleCrawler:
         
         return products
       
+    def extract_products_bulk(self):
+        """
+        以一次 WebDriver 呼叫讀出所有商品容器的欄位
+
+        Returns:
+            Optional[List[Product]]: 商品資訊列表；頁面上還找不到商品容器時回傳 None
+        """
+        selector, items = extract_cards(self.driver, ONSALE_CONTAINER_SELECTORS, ONSALE_FIELDS)
+        if selector is None:
+            return None
+        logging.info(f"成功找到 {len(items)} 個容器，使用選擇器: {selector}")
+        products = []
+        for item in items:
+            product = build_onsale_product(item['title'], item['price'], item['image_url'], item['link'], self.base_url)
+            if product:
+                products.append(product)
+        return products
+
     def extract_single_product(self, container):
         """從商品容器中提取單個商品的詳細資訊"""
         try:
@@ -260,22 +397,8 @@ class PChomeOnsaleCrawler:
             # 商品連結
             link = self.get_attribute_by_selectors(container, ["a[href]"], "href")
             
-            # 確保連結是完整的URL
-            if link and not link.startswith('http'):
-                if link.startswith('/'):
-                    link = self.base_url + link
-                else:
-                    link = self.base_url + '/' + link
-            
             # 只有當商品標題存在時才返回資料
-            if title:
-                return {
-                    'title': title.strip(),
-                    'price': price if price else "價格未提供",
-                    'image_url': image_url if image_url else "",
-                    'url': link if link else "",
-                    'platform': 'pchome_onsale'
-                }
+            return build_onsale_product(title, price, image_url, link, self.base_url)
         
         except Exception as e:
             logging.warning(f"提取商品詳細資訊時發生錯誤: {e}")
@@ -316,23 +439,23 @@ class PChomeOnsaleCrawler:
             
             # 1. 檢查 data-src 屬性（懶加載常用）
             image_url = img_element.get_attribute("data-src")
-            if image_url and not image_url.endswith("mobile_loading.svg"):
+            if image_url and not image_url.endswith(PLACEHOLDER_IMAGE):
                 return image_url
             
             # 2. 檢查 data-original 屬性
             image_url = img_element.get_attribute("data-original")
-            if image_url and not image_url.endswith("mobile_loading.svg"):
+            if image_url and not image_url.endswith(PLACEHOLDER_IMAGE):
                 return image_url
             
             # 3. 檢查 src 屬性
             image_url = img_element.get_attribute("src")
-            if image_url and not image_url.endswith("mobile_loading.svg"):
+            if image_url and not image_url.endswith(PLACEHOLDER_IMAGE):
                 return image_url
               # 5. 嘗試從父元素的 style 屬性中獲取背景圖片
             parent_element = img_element.find_element(By.XPATH, "..")
             style = parent_element.get_attribute("style")
             if style and "background-image" in style:
-                match = re.search(r'background-image:\s*url\(["\']?([^"\']*)["\']?\)', style)
+                match = BACKGROUND_IMAGE_RE.search(style)
                 if match:
                     return match.group(1)
             
@@ -379,7 +502,7 @@ class PChomeOnsaleCrawler:
         
         return keywords[:max_keywords]
     
-    def _search_related_products(self, title: str, max_products_per_platform: int = 5) -> Dict[str, List[Dict]]:
+    def _search_related_products(self, title: str, max_products_per_platform: int = 5) -> Dict[str, List[Product]]:
         """在其他平台搜尋相關商品"""
         keywords = self._extract_keywords_from_title(title)
         related_products = {}
@@ -497,7 +620,7 @@ def save_to_json(products, keyword="pchome_onsale"):
         
         # 保存到 JSON 文件
         with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data_to_save, f, ensure_ascii=False, indent=2)
+            json.dump(data_to_save, f, ensure_ascii=False, indent=2, default=json_default)
         
         logging.info(f"成功保存 {len(products)} 個商品到: {file_path}")
         return file_path
@@ -591,16 +714,16 @@ if __name__ == "__main__":
     print(f"找到 {len(products)} 個商品:")
     
     for i, product in enumerate(products, 1):
-        print(f"\n{i}. {product['title']}")
-        print(f"   價格: {product['price']}")
-        print(f"   連結: {product['url']}")
+        print(f"\n{i}. {product.title}")
+        print(f"   價格: {product.price}")
+        print(f"   連結: {product.url}")
         
-        if 'related_products' in product and product['related_products']:
+        if product.get('related_products'):
             print(f"   相關產品:")
             for platform, related_list in product['related_products'].items():
                 if related_list:
                     print(f"     {platform.upper()}: {len(related_list)} 個商品")
                     for j, related in enumerate(related_list[:2], 1):  # 只顯示前2個
-                        print(f"       {j}. {related.get('title', 'N/A')[:40]}...")
+                        print(f"       {j}. {(related.title or 'N/A')[:40]}...")
     
     print(f"\n完整資料已保存到 JSON 文件中")
@@ -1,11 +1,27 @@
 import os
+import sys
 import requests
 import json
 import time
-from typing import List, Dict
+from typing import List, Dict, Optional, Iterator
 import uuid
 from urllib.parse import quote  # 新增：用於URL編碼
 
+# 以檔案路徑載入時也能匯入專案的 core 模組
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.platforms import platform_url
+from core.product import Product, json_default
+from core.http_client import AsyncHttpClient, ASYNC_REQUEST_ERRORS, http_get, get_host_limit
+from core.fan_out import ordered_fan_out, ordered_fan_out_async
+
+SEARCH_URL = "https://rtapi.ruten.com.tw/api/search/v3/index.php/core/prod"
+DETAIL_URL = "https://rtapi.ruten.com.tw/api/prod/v2/index.php/prod"
+ID_PAGE_LIMIT = 100
+DETAIL_BATCH_SIZE = 50  # 每次請求的商品ID數量限制
+
 def get_headers(keyword: str) -> Dict:
     """生成模擬的請求頭，動態設置referer並對關鍵字進行URL編碼"""
     encoded_keyword = quote(keyword)  # 將關鍵字進行URL編碼，例如「天使」變為「%E5%A4%A9%E4%BD%BF」
@@ -19,83 +35,199 @@ def get_headers(keyword: str) -> Dict:
         "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36"
     }
 
-def fetch_product_ids(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999) -> List[str]:
-    """發送第一個fetch請求，獲取商品ID清單，處理分頁"""
-    url = "https://rtapi.ruten.com.tw/api/search/v3/index.php/core/prod"
-    headers = get_headers(keyword)
-    all_ids = []
-    offset = 1
-    limit = 100
-
-    while len(all_ids) < max_products:
-        params = {
-            "q": keyword,
-            "type": "direct",
-            "sort": "rnk/dc",
-            # "prc.now":f"{min_price}-{max_price}",  # 價格範圍
-            "limit": limit,
-            "offset": offset
-        }
+def build_search_params(keyword: str, offset: int) -> Dict:
+    """構建商品ID搜尋的查詢參數"""
+    return {
+        "q": keyword,
+        "type": "direct",
+        "sort": "rnk/dc",
+        # "prc.now":f"{min_price}-{max_price}",  # 價格範圍
+        "limit": ID_PAGE_LIMIT,
+        "offset": offset
+    }
+
+def map_detail(item: Dict) -> Product:
+    """將商品詳情轉換為統一的商品格式"""
+    return Product(
+        title=item.get("ProdName", ""),
+        price=int(float(item.get("PriceRange", [0, 0])[0])),  # 使用價格範圍的最低價
+        image_url=f"https://a.rimg.com.tw{item.get('Image', '')}",
+        url=f"https://www.ruten.com.tw/item/show?{item.get('ProdId', '')}",
+        platform="露天拍賣"
+    )
+
+def filter_by_price(products: List[Product], min_price: int, max_price: int) -> List[Product]:
+    """去除價格不在範圍內的商品"""
+    return [p for p in products if min_price <= p.price <= max_price]
+
+def extract_ids(data: Dict) -> List[str]:
+    """從搜尋回應中提取商品ID"""
+    return [item["Id"] for item in data.get("Rows", [])]
+
+def remaining_offsets(total_rows: int, max_products: int) -> range:
+    """依第一頁回應的 TotalRows 產生後續分頁的 offset"""
+    last_offset = min(total_rows, max_products)
+    return range(1 + ID_PAGE_LIMIT, last_offset + 1, ID_PAGE_LIMIT)
+
+def split_batches(product_ids: List[str]) -> List[List[str]]:
+    """將商品ID切成每批 DETAIL_BATCH_SIZE 個"""
+    return [product_ids[i:i + DETAIL_BATCH_SIZE] for i in range(0, len(product_ids), DETAIL_BATCH_SIZE)]
+
+def order_by_ids(items: List[Dict], batch_ids: List[str]) -> List[Dict]:
+    """依請求時的商品ID順序排列詳情，找不到對應ID的項目放在最後"""
+    position = {str(product_id): index for index, product_id in enumerate(batch_ids)}
+    return sorted(items, key=lambda item: position.get(str(item.get("ProdId", "")), len(position)))
+
+def dedupe_ids(ids: List[str]) -> List[str]:
+    """去除重複的商品ID並保留搜尋結果的排序"""
+    return list(dict.fromkeys(ids))
+
+def fetch_id_page(keyword: str, offset: int) -> Dict:
+    """請求單頁商品ID"""
+    response = http_get(platform_url(SEARCH_URL), params=build_search_params(keyword, offset), headers=get_headers(keyword), timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+def fetch_detail_batch(keyword: str, batch_ids: List[str]) -> List[Product]:
+    """請求單批商品詳情，依原始ID順序回傳"""
+    response = http_get(platform_url(DETAIL_URL), params={"id": ",".join(batch_ids)}, headers=get_headers(keyword), timeout=10)
+    response.raise_for_status()
+    return [map_detail(item) for item in order_by_ids(response.json(), batch_ids)]
+
+def fetch_product_ids(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
+                      max_in_flight: Optional[int] = None) -> List[str]:
+    """
+    發送第一個fetch請求，獲取商品ID清單，處理分頁
+    
+    第一頁回應得知 TotalRows 後，其餘分頁以主機併發上限同時請求，並依 offset 順序合併。
+    """
+    try:
+        first_page = fetch_id_page(keyword, 1)
+    except requests.RequestException as e:
+        print(f"第一個請求失敗: {e}")
+        return []
+    
+    all_ids = extract_ids(first_page)
+    offsets = remaining_offsets(first_page.get("TotalRows", 0), max_products)
+    
+    if all_ids and len(all_ids) < max_products and offsets:
+        window = max_in_flight or get_host_limit(platform_url(SEARCH_URL))
+        fan_out = ordered_fan_out(lambda offset: fetch_id_page(keyword, offset), offsets, window,
+                                  url=platform_url(SEARCH_URL))
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # 提取商品ID
-            ids = [item["Id"] for item in data.get("Rows", [])]
-            all_ids.extend(ids)
-        
-            total_rows = data.get("TotalRows", 0)
-            # 檢查是否還有更多數據
-            if offset + limit > total_rows or not ids:
-                break
-                
-            offset += limit
-            # time.sleep(1)  # 延遲1秒，防止反爬
-        except requests.RequestException as e:
-            print(f"第一個請求失敗: {e}")
-            break
+            for offset, future in fan_out:
+                try:
+                    ids = extract_ids(future.result())
+                except requests.RequestException as e:
+                    print(f"第一個請求失敗 (offset {offset}): {e}")
+                    break
+                all_ids.extend(ids)
+                # 檢查是否還有更多數據
+                if not ids or len(all_ids) >= max_products:
+                    break
+        finally:
+            fan_out.close()
     # 輸出all_ids 至 json文件（測試用）
     # with open("ruten_ids.json", "w", encoding="utf-8") as f:
     #     json.dump(all_ids, f, ensure_ascii=False, indent=2)
-    return list(set(all_ids))  # 去重
+    return dedupe_ids(all_ids)  # 去重
 
-def fetch_product_details(product_ids: List[str], keyword: str, min_price: int = 0, max_price: int = 999999) -> List[Dict]:
-    """發送第二個fetch請求，批量獲取商品詳情"""
-    url = "https://rtapi.ruten.com.tw/api/prod/v2/index.php/prod"
-    headers = get_headers(keyword)
-    products = []
-    batch_size: int = 50  # 每次請求的商品ID數量限制
-    for i in range(0, len(product_ids), batch_size):
-        batch_ids = product_ids[i:i + batch_size]
-        id_string = ",".join(batch_ids)
-        params = {"id": id_string}
-        try:
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()            
-            # 解析商品詳情
-            for item in data:
-                product_info = {
-                    "title": item.get("ProdName", ""),
-                    "price": int(float(item.get("PriceRange", [0, 0])[0])),  # 使用價格範圍的最低價
-                    "image_url": f"https://a.rimg.com.tw{item.get('Image', '')}",
-                    "url": f"https://www.ruten.com.tw/item/show?{item.get('ProdId', '')}",
-                    "platform": "露天拍賣"
-                }
-                products.append(product_info)
-            
-            # time.sleep(1)  # 延遲1秒
-        except requests.RequestException as e:
-            print(f"第二個請求失敗 (批次 {i//batch_size + 1}): {e}")
+def iter_product_details(product_ids: List[str], keyword: str, min_price: int = 0, max_price: int = 999999,
+                         max_in_flight: Optional[int] = None) -> Iterator[List[Product]]:
+    """
+    逐批產生商品詳情（已依價格過濾）
+
+    各批次以主機併發上限同時請求，依原始商品ID順序逐批交還。
+    """
+    window = max_in_flight or get_host_limit(platform_url(DETAIL_URL))
+    fan_out = ordered_fan_out(lambda batch_ids: fetch_detail_batch(keyword, batch_ids), split_batches(product_ids), window,
+                              url=platform_url(DETAIL_URL))
+    try:
+        for batch_number, (batch_ids, future) in enumerate(fan_out, 1):
+            try:
+                batch_products = future.result()
+            except requests.RequestException as e:
+                print(f"第二個請求失敗 (批次 {batch_number}): {e}")
+                continue
+            yield filter_by_price(batch_products, min_price, max_price)
+    finally:
+        fan_out.close()
+
+def fetch_product_details(product_ids: List[str], keyword: str, min_price: int = 0, max_price: int = 999999,
+                          max_in_flight: Optional[int] = None) -> List[Product]:
+    """
+    發送第二個fetch請求，批量獲取商品詳情
+    
+    各批次以主機併發上限同時請求，結果依原始商品ID順序重新組合。
+    """
+    details = iter_product_details(product_ids, keyword, min_price, max_price, max_in_flight)
+    return [product for batch_products in details for product in batch_products]
+
+async def fetch_id_page_async(client: AsyncHttpClient, keyword: str, offset: int) -> Dict:
+    """fetch_id_page 的非同步版本"""
+    response = await client.get(platform_url(SEARCH_URL), params=build_search_params(keyword, offset), headers=get_headers(keyword), timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+async def fetch_detail_batch_async(client: AsyncHttpClient, keyword: str, batch_ids: List[str]) -> List[Product]:
+    """fetch_detail_batch 的非同步版本"""
+    response = await client.get(platform_url(DETAIL_URL), params={"id": ",".join(batch_ids)}, headers=get_headers(keyword), timeout=10)
+    response.raise_for_status()
+    return [map_detail(item) for item in order_by_ids(response.json(), batch_ids)]
+
+async def fetch_product_ids_async(client: AsyncHttpClient, keyword: str, max_products: int = 100,
+                                  max_in_flight: Optional[int] = None) -> List[str]:
+    """fetch_product_ids 的非同步版本"""
+    try:
+        first_page = await fetch_id_page_async(client, keyword, 1)
+    except ASYNC_REQUEST_ERRORS as e:
+        print(f"第一個請求失敗: {e}")
+        return []
     
-    # 去除價格不在範圍內的商品
-    products = [p for p in products if min_price <= p["price"] <= max_price]
+    all_ids = extract_ids(first_page)
+    offsets = remaining_offsets(first_page.get("TotalRows", 0), max_products)
     
-    return products
+    if all_ids and len(all_ids) < max_products and offsets:
+        window = max_in_flight or get_host_limit(platform_url(SEARCH_URL))
+        fan_out = ordered_fan_out_async(lambda offset: fetch_id_page_async(client, keyword, offset), offsets, window)
+        try:
+            async for offset, task in fan_out:
+                try:
+                    ids = extract_ids(await task)
+                except ASYNC_REQUEST_ERRORS as e:
+                    print(f"第一個請求失敗 (offset {offset}): {e}")
+                    break
+                all_ids.extend(ids)
+                if not ids or len(all_ids) >= max_products:
+                    break
+        finally:
+            await fan_out.aclose()
+    return dedupe_ids(all_ids)
 
-def run(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999) -> List[Dict]:
-    """爬取露天商品資訊
+async def fetch_product_details_async(client: AsyncHttpClient, product_ids: List[str], keyword: str,
+                                      min_price: int = 0, max_price: int = 999999,
+                                      max_in_flight: Optional[int] = None) -> List[Product]:
+    """fetch_product_details 的非同步版本"""
+    products = []
+    window = max_in_flight or get_host_limit(platform_url(DETAIL_URL))
+    fan_out = ordered_fan_out_async(
+        lambda batch_ids: fetch_detail_batch_async(client, keyword, batch_ids), split_batches(product_ids), window
+    )
+    try:
+        batch_number = 0
+        async for batch_ids, task in fan_out:
+            batch_number += 1
+            try:
+                products.extend(await task)
+            except ASYNC_REQUEST_ERRORS as e:
+                print(f"第二個請求失敗 (批次 {batch_number}): {e}")
+    finally:
+        await fan_out.aclose()
+    
+    return filter_by_price(products, min_price, max_price)
+
+def run_stream(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999) -> Iterator[List[Product]]:
+    """逐批產生露天商品資訊（總數不超過 max_products）
 
     Args:
         keyword (str): 搜索關鍵字
@@ -103,21 +235,60 @@ def run(keyword: str, max_products: int = 100, min_price: int = 0, max_price: in
         min_price (int, optional): 最低價格. Defaults to 0.
         max_price (int, optional): 最高價格. Defaults to 999999.
 
-    Returns:
-        List[Dict]: 商品資訊列表
+    Yields:
+        List[Product]: 單一批次的商品資訊列表
     """
-    # print(f"開始爬取關鍵字: {keyword}")
-    
     # 第一步：獲取商品ID
     product_ids = fetch_product_ids(keyword, max_products, min_price, max_price)
-    # print(f"獲取到 {len(product_ids)} 個商品ID")
 
-    # 第二步：獲取商品詳情
-    products = fetch_product_details(product_ids, keyword, min_price, max_price)
-    # print(f"獲取到 {len(products)} 個商品詳情")
-    products = products[:max_products]
-    # print(f"獲取到 {len(products)} 個露天商品")
-    return products
+    # 第二步：逐批獲取商品詳情
+    collected = 0
+    details = iter_product_details(product_ids, keyword, min_price, max_price)
+    try:
+        for batch_products in details:
+            batch_products = batch_products[:max_products - collected]
+            collected += len(batch_products)
+            yield batch_products
+            if collected >= max_products:
+                break
+    finally:
+        details.close()
+
+def run(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999) -> List[Product]:
+    """爬取露天商品資訊
+
+    Args:
+        keyword (str): 搜索關鍵字
+        max_products (int, optional): 最大商品數量限制. Defaults to 100.
+        min_price (int, optional): 最低價格. Defaults to 0.
+        max_price (int, optional): 最高價格. Defaults to 999999.
+
+    Returns:
+        List[Product]: 商品資訊列表
+    """
+    return [product for batch_products in run_stream(keyword, max_products, min_price, max_price) for product in batch_products]
+
+async def run_async(keyword: str, max_products: int = 100, min_price: int = 0, max_price: int = 999999,
+                    client: AsyncHttpClient = None) -> List[Product]:
+    """run 的非同步版本
+
+    Args:
+        keyword (str): 搜索關鍵字
+        max_products (int, optional): 最大商品數量限制. Defaults to 100.
+        min_price (int, optional): 最低價格. Defaults to 0.
+        max_price (int, optional): 最高價格. Defaults to 999999.
+        client (AsyncHttpClient, optional): 共用的非同步 HTTP 客戶端，None 表示自行建立
+
+    Returns:
+        List[Product]: 商品資訊列表
+    """
+    if client is None:
+        async with AsyncHttpClient() as own_client:
+            return await run_async(keyword, max_products, min_price, max_price, own_client)
+    
+    product_ids = await fetch_product_ids_async(client, keyword, max_products)
+    products = await fetch_product_details_async(client, product_ids, keyword, min_price, max_price)
+    return products[:max_products]
 
 
 def main(keyword: str, output_file: str = None, max_products: int = 100, min_price: int = 0, max_price: int = 999999) -> None:
@@ -149,7 +320,7 @@ def main(keyword: str, output_file: str = None, max_products: int = 100, min_pri
         os.makedirs("./crawl_data", exist_ok=True)
         output_file = f"./crawl_data/ruten_{keyword}_{uuid.uuid4().hex}.json"
     with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+        json.dump(output_data, f, ensure_ascii=False, indent=2, default=json_default)
     print(f"結果已保存至 {output_file}")
 
 if __name__ == "__main__":
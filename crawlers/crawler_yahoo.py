@@ -1,12 +1,25 @@
 import os
+import sys
 import requests
 import json
 import time
-from typing import List, Dict
+from typing import List, Dict, Iterator
 import uuid
 from urllib.parse import quote
 from datetime import datetime
 
+# 以檔案路徑載入時也能匯入專案的 core 模組
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.platforms import platform_url
+from core.product import Product, json_default
+from core.http_client import AsyncHttpClient, ASYNC_REQUEST_ERRORS, http_post
+
+GRAPHQL_URL = "https://graphql.ec.yahoo.com/graphql"
+PAGE_SIZE = 60  # 每頁商品數量
+
 def get_headers(keyword: str) -> Dict:
     """生成模擬的請求頭，動態設置referrer並對關鍵字進行URL編碼"""
     encoded_keyword = quote(keyword)
@@ -24,7 +37,97 @@ def get_headers(keyword: str) -> Dict:
         "referrer": f"https://tw.buy.yahoo.com/search/product?p={encoded_keyword}"
     }
 
-def run(keyword: str, max_products: int = 100, min_price: int = 1, max_price: int = 999999) -> List[Dict]:
+def build_payload(keyword: str, page: int, min_price: int, max_price: int) -> Dict:
+    """構建GraphQL請求體"""
+    return {
+        "variables": {
+            "property": "sas",
+            "p": keyword,
+            "cid": "0",
+            "pg": str(page),
+            "psz": str(PAGE_SIZE),
+            "maxxp": str(max_price),
+            "minp": str(max(min_price, 1)),  # 確保最低價格不小於1
+            "qt": "product",
+            "sort": "rel",
+            "isTestStoreIncluded": "0",
+            "spaceId": 152989812,
+            "source": "pc",
+            "showMoreCluster": "0",
+            "searchTarget": "ecItem",
+            "isStoreSearch": 0,
+            "isShoppingStoreSearch": 0
+        },
+        "extensions": {
+            "persistedQuery": {
+                "version": 1,
+                "sha256Hash": "9e8c95a7bd216439855a6dcb580387b180713a20260a89c26096fbe4dd30133f"
+            }
+        }
+    }
+
+def parse_hits(data: Dict) -> List[Dict]:
+    """從GraphQL回應中取出商品數據"""
+    return data.get("data", {}).get("getUther", {}).get("hits", [])
+
+def map_hit(item: Dict) -> Product:
+    """將單筆搜尋結果轉換為統一的商品格式"""
+    return Product(
+        title=item.get("ec_title", ""),
+        price=int(float(item.get("ec_price", 0))),
+        image_url=item.get("ec_image", ""),
+        url=item.get("ec_item_url", ""),
+        platform="Yahoo購物"
+    )
+
+def run_stream(keyword: str, max_products: int = 100, min_price: int = 1, max_price: int = 999999) -> Iterator[List[Product]]:
+    """ 逐頁產生Yahoo商品資訊（總數不超過 max_products）
+
+    Args:
+        keyword (str): 搜索關鍵字
+        max_products (int, optional): 最大商品數量限制. Defaults to 100.
+        min_price (int, optional): 最低價格範圍. Defaults to 1.
+        max_price (int, optional): 最高價格範圍. Defaults to 999999.
+    Yields:
+        List[Product]: 單頁的商品資訊列表
+    """
+    headers = get_headers(keyword)
+    collected = 0
+    page = 1
+    
+    while True:
+        payload = build_payload(keyword, page, min_price, max_price)
+        
+        try:
+            # 搜尋查詢為唯讀，逾時或連線失敗時可以安全重試
+            response = http_post(platform_url(GRAPHQL_URL), json=payload, headers=headers, timeout=10, idempotent=True)
+            response.raise_for_status()
+            
+            # 提取商品數據
+            hits = parse_hits(response.json())
+            if not hits:
+                print(f"第 {page} 頁無數據，停止爬取")
+                break
+        except requests.RequestException as e:
+            print(f"請求第 {page} 頁失敗: {e}")
+            break
+        
+        page_products = [map_hit(item) for item in hits][:max_products - collected]
+        collected += len(page_products)
+        yield page_products
+        
+        # 檢查是否達到最大商品數量
+        if collected >= max_products:
+            break
+            
+        # 若當前頁商品數少於page_size，無更多數據
+        if len(hits) < PAGE_SIZE:
+            print(f"第 {page} 頁僅 {len(hits)} 個商品，無更多數據")
+            break
+            
+        page += 1  # 請求間隔由傳輸層的速率限制器控制
+
+def run(keyword: str, max_products: int = 100, min_price: int = 1, max_price: int = 999999) -> List[Product]:
     """ 爬取Yahoo商品資訊
         (發送GraphQL請求，獲取商品清單，處理分頁)
 
@@ -34,83 +137,53 @@ def run(keyword: str, max_products: int = 100, min_price: int = 1, max_price: in
         min_price (int, optional): 最低價格範圍. Defaults to 0.
         max_price (int, optional): 最高價格範圍. Defaults to 999999.
     Returns:
-        List[Dict]: 商品資訊列表
+        List[Product]: 商品資訊列表
     """
-    url = "https://graphql.ec.yahoo.com/graphql"
+    return [product for page_products in run_stream(keyword, max_products, min_price, max_price) for product in page_products]
+
+async def run_async(keyword: str, max_products: int = 100, min_price: int = 1, max_price: int = 999999,
+                    client: AsyncHttpClient = None) -> List[Product]:
+    """run 的非同步版本，透過共用的 AsyncHttpClient 發送請求
+
+    Args:
+        keyword (str): 搜索關鍵字
+        max_products (int, optional): 最大商品數量限制. Defaults to 100.
+        min_price (int, optional): 最低價格範圍. Defaults to 1.
+        max_price (int, optional): 最高價格範圍. Defaults to 999999.
+        client (AsyncHttpClient, optional): 共用的非同步 HTTP 客戶端，None 表示自行建立
+    Returns:
+        List[Product]: 商品資訊列表
+    """
+    if client is None:
+        async with AsyncHttpClient() as own_client:
+            return await run_async(keyword, max_products, min_price, max_price, own_client)
+    
     headers = get_headers(keyword)
     products = []
-    page_size = 60  # 每頁商品數量
     page = 1
     
     while True:
-        # 構建GraphQL請求體
-        payload = {
-            "variables": {
-                "property": "sas",
-                "p": keyword,
-                "cid": "0",
-                "pg": str(page),
-                "psz": str(page_size),
-                "maxxp": str(max_price),
-                "minp": str(max(min_price, 1)),  # 確保最低價格不小於1
-                "qt": "product",
-                "sort": "rel",
-                "isTestStoreIncluded": "0",
-                "spaceId": 152989812,
-                "source": "pc",
-                "showMoreCluster": "0",
-                "searchTarget": "ecItem",
-                "isStoreSearch": 0,
-                "isShoppingStoreSearch": 0
-            },
-            "extensions": {
-                "persistedQuery": {
-                    "version": 1,
-                    "sha256Hash": "9e8c95a7bd216439855a6dcb580387b180713a20260a89c26096fbe4dd30133f"
-                }
-            }
-        }
+        payload = build_payload(keyword, page, min_price, max_price)
         
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            # 搜尋查詢為唯讀，逾時或連線失敗時可以安全重試
+            response = await client.post(platform_url(GRAPHQL_URL), json_body=payload, headers=headers, timeout=10, idempotent=True)
             response.raise_for_status()
-            data = response.json()
             
-            # 提取商品數據
-            hits = data.get("data", {}).get("getUther", {}).get("hits", [])
+            hits = parse_hits(response.json())
             if not hits:
-                print(f"第 {page} 頁無數據，停止爬取")
                 break
                 
-            for item in hits:
-                product_info = {
-                    "id": str(uuid.uuid4()),  # 添加唯一ID
-                    "title": item.get("ec_title", ""),
-                    "price": int(float(item.get("ec_price", 0))),
-                    "image_url": item.get("ec_image", ""),
-                    "url": item.get("ec_item_url", ""),
-                    "platform": "Yahoo購物"
-                }
-                products.append(product_info)
+            products.extend(map_hit(item) for item in hits)
             
-            # 檢查是否達到最大商品數量
-            if len(products) >= max_products:
-                # print(f"已獲取 {len(products)} 個商品，達到最大數量限制")
-                break
-                
-            # 若當前頁商品數少於page_size，無更多數據
-            if len(hits) < page_size:
-                print(f"第 {page} 頁僅 {len(hits)} 個商品，無更多數據")
+            if len(products) >= max_products or len(hits) < PAGE_SIZE:
                 break
                 
             page += 1
-            time.sleep(1)  # 延遲1秒，防止反爬
-        except requests.RequestException as e:
+        except ASYNC_REQUEST_ERRORS as e:
             print(f"請求第 {page} 頁失敗: {e}")
             break
-    products = products[:max_products]
-    # print(f"獲取到 {len(products)} 個Yahoo商品")
-    return products  # 確保不超過最大數量
+    return products[:max_products]
 
 def main(keyword: str, output_file: str = None, max_products: int = 100, min_price: int = 1, max_price: int = 999999) -> None:
     """主函數：爬取Yahoo商品資訊並保存為JSON(測試用)"""
@@ -137,7 +210,7 @@ def main(keyword: str, output_file: str = None, max_products: int = 100, min_pri
         os.makedirs("./crawl_data", exist_ok=True)
         output_file = f"./crawl_data/yahoo_{keyword}_{uuid.uuid4().hex}.json"
     with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+        json.dump(output_data, f, ensure_ascii=False, indent=2, default=json_default)
     print(f"結果已保存至 {output_file}")
 
 if __name__ == "__main__":
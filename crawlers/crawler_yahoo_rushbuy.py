@@ -1,10 +1,13 @@
 import os
+import sys
+import re
 import requests
 import json
 import time
 from typing import List, Dict
-import uuid
+from urllib.parse import urljoin
 from datetime import datetime
+from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -15,6 +18,39 @@ import brotli
 import traceback
 import logging
 
+# 以檔案路徑載入時也能匯入專案的 core 模組
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.http_replay import http_replay, FixtureMissingError
+from core.product import Product, json_default
+from core.browser_pool import browser_pool
+from core.page_wait import scroll_until_settled
+from core.dom_extract import BULK_EXTRACT, extract_cards, rule
+
+# BeautifulSoup 有 lxml 時使用較快的 lxml 解析器
+try:
+    import lxml
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+RUSHBUY_URL = "https://tw.buy.yahoo.com/rushbuy"
+# 錄製/重播時秒殺頁面原始碼的 fixture 名稱
+RUSHBUY_PAGE_FIXTURE = 'rushbuy'
+ITEM_SELECTOR = 'li[class*="RushbuyItem"]'
+TITLE_SELECTOR = '[class*="Title"], [class*="name"], h3, h4'
+PRICE_SELECTOR = '[class*="price"]'
+PRICE_DIGITS_RE = re.compile(r'[\d,]+')
+# 批次擷取的欄位規則（標題找不到時使用整個商品區塊的文字）
+RUSHBUY_FIELDS = {
+    'url': [rule("a", "href")],
+    'image_url': [rule("img", "src")],
+    'title': [rule(TITLE_SELECTOR), rule()],
+    'price': [rule(PRICE_SELECTOR)]
+}
+
 def get_cookies_and_token() -> tuple:
     """使用 Selenium 獲取必要的 cookies 和 token"""
     print("正在啟動瀏覽器...")
@@ -81,15 +117,34 @@ def get_headers(cookie_string: str, local_storage: dict) -> Dict:
         "authorization": f"Bearer {local_storage.get('accessToken', '')}"
     }
 
-def get_products_from_page(driver) -> List[Dict]:
-    """從頁面 DOM 中直接提取商品資訊"""
+def get_products_bulk(driver) -> List[Product]:
+    """以一次 execute_script 讀出所有商品區塊，規則與 get_products_from_page 相同"""
+    _, items = extract_cards(driver, [ITEM_SELECTOR], RUSHBUY_FIELDS)
+    print(f"共找到 {len(items)} 個商品區塊")
+    products = []
+    for item in items:
+        price = parse_rushbuy_price(item['price']) if item['price'] else 0
+        if price is None:
+            continue  # 跳過價格有 X 的商品（未開賣或不明價格）
+        if item['title'] and item['url']:
+            products.append(Product(item['title'], price, item['image_url'] or "", item['url'], "yahoo_rushbuy"))
+    print(f"成功提取到 {len(products)} 個商品")
+    return products
+
+def get_products_from_page(driver) -> List[Product]:
+    """從頁面 DOM 中直接提取商品資訊（預設批次擷取，失敗時逐一查詢元素）"""
+    if BULK_EXTRACT:
+        try:
+            return get_products_bulk(driver)
+        except Exception as e:
+            print(f"批次擷取商品失敗，改用逐一元素查詢: {e}")
     products = []
     try:
         WebDriverWait(driver, 20).until(
             EC.presence_of_element_located((By.TAG_NAME, "body"))
         )
         # 找到所有商品區塊
-        product_elements = driver.find_elements(By.CSS_SELECTOR, 'li[class*="RushbuyItem"]')
+        product_elements = driver.find_elements(By.CSS_SELECTOR, ITEM_SELECTOR)
         print(f"共找到 {len(product_elements)} 個商品區塊")
         for element in product_elements:
             try:
@@ -104,29 +159,20 @@ def get_products_from_page(driver) -> List[Dict]:
                     image_url = ""
                 # 商品標題
                 try:
-                    title_elem = element.find_element(By.CSS_SELECTOR, '[class*="Title"], [class*="name"], h3, h4')
+                    title_elem = element.find_element(By.CSS_SELECTOR, TITLE_SELECTOR)
                     title = title_elem.text.strip()
                 except:
                     title = element.text.strip()
                 # 商品價格
                 try:
-                    price_elem = element.find_element(By.CSS_SELECTOR, '[class*="price"]')
-                    import re
-                    price_text = price_elem.text
-                    if 'X' in price_text.upper():
+                    price_elem = element.find_element(By.CSS_SELECTOR, PRICE_SELECTOR)
+                    price = parse_rushbuy_price(price_elem.text)
+                    if price is None:
                         continue  # 跳過價格有 X 的商品（未開賣或不明價格）
-                    price_match = re.search(r'[\d,]+', price_text.replace(',', ''))
-                    price = int(price_match.group().replace(',', '')) if price_match else 0
                 except:
                     price = 0
                 if title and item_url:
-                    products.append({
-                        "title": title,
-                        "price": price,
-                        "image_url": image_url,
-                        "url": item_url,
-                        "platform": "yahoo_rushbuy"
-                    })
+                    products.append(Product(title, price, image_url, item_url, "yahoo_rushbuy"))
             except Exception as e:
                 print(f"商品解析失敗: {e}")
                 continue
@@ -136,6 +182,72 @@ def get_products_from_page(driver) -> List[Dict]:
         print("錯誤詳情:", traceback.format_exc())
     return products
 
+def parse_rushbuy_price(price_text: str):
+    """
+    解析秒殺商品價格文字
+
+    Returns:
+        價格整數；價格含 X（未開賣或不明價格）時回傳 None，找不到數字時回傳 0
+    """
+    if 'X' in price_text.upper():
+        return None
+    price_match = PRICE_DIGITS_RE.search(price_text.replace(',', ''))
+    return int(price_match.group().replace(',', '')) if price_match else 0
+
+def parse_rushbuy_html(html: str, page_url: str = RUSHBUY_URL) -> List[Product]:
+    """
+    從秒殺頁面原始碼解析商品，規則與 get_products_from_page 相同
+    （重播錄製的頁面與效能基準測試使用，不需要瀏覽器）
+
+    Args:
+        html (str): 滾動載入完成後的頁面原始碼
+        page_url (str): 相對連結的基準網址
+
+    Returns:
+        List[Product]: 商品資訊列表
+    """
+    products = []
+    soup = BeautifulSoup(html, HTML_PARSER)
+    for element in soup.select(ITEM_SELECTOR):
+        a_tag = element.find("a")
+        item_url = urljoin(page_url, a_tag.get("href")) if a_tag is not None and a_tag.get("href") else None
+        img_tag = element.find("img")
+        image_url = img_tag.get("src", "") if img_tag is not None else ""
+        title_elem = element.select_one(TITLE_SELECTOR)
+        title = (title_elem if title_elem is not None else element).get_text(" ", strip=True)
+        price_elem = element.select_one(PRICE_SELECTOR)
+        price = parse_rushbuy_price(price_elem.get_text(" ", strip=True)) if price_elem is not None else 0
+        if price is None:
+            continue
+        if title and item_url:
+            products.append(Product(title, price, image_url, item_url, "yahoo_rushbuy"))
+    return products
+
+def load_products_with_driver() -> List[Product]:
+    """以瀏覽器開啟秒殺頁面並提取商品（有瀏覽器池時借用已啟動的瀏覽器）"""
+    if browser_pool.enabled:
+        with browser_pool.lease() as driver:
+            return load_rushbuy_page(driver)
+
+    logging.info("正在啟動瀏覽器...")
+    driver = setup_driver()
+    try:
+        return load_rushbuy_page(driver)
+    finally:
+        driver.quit()
+
+def load_rushbuy_page(driver) -> List[Product]:
+    """開啟秒殺頁面、滾動載入並提取商品（錄製模式會存下滾動完成後的頁面原始碼）"""
+    logging.info("正在訪問 Yahoo 秒殺時時樂頁面...")
+    driver.get(RUSHBUY_URL)
+    WebDriverWait(driver, 20).until(
+        EC.presence_of_element_located((By.TAG_NAME, "body"))
+    )
+    scroll_to_load_products(driver)
+    if http_replay.recording:
+        http_replay.record_page('yahoo_rushbuy', RUSHBUY_PAGE_FIXTURE, driver.page_source)
+    return get_products_from_page(driver)
+
 def setup_driver():
     """設置 Chrome WebDriver，包含錯誤處理和備用方案"""
     options = webdriver.ChromeOptions()
@@ -162,18 +274,11 @@ def setup_driver():
     
 
 def scroll_to_load_products(driver):
-    """自動滾動頁面以載入所有商品"""
+    """自動滾動頁面以載入所有商品（每次捲動後等到商品數量與網路活動穩定即繼續）"""
     try:
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        while True:
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
+        result = scroll_until_settled(driver, ITEM_SELECTOR)
+        logging.info(f"滾動 {result['scrolls']} 次後商品數量穩定: {result['count']} 個，等待 {result['waited']:.1f} 秒")
         driver.execute_script("window.scrollTo(0, 0);")
-        time.sleep(1)
     except Exception as e:
         logging.warning(f"滾動頁面時發生錯誤: {e}")
 
@@ -181,22 +286,16 @@ def run(keyword=None, max_products=100, min_price=0, max_price=999999, save_json
     """統一介面，支援多參數，並自動存檔"""
     products = []
     try:
-        logging.info("正在啟動瀏覽器...")
-        driver = setup_driver()
-        try:
-            logging.info("正在訪問 Yahoo 秒殺時時樂頁面...")
-            driver.get("https://tw.buy.yahoo.com/rushbuy")
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            scroll_to_load_products(driver)
-            products = get_products_from_page(driver)
-            # 過濾價格範圍
-            products = [p for p in products if min_price <= p.get('price', 0) <= max_price]
-            if not products:
-                logging.warning("未找到任何商品")
-        finally:
-            driver.quit()
+        if http_replay.replaying:
+            products = parse_rushbuy_html(http_replay.load_page('yahoo_rushbuy', RUSHBUY_PAGE_FIXTURE))
+        else:
+            products = load_products_with_driver()
+        # 過濾價格範圍
+        products = [p for p in products if min_price <= p.price <= max_price]
+        if not products:
+            logging.warning("未找到任何商品")
+    except FixtureMissingError as e:
+        logging.error(f"重播秒殺頁面失敗: {e}")
     except Exception as e:
         logging.error(f"發生錯誤: {str(e)}")
         logging.error(traceback.format_exc())
@@ -223,7 +322,7 @@ def save_to_json(products, keyword="yahoo_rushbuy"):
             "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data_to_save, f, ensure_ascii=False, indent=2)
+            json.dump(data_to_save, f, ensure_ascii=False, indent=2, default=json_default)
         logging.info(f"成功保存 {len(products)} 個商品到: {file_path}")
         return file_path
     except Exception as e:
@@ -235,10 +334,10 @@ if __name__ == "__main__":
     products = run(max_products=100, save_json=True)
     print(f"找到 {len(products)} 個商品:")
     for i, product in enumerate(products[:5], 1):
-        print(f"{i}. {product['title']}")
-        print(f"   價格: {product['price']}")
-        print(f"   連結: {product['url']}")
-        print(f"   圖片: {product['image_url']}")
+        print(f"{i}. {product.title}")
+        print(f"   價格: {product.price}")
+        print(f"   連結: {product.url}")
+        print(f"   圖片: {product.image_url}")
         print()
     if len(products) > 5:
         print(f"... 還有 {len(products) - 5} 個商品")
@@ -18,22 +18,67 @@ config_path = os.path.join(project_root, 'config', '.env')
 if os.path.exists(config_path):
     load_dotenv(config_path)
 
+from core.startup import STARTUP_PROFILE, startup_profiler, profile_imports, run_in_background
+
+# GitHub 資料庫同步：blocking 為啟動前同步完成，off 為不同步
+# 同步會替換資料庫檔案，必須在背景工作佇列與伺服器開始使用資料庫之前完成
+DB_SYNC_MODE = os.getenv('STARTUP_DB_SYNC', 'blocking').lower()
+# 伺服器啟動後是否在背景預先載入爬蟲模組，讓第一次爬取不用等待匯入
+PRELOAD_CRAWLERS = os.getenv('STARTUP_PRELOAD_CRAWLERS', 'true').lower() in ('1', 'true', 'yes')
+# 伺服器啟動後是否在背景預先啟動瀏覽器池，讓每日促銷更新不用等待 Chrome 冷啟動
+PREWARM_BROWSERS = os.getenv('STARTUP_PREWARM_BROWSERS', 'true').lower() in ('1', 'true', 'yes')
+# 伺服器啟動後是否在背景建立 Gemini 模型與 ProductFilter，讓第一次商品比較 / 過濾不用等待匯入
+PRELOAD_AI = os.getenv('STARTUP_PRELOAD_AI', 'true').lower() in ('1', 'true', 'yes')
+
+
+def sync_database():
+    """自動同步 GitHub 資料庫，下載新檔案後補上本地需要的資料表"""
+    from core.github_sync import auto_sync_if_needed
+    from core.database import init_db
+    if auto_sync_if_needed(max_age_hours=2):  # 如果超過2小時沒更新就同步
+        init_db()
+
+
+def warm_browser_pool():
+    """預先啟動每日促銷爬蟲使用的瀏覽器"""
+    from core.browser_pool import browser_pool
+    browser_pool.warm_up()
+
+
 # 啟動Flask應用
 if __name__ == '__main__':
     try:
-        # 自動同步 GitHub 資料庫
-        print("🔄 檢查資料庫更新...")
-        try:
-            from core.github_sync import auto_sync_if_needed
-            auto_sync_if_needed(max_age_hours=2)  # 如果超過2小時沒更新就同步
-        except Exception as e:
-            print(f"⚠️ 資料庫同步檢查失敗，將使用本地資料庫: {e}")
+        profile = STARTUP_PROFILE or '--profile-startup' in sys.argv
+
+        if DB_SYNC_MODE != 'off':
+            print("🔄 檢查資料庫更新...")
+            with startup_profiler.phase('GitHub 資料庫同步'):
+                try:
+                    sync_database()
+                except Exception as e:
+                    print(f"⚠️ 資料庫同步檢查失敗，將使用本地資料庫: {e}")
         
         # 導入並啟動web應用
-        from app.web_app import app, init_db
+        with startup_profiler.phase('載入 web_app'):
+            from app.web_app import (app, init_db, crawl_job_service, crawler_manager,
+                                     gemini_model, product_filter_loader)
         
         # 初始化資料庫
-        init_db()
+        with startup_profiler.phase('初始化資料庫'):
+            init_db()
+        
+        # 啟動背景工作佇列，重新排入上次未完成的工作
+        with startup_profiler.phase('啟動背景工作佇列'):
+            crawl_job_service.start()
+        
+        # 不影響接受連線的工作移到背景執行
+        if PRELOAD_CRAWLERS:
+            run_in_background('預先載入爬蟲', crawler_manager.registry.preload)
+        if PREWARM_BROWSERS:
+            run_in_background('預熱瀏覽器池', warm_browser_pool)
+        if PRELOAD_AI:
+            gemini_model.start_background()
+            product_filter_loader.start_background()
         
         print("🚀 爬蟲結果展示網站啟動中...")
         print("📁 請訪問: http://localhost:5000")
@@ -45,6 +90,12 @@ if __name__ == '__main__':
         log = logging.getLogger('werkzeug')
         log.setLevel(logging.ERROR)
         
+        ready_in = startup_profiler.mark_ready()
+        print(f"⏱️ 啟動耗時 {ready_in:.2f} 秒")
+        if profile:
+            startup_profiler.import_breakdown = profile_imports('app.web_app')
+            startup_profiler.report()
+        
         # 使用簡單的開發伺服器
         app.run(debug=True, host='127.0.0.1', port=5000, threaded=True, use_reloader=False)
         
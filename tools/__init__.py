@@ -0,0 +1,3 @@
+"""
+開發與壓力測試工具
+"""
@@ -0,0 +1,273 @@
+"""
+CrawlerManager 壓力測試（搭配 tools.mock_shop，不需要網路）
+
+    python -m tools.load_test --keywords 500 --strategy threads --concurrency 8
+    python -m tools.load_test --keywords 500 --strategy async --concurrency 32 --latency-ms 120 --error-rate 0.02
+    python -m tools.load_test --keywords 200 --strategy batch --compare 20
+    python -m tools.load_test --keywords 200 --strategy all
+
+策略：
+    threads  每個關鍵字呼叫 run_all_crawlers，以執行緒同時處理多個關鍵字
+    stream   同上，改用 run_all_crawlers_streaming（逐頁寫入資料庫）
+    async    run_all_crawlers_async，所有關鍵字共用一個事件迴圈與 aiohttp 連線池
+    batch    run_keywords 一次提交所有關鍵字（商品資料庫豐富化使用的流程）
+
+結果寫入暫存的 SQLite 檔，不會動到 data/crawler_data.db；
+預設停用 HTTP 快取與爬取結果快取，模擬主機也不套用平台速率限制（--rate-limit 可改為套用）。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+# 以檔案路徑執行時也能匯入專案的 core 模組
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core import database
+from core.crawler_manager import CrawlerManager
+from core.http_cache import http_cache
+from core.http_client import AIOHTTP_AVAILABLE, AsyncHttpClient
+from core.platforms import set_base_url
+from core.rate_limiter import rate_limiter
+from core.resilience import resilience
+from core.services.product_comparison_service import ProductComparisonService
+from tools.mock_shop import MOCK_PLATFORMS, MockShop, add_config_arguments, config_from_args
+
+STRATEGIES = ('threads', 'stream', 'async', 'batch')
+
+
+def make_keywords(count: int, prefix: str = '壓測') -> List[str]:
+    """產生不重複的關鍵字（避免命中快取）"""
+    return [f"{prefix}{index:05d}" for index in range(count)]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def configure_mock_platforms(shop: MockShop, apply_rate_limit: bool, http_cache_enabled: bool):
+    """把爬蟲的請求導向模擬伺服器"""
+    for platform, base_url in shop.base_urls.items():
+        set_base_url(platform, base_url)
+        if not apply_rate_limit:
+            # 覆寫的主機預設套用平台速率，未指定 --rate-limit 時不限制，量測爬蟲本身的吞吐量
+            rate_limiter.configure_host(urlparse(base_url).netloc, 0, 0)
+        if not http_cache_enabled:
+            http_cache.configure_platform(platform, 0)
+
+
+def run_threaded(keywords: List[str], concurrency: int, run: Callable) -> Dict[str, float]:
+    """以執行緒同時處理多個關鍵字，回傳各關鍵字的耗時"""
+    durations = {}
+
+    def crawl(keyword: str):
+        start = time.perf_counter()
+        run(keyword)
+        durations[keyword] = time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(crawl, keywords))
+    return durations
+
+
+async def run_async(manager: CrawlerManager, keywords: List[str], concurrency: int, crawl_args: Dict) -> Dict[str, float]:
+    """在同一個事件迴圈中同時處理多個關鍵字"""
+    durations = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    async with AsyncHttpClient() as client:
+        async def crawl(keyword: str):
+            async with semaphore:
+                start = time.perf_counter()
+                await manager.run_all_crawlers_async(keyword, client=client, **crawl_args)
+                durations[keyword] = time.perf_counter() - start
+        await asyncio.gather(*(crawl(keyword) for keyword in keywords))
+    return durations
+
+
+def run_strategy(manager: CrawlerManager, strategy: str, keywords: List[str], concurrency: int,
+                 crawl_args: Dict) -> Dict[str, float]:
+    """
+    以指定策略爬取所有關鍵字
+
+    Returns:
+        Dict[str, float]: 關鍵字 -> 耗時秒數（batch 策略只有整批的耗時）
+    """
+    if strategy == 'threads':
+        return run_threaded(keywords, concurrency, lambda kw: manager.run_all_crawlers(kw, **crawl_args))
+    if strategy == 'stream':
+        return run_threaded(keywords, concurrency,
+                            lambda kw: manager.run_all_crawlers_streaming(kw, **crawl_args))
+    if strategy == 'async':
+        if not AIOHTTP_AVAILABLE:
+            raise RuntimeError("aiohttp 未安裝，無法測試 async 策略")
+        return asyncio.run(run_async(manager, keywords, concurrency, crawl_args))
+    if strategy == 'batch':
+        start = time.perf_counter()
+        manager.run_keywords(keywords, platforms=crawl_args['platforms'], max_products=crawl_args['max_products'],
+                             use_cache=crawl_args['use_cache'])
+        return {'*': time.perf_counter() - start}
+    raise ValueError(f"不支援的策略: {strategy}")
+
+
+def session_summary(since_id: int) -> Dict:
+    """統計此次測試寫入的 session 與商品"""
+    conn = database.get_db_connection()
+    try:
+        sessions = conn.execute(
+            "SELECT status, COUNT(*) AS n FROM crawl_sessions WHERE id > ? GROUP BY status", (since_id,)
+        ).fetchall()
+        platforms = conn.execute(
+            "SELECT status, COUNT(*) AS n FROM crawl_session_platforms WHERE session_id > ? GROUP BY status",
+            (since_id,)
+        ).fetchall()
+        products = conn.execute("SELECT COUNT(*) FROM products WHERE session_id > ?", (since_id,)).fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        'sessions': {row['status']: row['n'] for row in sessions},
+        'platform_runs': {row['status']: row['n'] for row in platforms},
+        'products': products
+    }
+
+
+def last_session_id() -> int:
+    conn = database.get_db_connection()
+    try:
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM crawl_sessions").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run_comparisons(since_id: int, sessions: int, targets_per_session: int = 5) -> Dict:
+    """
+    對測試寫入的 session 執行商品比較的備用方法（不使用 AI 模型）
+
+    每個 session 取 PChome 的前幾個商品為目標，其他平台的商品為候選。
+    """
+    service = ProductComparisonService(gemini_model=None)
+    conn = database.get_db_connection()
+    try:
+        session_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM crawl_sessions WHERE id > ? ORDER BY id LIMIT ?", (since_id, sessions)
+        ).fetchall()]
+        workloads = []
+        for session_id in session_ids:
+            rows = [dict(row) for row in conn.execute(
+                "SELECT platform, title, price, url, image_url FROM products WHERE session_id = ?", (session_id,)
+            ).fetchall()]
+            targets = [row for row in rows if row['platform'] == 'pchome'][:targets_per_session]
+            candidates = [row for row in rows if row['platform'] != 'pchome']
+            if targets and candidates:
+                workloads.append((targets, candidates))
+    finally:
+        conn.close()
+
+    durations = []
+    matches = 0
+    for targets, candidates in workloads:
+        start = time.perf_counter()
+        results = service.batch_compare_products(targets, candidates)
+        durations.append(time.perf_counter() - start)
+        matches += sum(len(found) for found in results.values())
+    return {
+        'sessions': len(workloads),
+        'matches': matches,
+        'p50_ms': round(percentile(durations, 50) * 1000, 1),
+        'p95_ms': round(percentile(durations, 95) * 1000, 1),
+        'total_s': round(sum(durations), 3)
+    }
+
+
+def print_report(strategy: str, durations: Dict[str, float], elapsed: float, keywords: int, summary: Dict,
+                 shop_stats: Dict, comparison: Optional[Dict] = None):
+    samples = [d for k, d in durations.items() if k != '*']
+    print(f"\n=== 策略: {strategy} ===")
+    print(f"關鍵字: {keywords}，總耗時 {elapsed:.2f} 秒，吞吐量 {keywords / elapsed * 3600:.0f} 關鍵字/小時")
+    if samples:
+        print(f"單一關鍵字耗時: p50 {percentile(samples, 50):.3f}s  p95 {percentile(samples, 95):.3f}s  "
+              f"p99 {percentile(samples, 99):.3f}s  mean {statistics.mean(samples):.3f}s")
+    print(f"Session 狀態: {summary['sessions']}  平台結果: {summary['platform_runs']}  商品: {summary['products']}")
+    print(f"模擬伺服器: {shop_stats['total_requests']} 個請求，注入錯誤 {shop_stats['errors']}，"
+          f"{shop_stats['bytes_sent'] / 1024 / 1024:.1f} MB，{shop_stats['total_requests'] / elapsed:.0f} req/s")
+    if comparison:
+        print(f"商品比較（備用方法）: {comparison['sessions']} 個 session，{comparison['matches']} 個匹配，"
+              f"p50 {comparison['p50_ms']}ms  p95 {comparison['p95_ms']}ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CrawlerManager 壓力測試（本機模擬電商伺服器）")
+    parser.add_argument('--keywords', type=int, default=100, help="關鍵字數量")
+    parser.add_argument('--strategy', choices=STRATEGIES + ('all',), default='threads')
+    parser.add_argument('--concurrency', type=int, default=8, help="同時處理的關鍵字數（batch 策略不使用）")
+    parser.add_argument('--platforms', default=','.join(MOCK_PLATFORMS), help="逗號分隔的平台")
+    parser.add_argument('--max-products', type=int, default=100)
+    parser.add_argument('--timeout-s', type=float, help="每個關鍵字的爬取時間上限（秒）")
+    parser.add_argument('--compare', type=int, default=0, help="爬取後對前 N 個 session 執行商品比較備用方法")
+    parser.add_argument('--rate-limit', action='store_true', help="對模擬主機套用平台的速率限制")
+    parser.add_argument('--http-cache', action='store_true', help="啟用 HTTP 快取")
+    parser.add_argument('--use-cache', action='store_true', help="啟用爬取結果快取")
+    parser.add_argument('--db', help="結果資料庫路徑（預設為暫存檔）")
+    parser.add_argument('--port', type=int, default=0, help="模擬伺服器的第一個連接埠（0 表示自動分配）")
+    parser.add_argument('--verbose', action='store_true', help="顯示爬蟲的輸出")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    platforms = [p.strip() for p in args.platforms.split(',') if p.strip()]
+    unsupported = set(platforms) - set(MOCK_PLATFORMS)
+    if unsupported:
+        parser.error(f"模擬伺服器不支援: {', '.join(sorted(unsupported))}")
+
+    database.DB_PATH = args.db or os.path.join(tempfile.mkdtemp(prefix='crawler_load_'), 'load_test.db')
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.init_db()
+    print(f"結果資料庫: {database.DB_PATH}")
+
+    shop = MockShop(config_from_args(args), port=args.port, platforms=platforms).start()
+    configure_mock_platforms(shop, args.rate_limit, args.http_cache)
+    print("模擬伺服器: " + "  ".join(f"{p}={url}" for p, url in shop.base_urls.items()))
+
+    manager = CrawlerManager()
+    crawl_args = {
+        'platforms': platforms,
+        'max_products': args.max_products,
+        'use_cache': args.use_cache,
+        'timeout_s': args.timeout_s
+    }
+    strategies = STRATEGIES if args.strategy == 'all' else (args.strategy,)
+    try:
+        for index, strategy in enumerate(strategies):
+            # 每個策略使用不同的關鍵字，避免前一輪的快取影響結果
+            keywords = make_keywords(args.keywords, prefix=f"壓測{strategy}{index}_")
+            since_id = last_session_id()
+            stats_before = shop.stats.snapshot()
+            output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+            start = time.perf_counter()
+            with output:
+                durations = run_strategy(manager, strategy, keywords, args.concurrency, crawl_args)
+                elapsed = time.perf_counter() - start
+                comparison = run_comparisons(since_id, args.compare) if args.compare else None
+            stats_after = shop.stats.snapshot()
+            shop_stats = {key: stats_after[key] - stats_before[key] for key in ('total_requests', 'errors', 'bytes_sent')}
+            print_report(strategy, durations, elapsed, len(keywords), session_summary(since_id), shop_stats, comparison)
+        print(f"\n平台韌性統計: {resilience.stats()}")
+    finally:
+        shop.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
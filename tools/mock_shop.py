@@ -0,0 +1,387 @@
+"""
+本機模擬電商伺服器（只使用標準函式庫）
+
+模擬四個搜尋平台的 API：PChome search v3.3 JSON、Yahoo GraphQL getUther、
+露天 core/prod 與 prod/v2、家樂福搜尋頁 HTML。每個平台各開一個連接埠，
+讓傳輸層可以依主機區分平台（速率限制、斷路器、HTTP 快取）。
+
+    python -m tools.mock_shop --port 8801 --latency-ms 80 --jitter-ms 40 --error-rate 0.02 --pages 5
+
+啟動後依畫面輸出設定 CRAWLER_BASE_URL_<PLATFORM> 環境變數，爬蟲即會改連到本機。
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+MOCK_PLATFORMS = ('pchome', 'yahoo', 'routn', 'carrefour')
+
+PCHOME_SEARCH_PATH = '/search/v3.3/all/results'
+YAHOO_GRAPHQL_PATH = '/graphql'
+ROUTN_SEARCH_PATH = '/api/search/v3/index.php/core/prod'
+ROUTN_DETAIL_PATH = '/api/prod/v2/index.php/prod'
+CARREFOUR_SEARCH_PATH = '/zh/search/'
+
+# 各平台未指定分頁大小時的預設值（與爬蟲相同）
+DEFAULT_PAGE_SIZES = {'pchome': 20, 'yahoo': 60, 'routn': 100, 'carrefour': 20}
+PRODUCT_WORDS = ['藍牙耳機', '行動電源', '保溫瓶', '電競滑鼠', '吸塵器', '筆電', '充電器', '鍵盤', '空氣清淨機', '除濕機']
+
+
+class MockShopConfig:
+    """模擬伺服器的行為設定"""
+
+    def __init__(self, latency_ms: float = 50, jitter_ms: float = 0, error_rate: float = 0.0,
+                 error_status: int = 503, pages: int = 5, product_bytes: int = 0, seed: int = 0):
+        """
+        Args:
+            latency_ms (float): 每個請求的基本延遲（毫秒）
+            jitter_ms (float): 額外的隨機延遲上限（毫秒）
+            error_rate (float): 回應錯誤狀態碼的機率
+            error_status (int): 注入錯誤時的狀態碼
+            pages (int): 每個關鍵字的結果頁數（以平台的分頁大小計算商品總數）
+            product_bytes (int): 每個商品額外附加的描述文字大小，用來調整回應大小
+            seed (int): 隨機種子（影響錯誤注入與延遲，商品內容只取決於關鍵字）
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.pages = pages
+        self.product_bytes = product_bytes
+        self.seed = seed
+
+
+class MockShopStats:
+    """請求統計（多個處理執行緒共用）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.errors = 0
+        self.bytes_sent = 0
+
+    def record(self, route: str, size: int, error: bool):
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            self.bytes_sent += size
+            if error:
+                self.errors += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': dict(self.requests),
+                'total_requests': sum(self.requests.values()),
+                'errors': self.errors,
+                'bytes_sent': self.bytes_sent
+            }
+
+
+def _product_rng(keyword: str, index: int) -> random.Random:
+    """同一關鍵字與位置每次產生相同的商品"""
+    digest = hashlib.md5(f"{keyword}\x00{index}".encode('utf-8')).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def product_id(keyword: str, index: int) -> str:
+    """商品ID：關鍵字雜湊 + 5 碼位置"""
+    return f"{int(hashlib.md5(keyword.encode('utf-8')).hexdigest()[:6], 16):08d}{index:05d}"
+
+
+def make_product(keyword: str, index: int, product_bytes: int = 0) -> Dict:
+    """產生單一商品的共用欄位，各平台的回應再轉成自己的格式"""
+    rng = _product_rng(keyword, index)
+    return {
+        'id': product_id(keyword, index),
+        'title': f"{keyword} {rng.choice(PRODUCT_WORDS)} {rng.choice(['標準版', '升級版', '旗艦版'])} 第{index + 1}款",
+        'price': rng.randint(49, 49999),
+        'description': ('商品說明' * (product_bytes // 12 + 1))[:product_bytes // 3] if product_bytes else ''
+    }
+
+
+def page_indexes(start: int, size: int, total: int) -> range:
+    """分頁範圍內的商品位置（超過總數的部分不回傳）"""
+    return range(max(0, start), min(total, start + size))
+
+
+class MockShopHandler(BaseHTTPRequestHandler):
+    """依路徑分派到各平台的模擬回應；任何連接埠都能回應任何平台的路徑"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockShop/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def shop(self) -> 'MockShop':
+        return self.server.shop
+
+    def _respond(self, route: str, status: int, body, content_type: str = 'application/json; charset=utf-8'):
+        payload = body if isinstance(body, bytes) else body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        self.shop.stats.record(route, len(payload), status >= 400)
+
+    def _simulate(self, route: str) -> bool:
+        """套用延遲並依錯誤率決定是否回應錯誤，已回應錯誤時回傳 False"""
+        config = self.shop.config
+        delay = config.latency_ms + (self.shop.rng_uniform(0, config.jitter_ms) if config.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if config.error_rate and self.shop.rng_uniform(0, 1) < config.error_rate:
+            self._respond(route, config.error_status, json.dumps({'error': 'injected'}))
+            return False
+        return True
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        routes = {
+            PCHOME_SEARCH_PATH: ('pchome', self._pchome_search),
+            ROUTN_SEARCH_PATH: ('routn_search', self._routn_search),
+            ROUTN_DETAIL_PATH: ('routn_detail', self._routn_detail),
+            CARREFOUR_SEARCH_PATH: ('carrefour', self._carrefour_search),
+        }
+        route = routes.get(parsed.path) or routes.get(parsed.path.rstrip('/') + '/')
+        if route is None:
+            self._respond('unknown', 404, json.dumps({'error': 'not found'}))
+            return
+        name, handler = route
+        if self._simulate(name):
+            handler(query)
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if parsed.path != YAHOO_GRAPHQL_PATH:
+            self._respond('unknown', 404, json.dumps({'error': 'not found'}))
+            return
+        if self._simulate('yahoo'):
+            self._yahoo_graphql(json.loads(body or b'{}'))
+
+    def _pchome_search(self, query: Dict):
+        config = self.shop.config
+        size = int(query.get('size') or DEFAULT_PAGE_SIZES['pchome'])
+        page = int(query.get('page') or 1)
+        keyword = query.get('q', '')
+        total = config.pages * DEFAULT_PAGE_SIZES['pchome']
+        prods = []
+        for index in page_indexes((page - 1) * size, size, total):
+            product = make_product(keyword, index, config.product_bytes)
+            prods.append({
+                'Id': f"DYAJ{product['id']}",
+                'cateId': 'DYAJ',
+                'picS': f"/items/DYAJ{product['id']}/000002.jpg",
+                'picB': f"/items/DYAJ{product['id']}/000001.jpg",
+                'name': product['title'],
+                'describe': product['description'],
+                'price': product['price'],
+                'originPrice': product['price'] + 100
+            })
+        self._respond('pchome', 200, json.dumps({
+            'QTime': 5,
+            'totalRows': total,
+            'totalPage': -(-total // size),
+            'prods': prods
+        }, ensure_ascii=False))
+
+    def _yahoo_graphql(self, body: Dict):
+        config = self.shop.config
+        variables = body.get('variables', {})
+        size = int(variables.get('psz') or DEFAULT_PAGE_SIZES['yahoo'])
+        page = int(variables.get('pg') or 1)
+        keyword = variables.get('p', '')
+        min_price = int(variables.get('minp') or 0)
+        max_price = int(variables.get('maxxp') or 999999)
+        total = config.pages * DEFAULT_PAGE_SIZES['yahoo']
+        hits = []
+        for index in page_indexes((page - 1) * size, size, total):
+            product = make_product(keyword, index, config.product_bytes)
+            # GraphQL 端依價格篩選
+            if not min_price <= product['price'] <= max_price:
+                continue
+            hits.append({
+                'ec_productid': product['id'],
+                'ec_title': product['title'],
+                'ec_price': f"{product['price']}.0",
+                'ec_image': f"https://s.yimg.com/zp/mock/{product['id']}.jpg",
+                'ec_item_url': f"https://tw.buy.yahoo.com/gdsale/{product['id']}.html",
+                'ec_description': product['description']
+            })
+        self._respond('yahoo', 200, json.dumps({
+            'data': {'getUther': {'total': total, 'hits': hits}}
+        }, ensure_ascii=False))
+
+    def _routn_search(self, query: Dict):
+        config = self.shop.config
+        limit = int(query.get('limit') or DEFAULT_PAGE_SIZES['routn'])
+        offset = int(query.get('offset') or 1)
+        keyword = query.get('q', '')
+        total = config.pages * DEFAULT_PAGE_SIZES['routn']
+        rows = [{'Id': f"21{product_id(keyword, index)}"}
+                for index in page_indexes(offset - 1, limit, total)]
+        self._respond('routn_search', 200, json.dumps({'TotalRows': total, 'Rows': rows}))
+
+    def _routn_detail(self, query: Dict):
+        config = self.shop.config
+        items = []
+        for prod_id in filter(None, query.get('id', '').split(',')):
+            # 商品ID後 5 碼為位置，內容以商品ID為種子產生
+            index = int(prod_id[-5:]) if prod_id[-5:].isdigit() else 0
+            product = make_product(prod_id, index, config.product_bytes)
+            items.append({
+                'ProdId': prod_id,
+                'ProdName': product['title'],
+                'PriceRange': [product['price'], product['price']],
+                'Image': f"/s1/mock/{prod_id}.jpg",
+                'Description': product['description']
+            })
+        self._respond('routn_detail', 200, json.dumps(items, ensure_ascii=False))
+
+    def _carrefour_search(self, query: Dict):
+        config = self.shop.config
+        size = DEFAULT_PAGE_SIZES['carrefour']
+        start = int(query.get('start') or 0)
+        keyword = query.get('q', '')
+        total = config.pages * size
+        items = []
+        for index in page_indexes(start, size, total):
+            product = make_product(keyword, index, config.product_bytes)
+            items.append(
+                '<div class="hot-recommend-item line">'
+                f'<div class="box-img"><img class="m_lazyload" data-src="/images/mock/{product["id"]}.jpg"></div>'
+                f'<div class="commodity-desc"><a href="/zh/mock/{product["id"]}.html">{product["title"]}</a>'
+                f'<p class="desc">{product["description"]}</p></div>'
+                f'<div class="current-price"><em>${product["price"]:,}</em></div></div>'
+            )
+        html = (
+            '<html><head><title>家樂福線上購物</title></head><body>'
+            '<header><nav>' + ''.join(f'<a href="/zh/category/{i}">分類{i}</a>' for i in range(40)) + '</nav></header>'
+            f'<div class="search-result">{"".join(items)}</div>'
+            '<footer>家樂福線上購物</footer></body></html>'
+        )
+        self._respond('carrefour', 200, html, 'text/html; charset=utf-8')
+
+
+class MockShopServer(ThreadingHTTPServer):
+    """爬蟲取消並行分頁時會中途關閉連線，這類錯誤不輸出 traceback"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class MockShop:
+    """
+    每個平台各開一個連接埠的模擬電商伺服器
+
+    Example:
+        shop = MockShop(MockShopConfig(latency_ms=80, error_rate=0.02)).start()
+        for platform, base_url in shop.base_urls.items():
+            set_base_url(platform, base_url)
+    """
+
+    def __init__(self, config: Optional[MockShopConfig] = None, host: str = '127.0.0.1', port: int = 0,
+                 platforms: List[str] = MOCK_PLATFORMS):
+        """
+        Args:
+            config (MockShopConfig, optional): 行為設定
+            host (str): 監聽位址
+            port (int): 第一個平台的連接埠，其餘平台依序加 1；0 表示由系統分配
+            platforms (List[str]): 要模擬的平台
+        """
+        self.config = config or MockShopConfig()
+        self.host = host
+        self.port = port
+        self.platforms = list(platforms)
+        self.stats = MockShopStats()
+        self.base_urls: Dict[str, str] = {}
+        self._servers = []
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+
+    def rng_uniform(self, low: float, high: float) -> float:
+        with self._rng_lock:
+            return self._rng.uniform(low, high)
+
+    def start(self) -> 'MockShop':
+        """在背景執行緒啟動所有平台的伺服器"""
+        for offset, platform in enumerate(self.platforms):
+            server = MockShopServer((self.host, self.port + offset if self.port else 0), MockShopHandler)
+            server.shop = self
+            threading.Thread(target=server.serve_forever, name=f"mock-shop-{platform}", daemon=True).start()
+            self._servers.append(server)
+            self.base_urls[platform] = f"http://{self.host}:{server.server_address[1]}"
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+
+    def env_lines(self) -> List[str]:
+        """讓爬蟲連到本機的環境變數設定"""
+        return [f"CRAWLER_BASE_URL_{platform.upper()}={base_url}" for platform, base_url in self.base_urls.items()]
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """模擬伺服器行為的命令列參數（壓力測試腳本共用）"""
+    parser.add_argument('--latency-ms', type=float, default=50, help="每個請求的基本延遲（毫秒）")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="額外隨機延遲上限（毫秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="回應錯誤狀態碼的機率（0-1）")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--pages', type=int, default=5, help="每個關鍵字的結果頁數")
+    parser.add_argument('--product-bytes', type=int, default=0, help="每個商品附加的描述大小（位元組）")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def config_from_args(args) -> MockShopConfig:
+    return MockShopConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        error_status=args.error_status, pages=args.pages, product_bytes=args.product_bytes, seed=args.seed
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="本機模擬電商伺服器")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8801, help="第一個平台的連接埠，其餘平台依序加 1")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    shop = MockShop(config_from_args(args), args.host, args.port).start()
+    print("模擬電商伺服器已啟動，設定以下環境變數讓爬蟲連到本機：")
+    for line in shop.env_lines():
+        print(f"  {line}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"統計: {shop.stats.snapshot()}")
+    except KeyboardInterrupt:
+        shop.stop()
+
+
+if __name__ == "__main__":
+    main()